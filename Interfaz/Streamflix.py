@@ -1,93 +1,119 @@
+import asyncio
 import uuid
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request, Form, HTTPException
 from fastapi.responses import HTMLResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.responses import RedirectResponse
-import requests
+import httpx
+import clientes_servicios
 
 # Comando de ejecución: uvicorn Streamflix:app --reload --host localhost --port 8003
 
-# Creación de la API de interfaz
-app = FastAPI()
-
-"""
+# Tiempo máximo (en segundos) que se espera a cada microservicio al cargar la pantalla principal
+TIMEOUT_PETICION = 5.0
 
-Acceso a bases de datos antes de realizar los cambios de Docker
+# Contenidos que se muestran en la estantería de cada género de la pantalla principal
+CONTENIDOS_POR_GENERO = 20
 
-BASE_URL_CONTENIDOS = "http://127.0.0.1:8000"
-BASE_URL_USUARIOS = "http://127.0.0.1:8001"
-BASE_URL_INTERACCIONES = "http://127.0.0.1:8002"
+# Entradas del historial (las más recientes) que se muestran en la pantalla principal
+HISTORIAL_PANTALLA_PRINCIPAL = 20
 
-"""
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Clientes HTTP con pool de conexiones para cada microservicio (se reutilizan entre peticiones)
+    clientes_servicios.iniciar_clientes()
+    yield
+    await clientes_servicios.cerrar_clientes()
 
-BASE_URL_CONTENIDOS = "http://contenidos:8000"  # Nombre del servicio 'contenidos' en docker-compose.yml
-BASE_URL_USUARIOS = "http://usuarios:8001"    # Nombre del servicio 'usuarios' en docker-compose.yml
-BASE_URL_INTERACCIONES = "http://interacciones:8002"  # Nombre del servicio 'interacciones' en docker-compose.yml
+# Creación de la API de interfaz
+app = FastAPI(lifespan=lifespan)
 
 
 # Métodos auxiliares
-def cargar_datos(user_id: str):
+async def obtener_json(cliente: clientes_servicios.ClienteServicioAsync, ruta: str, mensaje_error: str, por_defecto=None):
     """
-    Obtiene y organiza los datos necesarios para la pantalla principal.
+    Realiza una petición GET y devuelve el JSON junto con un mensaje de error
+    (None si la petición fue correcta).
     """
-    mensajes = []  # Lista para almacenar mensajes personalizados
-    recomendaciones = []
-    tendencias = []
-    historial = []
-    generos = []
-    generos_con_contenidos = []
-    lista_personalizada = []
-
-    # Realizamos las solicitudes a los microservicios
-    recomendaciones_response = requests.get(
-        f"{BASE_URL_INTERACCIONES}/usuarios/{user_id}/recomendaciones"
-    )
-    if recomendaciones_response.ok:
-        recomendaciones = recomendaciones_response.json()
-    else:
-        mensajes.append("No se pudieron obtener las recomendaciones personalizadas.")
+    try:
+        response = await cliente.get(ruta, timeout=TIMEOUT_PETICION)
+        if response.is_success:
+            return response.json(), None
+    except httpx.HTTPError:
+        pass
+    return por_defecto, mensaje_error
 
-    tendencias_response = requests.get(f"{BASE_URL_INTERACCIONES}/contenido/tendencias")
-    if tendencias_response.ok:
-        tendencias = tendencias_response.json()
-    else:
-        mensajes.append("No se pudieron obtener las tendencias.")
 
-    historial_response = requests.get(
-        f"{BASE_URL_INTERACCIONES}/usuarios/{user_id}/historial"
+async def cargar_contenidos_por_genero():
+    """
+    Recupera en una sola petición las estanterías de la pantalla principal: los mejor valorados de cada género.
+    """
+    estanterias, error = await obtener_json(
+        clientes_servicios.contenidos,
+        f"/generos/estanterias?por_genero={CONTENIDOS_POR_GENERO}&orden=valoracion",
+        "No se pudieron obtener los contenidos por género.",
+        [],
     )
-    if historial_response.ok:
-        historial = historial_response.json()
-    else:
-        mensajes.append("No se pudo recuperar el historial de usuario.")
+    mensajes = [error] if error else []
+    generos_con_contenidos = [
+        {"nombre": estanteria["nombre"], "contenidos": estanteria["contenidos"]}
+        for estanteria in estanterias
+    ]
+    return generos_con_contenidos, mensajes
 
-    generos_response = requests.get(f"{BASE_URL_CONTENIDOS}/generos")
-    if generos_response.ok:
-        generos = generos_response.json()
-    else:
-        mensajes.append("No se pudieron obtener los géneros.")
 
-    # Recuperar los contenidos por género
-    for genero in generos:
-        contenidos_response = requests.get(
-            f"{BASE_URL_CONTENIDOS}/generos/{genero['id']}/contenidos"
-        )
-        if contenidos_response.ok:
-            generos_con_contenidos.append(
-                {"nombre": genero["nombre"], "contenidos": contenidos_response.json()}
-            )
-        else:
-            mensajes.append(
-                f"No se pudieron obtener los contenidos para el género {genero['nombre']}."
-            )
+async def cargar_datos(user_id: str):
+    """
+    Obtiene y organiza los datos necesarios para la pantalla principal.
+    Todas las peticiones independientes se lanzan a la vez, por lo que el tiempo de carga
+    lo marca la petición más lenta y no la suma de todas.
+    """
+    (
+        (recomendaciones, error_recomendaciones),
+        (tendencias, error_tendencias),
+        (historial, error_historial),
+        (generos_con_contenidos, errores_generos),
+        (lista_personalizada, error_lista_personalizada),
+    ) = await asyncio.gather(
+        obtener_json(
+            clientes_servicios.interacciones,
+            f"/usuarios/{user_id}/recomendaciones",
+            "No se pudieron obtener las recomendaciones personalizadas.",
+            [],
+        ),
+        obtener_json(
+            clientes_servicios.interacciones,
+            "/contenido/tendencias?ventana=24h",
+            "No se pudieron obtener las tendencias.",
+            [],
+        ),
+        obtener_json(
+            clientes_servicios.interacciones,
+            f"/usuarios/{user_id}/historial?limit={HISTORIAL_PANTALLA_PRINCIPAL}",
+            "No se pudo recuperar el historial de usuario.",
+            [],
+        ),
+        cargar_contenidos_por_genero(),
+        obtener_json(
+            clientes_servicios.interacciones,
+            f"/usuarios/{user_id}/listaPersonalizada",
+            "No se pudo obtener la lista personalizada.",
+            [],
+        ),
+    )
 
-    lista_personalizada_response = requests.get(f"{BASE_URL_INTERACCIONES}/usuarios/{user_id}/listaPersonalizada")
-    if lista_personalizada_response.ok:
-        lista_personalizada = lista_personalizada_response.json()
-    else:
-        mensajes.append("No se pudo obtener la lista personalizada.")
+    # Lista para almacenar mensajes personalizados (en el mismo orden que las peticiones)
+    mensajes = [
+        error
+        for error in (error_recomendaciones, error_tendencias, error_historial)
+        if error
+    ]
+    mensajes.extend(errores_generos)
+    if error_lista_personalizada:
+        mensajes.append(error_lista_personalizada)
 
     # Si no hay mensajes, significa que todo salió bien
     if not mensajes:
@@ -124,7 +150,7 @@ async def index(request: Request, mensaje_credenciales: str = None):
 async def login(request: Request, email: str = Form(...), password: str = Form(...)):
     # Enviar las credenciales al microservicio para verificar el login
     data = {"email": email, "password": password}
-    response = requests.post(f"{BASE_URL_USUARIOS}/usuarios/login", json=data)
+    response = await clientes_servicios.usuarios.post("/usuarios/login", json=data)
 
     if response.status_code != 200:
         mensaje_credenciales = "Error: las credenciales no son correctas"
@@ -152,7 +178,7 @@ async def registro_usuario(request: Request):
 @app.get("/planes_suscripcion")
 async def obtener_planes():
     # Aquí haces una solicitud a tu microservicio que devuelve los planes
-    response = requests.get(f"{BASE_URL_USUARIOS}/planes-suscripcion")
+    response = await clientes_servicios.usuarios.get("/planes-suscripcion")
     if response.status_code != 200:
         raise HTTPException(
             status_code=500, detail="No se pudieron obtener los planes."
@@ -177,7 +203,7 @@ async def registrar_usuario(
         "idioma": language,
         "idPlanSuscripcion": subscription_plan,
     }
-    response = requests.post(f"{BASE_URL_USUARIOS}/usuarios/registro", json=data)
+    response = await clientes_servicios.usuarios.post("/usuarios/registro", json=data)
 
     if response.status_code != 200:
         mensaje_credenciales = "Error: Las credenciales ya están en uso"
@@ -198,98 +224,46 @@ async def registrar_usuario(
 # Endpoint para mostrar los detalles de un contenido
 @app.get("/detalles_contenido/{idContenido}", response_class=HTMLResponse)
 async def detalles_contenido(request: Request, idContenido: str, user_id: str):
-    # Solicita los detalles del contenido al microservicio de contenidos
-    contenido = requests.get(f"{BASE_URL_CONTENIDOS}/contenidos/{idContenido}")
+    # Solicita al microservicio de contenidos el detalle completo (género, director, reparto,
+    # idiomas y temporadas con sus episodios) en una sola petición
+    contenido = await clientes_servicios.contenidos.get(f"/contenidos/{idContenido}/detalle")
 
     if contenido.status_code != 200:
         raise HTTPException(
             status_code=404, detail="No se encontraron los detalles de la película."
         )
 
-    # Extrae los detalles de la película del JSON de la respuesta
     detalles_contenido = contenido.json()
+    id_genero = detalles_contenido["idGenero"]
 
-    #Extraer nombre del genero a partir del id
-    genero = requests.get(f"{BASE_URL_CONTENIDOS}/generos/{detalles_contenido['idGenero']}")
-    detalles_genero = genero.json()
-    nombre_genero = detalles_genero["nombre"]
+    # La plantilla muestra los nombres del género y del director en lugar de sus ids
+    detalles_contenido["idGenero"] = detalles_contenido["genero"]
+    detalles_contenido["idDirector"] = detalles_contenido["director"]
 
     if detalles_contenido["tipoContenido"] == "Pelicula":
-        #Extraer nombre del director a partir del id
-        director = requests.get(f"{BASE_URL_CONTENIDOS}/directores/{detalles_contenido['idDirector']}")
-        detalles_director = director.json()
-        nombre_director = detalles_director["nombre"]
-        detalles_contenido["idDirector"] = nombre_director
         temporadas = None
         todos_los_episodios = None
     else:
-        # Obtener las temporadas y los capítulos de una serie
-        temps_caps = requests.get(f"{BASE_URL_CONTENIDOS}/series/{detalles_contenido['id']}")
-        detalles_temps_caps = temps_caps.json()
-
-        # Obtener todas las temporadas
-        temporadas = detalles_temps_caps["Temporadas"]
-
-        # Lista para almacenar todos los episodios
+        temporadas = detalles_contenido["Temporadas"]
         todos_los_episodios = []
-
-        # Recorrer las temporadas para acceder a los episodios
         for temporada in temporadas:
-            episodios = temporada["Episodios"]  # Acceder a los episodios de la temporada
-            for episodio in episodios:
-                idDirector = episodio.get("idDirector")
-                if idDirector:  # Verificar si existe un idDirector
-                    director_response = requests.get(f"{BASE_URL_CONTENIDOS}/directores/{idDirector}")
-                    if director_response.status_code == 200:
-                        director_data = director_response.json()
-                        episodio["director"] = director_data.get("nombre", "Desconocido")
-                    else:
-                        raise HTTPException(
-                            status_code=404, detail="No se encontraron los detalles del director del episodio."
-                        )
-            todos_los_episodios.extend(episodios) # Agregar todos los episodios a la lista
-
-
-    #Cambiar los valores de ids por nombres
-    detalles_contenido["idGenero"] = nombre_genero
-    
+            for episodio in temporada["Episodios"]:
+                episodio["director"] = episodio["director"] or "Desconocido"
+                todos_los_episodios.append(episodio)
 
-    #Obtener el reparto
-    reparto = requests.get(f"{BASE_URL_CONTENIDOS}/contenidos/{detalles_contenido['id']}/reparto")
-    detalles_reparto = reparto.json()
+    detalles_reparto = detalles_contenido["reparto"]
+    detalles_subtitulos = detalles_contenido["subtitulos"]
+    detalles_doblajes = detalles_contenido["doblajes"]
 
-    #Obtener los subtitulos
-    subtitulos = requests.get(f"{BASE_URL_CONTENIDOS}/contenidos/{detalles_contenido['idSubtitulosContenido']}/subtitulos")
-    detalles_subtitulos = subtitulos.json()
-    
-    #Obtener los doblajes
-    doblajes = requests.get(f"{BASE_URL_CONTENIDOS}/contenidos/{detalles_contenido['idDoblajeContenido']}/doblajes")
-    detalles_doblajes = doblajes.json()
-         
-    # Obtener el historial
-    esta_en_historial = False
-    historial_response = requests.get(f"{BASE_URL_INTERACCIONES}/usuarios/{user_id}/historial")
-
-    # Validar que la respuesta sea válida
-    if historial_response.status_code == 200:
-        historial = historial_response.json()
-        if isinstance(historial, list) and len(historial) > 0:  # Verificar si es una lista no vacía
-            if any(content["id"] == idContenido for content in historial):
-                esta_en_historial = True
-    else:
-        #print(f"No se ha obtenido el historial: {historial_response.status_code}")
-        historial = []
-
-    # Si no está en el historial, agregarlo
-    if not esta_en_historial:
-        try:
-            response = requests.post(f"{BASE_URL_INTERACCIONES}/usuarios/{user_id}/historial/{idContenido}")
-            if response.status_code == 200:
-                print(f"Contenido {idContenido} agregado al historial.")
-            else:
-                print(f"Error al agregar contenido al historial: {response.status_code}")
-        except Exception as e:
-            print(f"Error al comunicarse con POST en HISTORIAL: {e}")
+    # Registrar la visualización en el historial (idempotente: si ya estaba, solo suma una vista).
+    # Se envía el género para que Interacciones no tenga que pedírselo a Contenidos
+    try:
+        response = await clientes_servicios.interacciones.put(f"/usuarios/{user_id}/vistas/{idContenido}",
+                                                              params={"idGenero": id_genero} if id_genero else None)
+        if response.status_code != 200:
+            print(f"Error al registrar la visualización en el historial: {response.status_code}")
+    except Exception as e:
+        print(f"Error al comunicarse con PUT en HISTORIAL: {e}")
         
     # Renderiza la plantilla detalles_contenido.html con los datos de la película
     return templates.TemplateResponse("detalles_contenido.html", {
@@ -315,18 +289,18 @@ async def buscar(request: Request, query: str, tipo: str):
 
     if tipo == "contenido":
         # Búsqueda de contenidos
-        response = requests.get(f"{BASE_URL_CONTENIDOS}/contenidos/{query}/buscar")
+        response = await clientes_servicios.contenidos.get(f"/contenidos/{query}/buscar")
         if response.status_code == 200:
             contenidos = response.json().get("resultados", [])
     elif tipo == "actor":
         # Búsqueda de actores
-        response = requests.get(f"{BASE_URL_CONTENIDOS}/contenidos/{query}/actores")
+        response = await clientes_servicios.contenidos.get(f"/contenidos/{query}/actores")
         if response.status_code == 200:
             actores = response.json().get("resultados", [])
     elif tipo == "todos":
         # Búsqueda combinada
-        response_contenido = requests.get(f"{BASE_URL_CONTENIDOS}/contenidos/{query}/buscar")
-        response_actor = requests.get(f"{BASE_URL_CONTENIDOS}/contenidos/{query}/actores")
+        response_contenido = await clientes_servicios.contenidos.get(f"/contenidos/{query}/buscar")
+        response_actor = await clientes_servicios.contenidos.get(f"/contenidos/{query}/actores")
 
         # Almacenar resultados si las respuestas son exitosas
         if response_contenido.status_code == 200:
@@ -336,6 +310,16 @@ async def buscar(request: Request, query: str, tipo: str):
     else:
         raise HTTPException(status_code=400, detail="Tipo de búsqueda no válido")
 
+    # Si la búsqueda exacta no encuentra nada se prueba con la búsqueda tolerante a erratas
+    if tipo in ("contenido", "todos") and not contenidos:
+        response = await clientes_servicios.contenidos.get("/buscar/difusa", params={"q": query, "tipo": "contenido"})
+        if response.status_code == 200:
+            contenidos = response.json().get("resultados", [])
+    if tipo in ("actor", "todos") and not actores:
+        response = await clientes_servicios.contenidos.get("/buscar/difusa", params={"q": query, "tipo": "actor"})
+        if response.status_code == 200:
+            actores = response.json().get("resultados", [])
+
     # Si no hay resultados en ninguno de los tipos, asignamos un mensaje
     if not contenidos and not actores:
         mensaje = "No se han encontrado resultados."
@@ -345,7 +329,7 @@ async def buscar(request: Request, query: str, tipo: str):
     if actores:
         for actor in actores:
             # Obtenemos los contenidos relacionados con el actor
-            response_contenidos_actor = requests.get(f"{BASE_URL_CONTENIDOS}/actores/{actor['id']}/contenidos")
+            response_contenidos_actor = await clientes_servicios.contenidos.get(f"/actores/{actor['id']}/contenidos")
             if response_contenidos_actor.status_code == 200:
                 # Guardamos los contenidos del actor en el diccionario usando el id del actor
                 contenidos_por_actor[actor['id']] = response_contenidos_actor.json()
@@ -372,7 +356,7 @@ logging.basicConfig(level=logging.INFO)
 
 @app.get("/pantalla_principal", response_class=HTMLResponse)
 async def pantalla_principal(request: Request, user_id: str = None, mensaje_credenciales: str = None):
-    datos = cargar_datos(user_id)  # Centralizamos la lógica aquí
+    datos = await cargar_datos(user_id)  # Centralizamos la lógica aquí
     mensaje = datos.get("mensaje", "Error al cargar los datos")
 
     # Renderizamos la pantalla principal
@@ -394,9 +378,9 @@ async def pantalla_principal(request: Request, user_id: str = None, mensaje_cred
 @app.get("/usuarios/{user_id}/perfil", response_class=HTMLResponse)
 async def get_user_profile(request: Request, user_id: str, mensaje: str = None):
     # Llama al endpoint /perfil para obtener el perfil de un usuario y lo renderiza en HTML
-    response = requests.get(f"{BASE_URL_USUARIOS}/usuarios/{user_id}")
-    me_gusta_response = requests.get(
-        f"{BASE_URL_INTERACCIONES}/usuarios/{user_id}/me-gusta"
+    response = await clientes_servicios.usuarios.get(f"/usuarios/{user_id}")
+    me_gusta_response = await clientes_servicios.interacciones.get(
+        f"/usuarios/{user_id}/me-gusta"
     )
 
     if response.status_code == 200:
@@ -477,11 +461,11 @@ async def eliminar_interaccion(request: Request):
         )
 
     # Construir la URL de la API de interacciones
-    url = f"{BASE_URL_INTERACCIONES}/usuarios/{id_usuario}/me-gusta/{idContenido}"
+    url = f"/usuarios/{id_usuario}/me-gusta/{idContenido}"
 
     # Realizar la petición DELETE a la API de interacciones
     try:
-        response = requests.delete(url)
+        response = await clientes_servicios.interacciones.delete(url)
 
         # Verificar el estado de la respuesta
         if response.status_code == 200:
@@ -516,11 +500,11 @@ async def actualizar_perfil(request: Request, id_usuario: str):
     payload = {"nombre": nombre, "password": password, "email": email, "idioma": idioma}
 
     # URL del endpoint de la API externa para actualizar el perfil
-    api_url = f"{BASE_URL_USUARIOS}/usuarios/{id_usuario}/perfil"
+    api_url = f"/usuarios/{id_usuario}/perfil"
 
     try:
         # Enviar la solicitud PUT a la API externa
-        response = requests.put(api_url, json=payload)
+        response = await clientes_servicios.usuarios.put(api_url, json=payload)
 
         # Comprobar el estado de la respuesta de la API
         if response.status_code == 200:
@@ -535,7 +519,7 @@ async def actualizar_perfil(request: Request, id_usuario: str):
                 detail="Error al actualizar el perfil en la API externa",
             )
 
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         # Manejar errores de red o conexión
         raise HTTPException(
             status_code=500, detail=f"Error al comunicarse con la API externa: {str(e)}"
@@ -549,7 +533,7 @@ async def obtener_perfil_usuario(user_id: str):
     """
     try:
         # Hacer una solicitud GET al servicio de usuarios para obtener el perfil
-        response = requests.get(f"{BASE_URL_USUARIOS}/usuarios/{user_id}")
+        response = await clientes_servicios.usuarios.get(f"/usuarios/{user_id}")
 
         if response.status_code != 200:
             raise HTTPException(status_code=404, detail="Usuario no encontrado")
@@ -563,7 +547,7 @@ async def obtener_perfil_usuario(user_id: str):
             "email": user_data["email"],
             "idioma": user_data.get("idioma", "es"),  # Asumir 'es' si no está presente
         }
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         # En caso de error al hacer la petición a la API de usuarios
         raise HTTPException(
             status_code=500, detail=f"Error al obtener el perfil del usuario: {str(e)}"
@@ -571,11 +555,11 @@ async def obtener_perfil_usuario(user_id: str):
 
 
 @app.get("/usuarios/{userId}/me-gusta")
-def obtener_me_gusta(userId: str):
+async def obtener_me_gusta(userId: str):
 
     try:
         # Hacer una solicitud GET al servicio de usuarios para obtener el perfil
-        response = requests.get(f"{BASE_URL_INTERACCIONES}/usuarios/{userId}/me-gusta")
+        response = await clientes_servicios.interacciones.get(f"/usuarios/{userId}/me-gusta")
 
         if response.status_code != 200:
             raise HTTPException(
@@ -588,7 +572,7 @@ def obtener_me_gusta(userId: str):
 
         # Devolver los datos del usuario
         return contenidos
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         # En caso de error al hacer la petición a la API de usuarios
         raise HTTPException(
             status_code=500, detail=f"Error al obtener el perfil del usuario: {str(e)}"
@@ -603,7 +587,7 @@ async def get_user_payment_methods(user_id: str):
     """
     # Hacemos la petición GET a la API de usuarios para obtener los métodos de pago
     try:
-        response = requests.get(f"{BASE_URL_USUARIOS}/usuarios/{user_id}/metodos-pago")
+        response = await clientes_servicios.usuarios.get(f"/usuarios/{user_id}/metodos-pago")
 
         # Verificamos si la respuesta fue exitosa
         if response.status_code == 200:
@@ -634,7 +618,7 @@ async def get_user_payment_methods(user_id: str):
                 detail="Error al obtener métodos de pago del usuario",
             )
 
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         raise HTTPException(
             status_code=500, detail=f"Error al comunicar con la API externa: {str(e)}"
         )
@@ -666,8 +650,8 @@ async def add_payment_method(user_id: str, request: Request):
             raise HTTPException(status_code=400, detail="Método de pago no válido")
 
         # Realizar la solicitud POST al servicio de la API de usuarios para agregar el método de pago
-        response = requests.post(
-            f"{BASE_URL_USUARIOS}/usuarios/{user_id}/metodos-pago", json=data
+        response = await clientes_servicios.usuarios.post(
+            f"/usuarios/{user_id}/metodos-pago", json=data
         )
 
         if response.status_code != 200:
@@ -685,11 +669,11 @@ async def add_payment_method(user_id: str, request: Request):
 
 @app.get("/admin_menu", response_class=HTMLResponse)
 async def admin_menu(request: Request):
-    peliculas_response = requests.get(f"{BASE_URL_CONTENIDOS}/todopeliculas")
-    series_response = requests.get(f"{BASE_URL_CONTENIDOS}/series")
-    actores_response = requests.get(f"{BASE_URL_CONTENIDOS}/actores")
-    directores_response = requests.get(f"{BASE_URL_CONTENIDOS}/directores")
-    generos_response = requests.get(f"{BASE_URL_CONTENIDOS}/generos")
+    peliculas_response = await clientes_servicios.contenidos.get("/todopeliculas")
+    series_response = await clientes_servicios.contenidos.get("/series")
+    actores_response = await clientes_servicios.contenidos.get("/actores")
+    directores_response = await clientes_servicios.contenidos.get("/directores")
+    generos_response = await clientes_servicios.contenidos.get("/generos")
 
     if peliculas_response.status_code == 200:
         peliculas = peliculas_response.json()
@@ -726,7 +710,7 @@ async def admin_menu(request: Request):
 @app.get("/administrador/usuarios", response_class=HTMLResponse)
 async def lista_usuarios(request: Request):
     # Realizamos la solicitud al microservicio de usuarios
-    response = requests.get(f"{BASE_URL_USUARIOS}/usuarios")
+    response = await clientes_servicios.usuarios.get("/usuarios")
     if response.status_code != 200:
         raise HTTPException(
             status_code=500, detail="No se pudieron obtener los usuarios."
@@ -750,18 +734,18 @@ async def crear_pelicula_form(request: Request):
     Muestra el formulario para crear una película.
     """
     # Obtener los géneros y directores desde el microservicio de contenidos
-    generos_response = requests.get(f"{BASE_URL_CONTENIDOS}/generos")
+    generos_response = await clientes_servicios.contenidos.get("/generos")
 
     generos = generos_response.json() if generos_response.status_code == 200 else []
     
     # Realizar una solicitud GET a la API de contenidos para obtener la lista de directores
-    directores_response = requests.get(f"{BASE_URL_CONTENIDOS}/directores")
+    directores_response = await clientes_servicios.contenidos.get("/directores")
 
     # Verifica si la respuesta fue exitosa
     directores = directores_response.json() if directores_response.status_code == 200 else []
 
     # Realizar una solicitud GET a la API de contenidos para obtener la lista de actores
-    actores_response = requests.get(f"{BASE_URL_CONTENIDOS}/actores")
+    actores_response = await clientes_servicios.contenidos.get("/actores")
 
     # Verifica si la respuesta fue exitosa
     actores = actores_response.json() if actores_response.status_code == 200 else []    
@@ -802,23 +786,22 @@ async def crear_pelicula(
         "idDirector": idDirector,
     }
 
-    response = requests.post(f"{BASE_URL_CONTENIDOS}/peliculas", json=data)
+    response = await clientes_servicios.contenidos.post("/peliculas", json=data)
 
     if response.status_code == 200:
         idPelicula = response.json().get("id")
 
-        # Añadir los actores uno por uno al reparto del contenido
-        for idActor in actores:
-            response = requests.post(f"{BASE_URL_CONTENIDOS}/contenidos/{idPelicula}/reparto/{idActor}")
+        # Se envía el reparto completo en una sola petición
+        response = await clientes_servicios.contenidos.put(f"/contenidos/{idPelicula}/reparto", json={"actores": actores})
 
-            if response.status_code != 200:
-                return templates.TemplateResponse(
-                    TEMPLATE_CREAR_PELICULA_HTML,
-                    {
-                        "request": request,
-                        "error_message": f"Error al añadir el actor al reparto. Por favor, inténtelo de nuevo.",
-                    }
-                )
+        if response.status_code != 200:
+            return templates.TemplateResponse(
+                TEMPLATE_CREAR_PELICULA_HTML,
+                {
+                    "request": request,
+                    "error_message": f"Error al añadir el actor al reparto. Por favor, inténtelo de nuevo.",
+                }
+            )
 
         redirect_response = RedirectResponse(url=f"/admin_menu", status_code=303)
         redirect_response.set_cookie(
@@ -842,12 +825,12 @@ async def crear_serie_form(request: Request):
     Muestra el formulario para crear una serie.
     """
     # Obtener los géneros y directores desde el microservicio de contenidos
-    generos_response = requests.get(f"{BASE_URL_CONTENIDOS}/generos")
+    generos_response = await clientes_servicios.contenidos.get("/generos")
 
     generos = generos_response.json() if generos_response.status_code == 200 else []
 
     # Realizar una solicitud GET a la API de contenidos para obtener la lista de actores
-    actores_response = requests.get(f"{BASE_URL_CONTENIDOS}/actores")
+    actores_response = await clientes_servicios.contenidos.get("/actores")
 
     # Verifica si la respuesta fue exitosa
     actores = actores_response.json() if actores_response.status_code == 200 else []      
@@ -885,23 +868,22 @@ async def crear_serie(
         "idDirector": None,
     }
 
-    response = requests.post(f"{BASE_URL_CONTENIDOS}/series", json=data)
+    response = await clientes_servicios.contenidos.post("/series", json=data)
 
     if response.status_code == 200:
         idSerie = response.json().get("id")
 
-        # Añadir los actores uno por uno al reparto del contenido
-        for idActor in actores:
-            response = requests.post(f"{BASE_URL_CONTENIDOS}/contenidos/{idSerie}/reparto/{idActor}")
+        # Se envía el reparto completo en una sola petición
+        response = await clientes_servicios.contenidos.put(f"/contenidos/{idSerie}/reparto", json={"actores": actores})
 
-            if response.status_code != 200:
-                return templates.TemplateResponse(
-                    TEMPLATE_CREAR_SERIE_HTML,
-                    {
-                        "request": request,
-                        "error_message": f"Error al añadir el actor al reparto. Por favor, inténtelo de nuevo.",
-                    }
-                )
+        if response.status_code != 200:
+            return templates.TemplateResponse(
+                TEMPLATE_CREAR_SERIE_HTML,
+                {
+                    "request": request,
+                    "error_message": f"Error al añadir el actor al reparto. Por favor, inténtelo de nuevo.",
+                }
+            )
 
         redirect_response = RedirectResponse(url=f"/admin_menu", status_code=303)
         redirect_response.set_cookie(
@@ -930,7 +912,7 @@ async def crear_temporada_form(request: Request):
     Muestra el formulario para crear una temporada de una serie.
     """
     # Obtener los géneros y directores desde el microservicio de contenidos
-    series_response = requests.get(f"{BASE_URL_CONTENIDOS}/todoseries")
+    series_response = await clientes_servicios.contenidos.get("/todoseries")
 
     series = series_response.json() if series_response.status_code == 200 else []
 
@@ -957,7 +939,7 @@ async def crear_temporada(
         "numeroTemporada": numeroTemporada
     }
 
-    response = requests.post(f"{BASE_URL_CONTENIDOS}/contenidos/{id_serie}/temporadas", json=data)
+    response = await clientes_servicios.contenidos.post(f"/contenidos/{id_serie}/temporadas", json=data)
 
     if response.status_code == 200:
         redirect_response = RedirectResponse(url="/admin_menu", status_code=303)
@@ -994,7 +976,7 @@ async def obtener_temporadas(idSerie: str):
     Endpoint para obtener todas las temporadas de una serie específica.
     """
     # Obtener temporadas desde el microservicio de contenidos
-    response = requests.get(f"{BASE_URL_CONTENIDOS}/contenidos/{idSerie}/temporadas")
+    response = await clientes_servicios.contenidos.get(f"/contenidos/{idSerie}/temporadas")
     if response.status_code != 200:
         raise HTTPException(status_code=500, detail="Error al obtener las temporadas.")
     
@@ -1008,11 +990,11 @@ async def crear_episodio_form(request: Request):
     Muestra el formulario para crear un episodio.
     """
     # Obtener todas las series desde el microservicio de contenidos
-    series_response = requests.get(f"{BASE_URL_CONTENIDOS}/todoseries")
+    series_response = await clientes_servicios.contenidos.get("/todoseries")
     series = series_response.json() if series_response.status_code == 200 else []
 
     # Realizar una solicitud GET a la API de contenidos para obtener la lista de directores
-    directores_response = requests.get(f"{BASE_URL_CONTENIDOS}/directores")
+    directores_response = await clientes_servicios.contenidos.get("/directores")
 
     # Verifica si la respuesta fue exitosa
     directores = directores_response.json() if directores_response.status_code == 200 else []
@@ -1047,8 +1029,8 @@ async def crear_episodio(
     }
 
     # Hacer la solicitud POST al microservicio de contenidos
-    response = requests.post(
-        f"{BASE_URL_CONTENIDOS}/contenidos/{idSerie}/temporadas/{idTemporada}/episodios",
+    response = await clientes_servicios.contenidos.post(
+        f"/contenidos/{idSerie}/temporadas/{idTemporada}/episodios",
         json=data,
     )
 
@@ -1083,7 +1065,7 @@ async def crear_genero(
         "descripcion": descripcion,
     }
 
-    response = requests.post(f"{BASE_URL_CONTENIDOS}/generos", json=data)
+    response = await clientes_servicios.contenidos.post("/generos", json=data)
 
     if response.status_code == 200:
         redirect_response = RedirectResponse(url="/admin_menu", status_code=303)
@@ -1102,11 +1084,11 @@ async def crear_genero(
 
 @app.get("/administrador/peliculas/{idPelicula}", response_class=HTMLResponse)
 async def get_actualizar_pelicula(request: Request, idPelicula: str):
-    response = requests.get(f"{BASE_URL_CONTENIDOS}/contenidos/{idPelicula}")
-    generos_response = requests.get(f"{BASE_URL_CONTENIDOS}/generos")
-    directores_response = requests.get(f"{BASE_URL_CONTENIDOS}/directores")
-    actores_response = requests.get(f"{BASE_URL_CONTENIDOS}/actores")
-    reparto_response = requests.get(f"{BASE_URL_CONTENIDOS}/contenidos/{idPelicula}/reparto")
+    response = await clientes_servicios.contenidos.get(f"/contenidos/{idPelicula}")
+    generos_response = await clientes_servicios.contenidos.get("/generos")
+    directores_response = await clientes_servicios.contenidos.get("/directores")
+    actores_response = await clientes_servicios.contenidos.get("/actores")
+    reparto_response = await clientes_servicios.contenidos.get(f"/contenidos/{idPelicula}/reparto")
 
     if response.status_code == 200:
         # Obtiene los datos de la pelicula
@@ -1239,15 +1221,17 @@ async def actualizar_pelicula(request: Request, idPelicula: str, actores: list[s
     }
 
     # URL del endpoint de la API externa para actualizar la pelicula
-    api_url = f"{BASE_URL_CONTENIDOS}/peliculas/{idPelicula}"
+    api_url = f"/peliculas/{idPelicula}"
 
     # Enviar la solicitud PUT a la API externa
-    response = requests.put(api_url, json=payload)
+    response = await clientes_servicios.contenidos.put(api_url, json=payload)
 
     # Comprobar el estado de la respuesta de la API
     if response.status_code == 200:
-        response_delete = requests.delete(f"{BASE_URL_CONTENIDOS}/contenidos/{idPelicula}/reparto")
-        if response_delete.status_code != 200:
+        # Se envía el reparto completo: el servicio añade y elimina solo las diferencias
+        response = await clientes_servicios.contenidos.put(f"/contenidos/{idPelicula}/reparto", json={"actores": actores})
+
+        if response.status_code != 200:
             return templates.TemplateResponse(
                 "admin_actualizar_pelicula.html",
                 {
@@ -1256,19 +1240,6 @@ async def actualizar_pelicula(request: Request, idPelicula: str, actores: list[s
                 }
             )
 
-        # Añadir los actores uno por uno al reparto del contenido
-        for idActor in actores:
-            response = requests.post(f"{BASE_URL_CONTENIDOS}/contenidos/{idPelicula}/reparto/{idActor}")
-
-            if response.status_code != 200:
-                return templates.TemplateResponse(
-                    "admin_actualizar_pelicula.html",
-                    {
-                        "request": request,
-                        "error_message": f"Error al añadir el actor al reparto. Por favor, inténtelo de nuevo.",
-                    }
-                )
-
         redirect_response = RedirectResponse(url=f"/admin_menu", status_code=303)
         redirect_response.set_cookie(
             key="success_message", value="Película actualizada exitosamente", max_age=5
@@ -1288,10 +1259,10 @@ async def actualizar_pelicula(request: Request, idPelicula: str, actores: list[s
 
 @app.get("/administrador/series/{idSerie}", response_class=HTMLResponse)
 async def get_actualizar_serie(request: Request, idSerie: str):
-    response = requests.get(f"{BASE_URL_CONTENIDOS}/contenidos/{idSerie}")
-    generos_response = requests.get(f"{BASE_URL_CONTENIDOS}/generos")
-    actores_response = requests.get(f"{BASE_URL_CONTENIDOS}/actores")
-    reparto_response = requests.get(f"{BASE_URL_CONTENIDOS}/contenidos/{idSerie}/reparto")    
+    response = await clientes_servicios.contenidos.get(f"/contenidos/{idSerie}")
+    generos_response = await clientes_servicios.contenidos.get("/generos")
+    actores_response = await clientes_servicios.contenidos.get("/actores")
+    reparto_response = await clientes_servicios.contenidos.get(f"/contenidos/{idSerie}/reparto")    
 
     if response.status_code == 200:
         # Obtiene los datos de la serie
@@ -1399,15 +1370,17 @@ async def actualizar_serie(request: Request, idSerie: str, actores: list[str] =
     }
 
     # URL del endpoint de la API externa para actualizar la serie
-    api_url = f"{BASE_URL_CONTENIDOS}/series/{idSerie}"
+    api_url = f"/series/{idSerie}"
 
     # Enviar la solicitud PUT a la API externa
-    response = requests.put(api_url, json=payload)
+    response = await clientes_servicios.contenidos.put(api_url, json=payload)
 
     # Comprobar el estado de la respuesta de la API
     if response.status_code == 200:
-        response_delete = requests.delete(f"{BASE_URL_CONTENIDOS}/contenidos/{idSerie}/reparto")
-        if response_delete.status_code != 200:
+        # Se envía el reparto completo: el servicio añade y elimina solo las diferencias
+        response = await clientes_servicios.contenidos.put(f"/contenidos/{idSerie}/reparto", json={"actores": actores})
+
+        if response.status_code != 200:
             return templates.TemplateResponse(
                 "admin_actualizar_serie.html",
                 {
@@ -1416,19 +1389,6 @@ async def actualizar_serie(request: Request, idSerie: str, actores: list[str] =
                 }
             )
 
-        # Añadir los actores uno por uno al reparto del contenido
-        for idActor in actores:
-            response = requests.post(f"{BASE_URL_CONTENIDOS}/contenidos/{idSerie}/reparto/{idActor}")
-
-            if response.status_code != 200:
-                return templates.TemplateResponse(
-                    "admin_actualizar_serie.html",
-                    {
-                        "request": request,
-                        "error_message": f"Error al añadir el actor al reparto. Por favor, inténtelo de nuevo.",
-                    }
-                )
-
         redirect_response = RedirectResponse(url=f"/admin_menu", status_code=303)
         redirect_response.set_cookie(
             key="success_message", value="Serie actualizada exitosamente", max_age=5
@@ -1448,8 +1408,8 @@ async def actualizar_serie(request: Request, idSerie: str, actores: list[str] =
     
 @app.get("/administrador/series/{idSerie}/temporadas/{idTemporada}", response_class=HTMLResponse)
 async def get_actualizar_temporada(request: Request, idSerie: str, idTemporada: str):
-    response = requests.get(f"{BASE_URL_CONTENIDOS}/contenidos/{idSerie}/temporadas/{idTemporada}")
-    series_response = requests.get(f"{BASE_URL_CONTENIDOS}/todoseries")
+    response = await clientes_servicios.contenidos.get(f"/contenidos/{idSerie}/temporadas/{idTemporada}")
+    series_response = await clientes_servicios.contenidos.get("/todoseries")
 
     if response.status_code == 200:
         # Obtiene los datos de la serie
@@ -1516,10 +1476,10 @@ async def actualizar_temporada(request: Request, idTemporada: str):
     }
 
     # URL del endpoint de la API externa para actualizar la temporada
-    api_url = f"{BASE_URL_CONTENIDOS}/contenidos/{idSerie}/temporadas/{idTemporada}"
+    api_url = f"/contenidos/{idSerie}/temporadas/{idTemporada}"
 
     # Enviar la solicitud PUT a la API externa
-    response = requests.put(api_url, json=payload)
+    response = await clientes_servicios.contenidos.put(api_url, json=payload)
 
     # Comprobar el estado de la respuesta de la API
     if response.status_code == 200:
@@ -1542,8 +1502,8 @@ async def actualizar_temporada(request: Request, idTemporada: str):
 
 @app.get("/administrador/series/{idSerie}/temporadas/{idTemporada}/episodios/{idEpisodio}", response_class=HTMLResponse)
 async def get_actualizar_episodio(request: Request, idSerie: str, idTemporada: str, idEpisodio: str):
-    response = requests.get(f"{BASE_URL_CONTENIDOS}/contenidos/{idSerie}/temporadas/{idTemporada}/episodios/{idEpisodio}")
-    directores_response = requests.get(f"{BASE_URL_CONTENIDOS}/directores")
+    response = await clientes_servicios.contenidos.get(f"/contenidos/{idSerie}/temporadas/{idTemporada}/episodios/{idEpisodio}")
+    directores_response = await clientes_servicios.contenidos.get("/directores")
 
     if response.status_code == 200:
         # Obtiene los datos de la serie
@@ -1619,10 +1579,10 @@ async def actualizar_episodio(request: Request, idSerie: str, idTemporada: str,
     }
 
     # URL del endpoint de la API externa para actualizar el episodio
-    api_url = f"{BASE_URL_CONTENIDOS}/contenidos/{idSerie}/temporadas/{idTemporada}/episodios/{idEpisodio}"
+    api_url = f"/contenidos/{idSerie}/temporadas/{idTemporada}/episodios/{idEpisodio}"
 
     # Enviar la solicitud PUT a la API externa
-    response = requests.put(api_url, json=payload)
+    response = await clientes_servicios.contenidos.put(api_url, json=payload)
 
     # Comprobar el estado de la respuesta de la API
     if response.status_code == 200:
@@ -1645,7 +1605,7 @@ async def actualizar_episodio(request: Request, idSerie: str, idTemporada: str,
 
 @app.get("/administrador/generos/{idGenero}", response_class=HTMLResponse)
 async def get_actualizar_genero(request: Request, idGenero: str):
-    response = requests.get(f"{BASE_URL_CONTENIDOS}/generos/{idGenero}")
+    response = await clientes_servicios.contenidos.get(f"/generos/{idGenero}")
 
     if response.status_code == 200:
         # Obtiene los datos de la serie
@@ -1692,10 +1652,10 @@ async def actualizar_genero(request: Request, idGenero: str):
     }
 
     # URL del endpoint de la API externa para actualizar el episodio
-    api_url = f"{BASE_URL_CONTENIDOS}/generos/{idGenero}"
+    api_url = f"/generos/{idGenero}"
 
     # Enviar la solicitud PUT a la API externa
-    response = requests.put(api_url, json=payload)
+    response = await clientes_servicios.contenidos.put(api_url, json=payload)
 
     # Comprobar el estado de la respuesta de la API
     if response.status_code == 200:
@@ -1718,16 +1678,16 @@ async def actualizar_genero(request: Request, idGenero: str):
 
 
 @app.get("/peliculas/borrar", response_class=HTMLResponse)
-def borrar_peliculas(request: Request):
+async def borrar_peliculas(request: Request):
     """
     Obtiene la lista de películas desde la API de Contenidos y redirige a la página HTML.
     """
     try:
         # Petición a la API de Contenidos para obtener el listado de películas
-        response = requests.get(f"{BASE_URL_CONTENIDOS}/todopeliculas")
+        response = await clientes_servicios.contenidos.get("/todopeliculas")
         response.raise_for_status()
         peliculas = response.json()
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         return HTMLResponse(
             content=f"<h1>Error al obtener las películas: {e}</h1>", status_code=500
         )
@@ -1741,33 +1701,33 @@ def borrar_peliculas(request: Request):
 
 
 @app.post("/peliculas/{idPelicula}/borrar")
-def borrar_pelicula(idPelicula: str, request: Request):
+async def borrar_pelicula(idPelicula: str, request: Request):
     """
     Realiza una solicitud a la API de Contenidos para eliminar una película.
     """
     try:
         # Petición a la API de Contenidos para borrar la película
-        response = requests.delete(f"{BASE_URL_CONTENIDOS}/contenidos/{idPelicula}")
+        response = await clientes_servicios.contenidos.delete(f"/contenidos/{idPelicula}")
         response.raise_for_status()
         mensaje = response.json().get("message")
 
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         mensaje = f"Error al intentar borrar la película: {e}"
 
     # Redirigir nuevamente al listado de películas
     return RedirectResponse(url=f"/peliculas/borrar?mensaje={mensaje}", status_code=303)              
 
 @app.get("/series/borrar", response_class=HTMLResponse)
-def borrar_series(request: Request):
+async def borrar_series(request: Request):
     """
     Obtiene la lista de series desde la API de Contenidos y redirige a la página HTML.
     """
     try:
         # Petición a la API de Contenidos para obtener el listado de series
-        response = requests.get(f"{BASE_URL_CONTENIDOS}/todoseries")
+        response = await clientes_servicios.contenidos.get("/todoseries")
         response.raise_for_status()
         series = response.json()
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         return HTMLResponse(
             content=f"<h1>Error al obtener las series: {e}</h1>", status_code=500
         )
@@ -1781,33 +1741,33 @@ def borrar_series(request: Request):
 
 
 @app.post("/series/{idSerie}/borrar")
-def borrar_serie(idSerie: str, request: Request):
+async def borrar_serie(idSerie: str, request: Request):
     """
     Realiza una solicitud a la API de Contenidos para eliminar una serie.
     """
     try:
         # Petición a la API de Contenidos para borrar la serie
-        response = requests.delete(f"{BASE_URL_CONTENIDOS}/contenidos/{idSerie}")
+        response = await clientes_servicios.contenidos.delete(f"/contenidos/{idSerie}")
         response.raise_for_status()
         mensaje = response.json().get("message")
 
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         mensaje = f"Error al intentar borrar la serie: {e}"
 
     # Redirigir nuevamente al listado de series
     return RedirectResponse(url=f"/series/borrar?mensaje={mensaje}", status_code=303) 
 
 @app.get("/temporadas/borrar", response_class=HTMLResponse)
-def borrar_temporadas(request: Request):
+async def borrar_temporadas(request: Request):
     """
     Obtiene la lista de series desde la API de Contenidos y redirige a la página HTML.
     """
     try:
         # Petición a la API de Contenidos para obtener el listado de series
-        response = requests.get(f"{BASE_URL_CONTENIDOS}/series")
+        response = await clientes_servicios.contenidos.get("/series")
         response.raise_for_status()
         series = response.json()
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         return HTMLResponse(
             content=f"<h1>Error al obtener las series: {e}</h1>", status_code=500
         )
@@ -1820,17 +1780,17 @@ def borrar_temporadas(request: Request):
     )
 
 @app.post("/series/{idSerie}/temporadas/{idTemporada}/borrar")
-def borrar_temporada(idSerie: str, idTemporada: str, request: Request):
+async def borrar_temporada(idSerie: str, idTemporada: str, request: Request):
     """
     Realiza una solicitud a la API de Contenidos para eliminar una temporada.
     """
     try:
         # Petición a la API de Contenidos para borrar la temporada
-        response = requests.delete(f"{BASE_URL_CONTENIDOS}/contenidos/{idSerie}/temporadas/{idTemporada}")
+        response = await clientes_servicios.contenidos.delete(f"/contenidos/{idSerie}/temporadas/{idTemporada}")
         response.raise_for_status()
         mensaje = response.json().get("message")
 
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         mensaje = f"Error al intentar borrar la temporada: {e}"
 
     # Redirigir nuevamente al listado de series
@@ -1838,16 +1798,16 @@ def borrar_temporada(idSerie: str, idTemporada: str, request: Request):
 
 # Endpoint para admin borrar episodios
 @app.get("/episodios/borrar", response_class=HTMLResponse)
-def borrar_episodios(request: Request):
+async def borrar_episodios(request: Request):
     """
     Obtiene la lista de series desde la API de Contenidos y redirige a la página HTML.
     """
     try:
         # Petición a la API de Contenidos para obtener el listado de series
-        response = requests.get(f"{BASE_URL_CONTENIDOS}/series")
+        response = await clientes_servicios.contenidos.get("/series")
         response.raise_for_status()
         series = response.json()
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         return HTMLResponse(
             content=f"<h1>Error al obtener las series: {e}</h1>", status_code=500
         )
@@ -1860,17 +1820,17 @@ def borrar_episodios(request: Request):
     )
 
 @app.post("/series/{idSerie}/temporadas/{idTemporada}/episodios/{idEpisodio}/borrar")
-def borrar_episodio(idSerie: str, idTemporada: str, idEpisodio: str, request: Request):
+async def borrar_episodio(idSerie: str, idTemporada: str, idEpisodio: str, request: Request):
     """
     Realiza una solicitud a la API de Contenidos para eliminar un episodio.
     """
     try:
         # Petición a la API de Contenidos para borrar el episodio
-        response = requests.delete(f"{BASE_URL_CONTENIDOS}/contenidos/{idSerie}/temporadas/{idTemporada}/episodios/{idEpisodio}")
+        response = await clientes_servicios.contenidos.delete(f"/contenidos/{idSerie}/temporadas/{idTemporada}/episodios/{idEpisodio}")
         response.raise_for_status()
         mensaje = response.json().get("message")
 
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         mensaje = f"Error al intentar borrar el episodio: {e}"
 
     # Redirigir nuevamente al listado de episodios
@@ -1878,16 +1838,16 @@ def borrar_episodio(idSerie: str, idTemporada: str, idEpisodio: str, request: Re
 
 # Endpoints para borrar generos
 @app.get("/generos/borrar", response_class=HTMLResponse)
-def borrar_generos(request: Request):
+async def borrar_generos(request: Request):
     """
     Obtiene la lista de géneros desde la base de datos y redirige a la página HTML.
     """
     try:
         # Petición a la base de datos para obtener el listado de géneros
-        response = requests.get(f"{BASE_URL_CONTENIDOS}/generos")
+        response = await clientes_servicios.contenidos.get("/generos")
         response.raise_for_status()
         generos = response.json()
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         return HTMLResponse(
             content=f"<h1>Error al obtener los géneros: {e}</h1>", status_code=500
         )
@@ -1900,16 +1860,16 @@ def borrar_generos(request: Request):
     )
 
 @app.post("/generos/{idGenero}/borrar")
-def borrar_genero(idGenero: str, request: Request):
+async def borrar_genero(idGenero: str, request: Request):
     """
     Elimina un género de la base de datos.
     """
     try:
         # Petición a la base de datos para borrar el género
-        response = requests.delete(f"{BASE_URL_CONTENIDOS}/generos/{idGenero}")
+        response = await clientes_servicios.contenidos.delete(f"/generos/{idGenero}")
         response.raise_for_status()
         mensaje = response.json().get("message")
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         mensaje = f"Error al intentar borrar el género: {e}"
 
     # Redirigir nuevamente al listado de géneros con el mensaje
@@ -1944,7 +1904,7 @@ async def crear_actor(
     }
 
     # Hacer la solicitud POST al microservicio de contenidos para crear el actor
-    response = requests.post(f"{BASE_URL_CONTENIDOS}/actores", json=data)
+    response = await clientes_servicios.contenidos.post("/actores", json=data)
 
     # Redirigir con un mensaje si el actor se creó correctamente
     if response.status_code == 200:
@@ -1990,7 +1950,7 @@ async def crear_director(
     }
 
     # Hacer la solicitud POST al microservicio de contenidos para crear el director
-    response = requests.post(f"{BASE_URL_CONTENIDOS}/directores", json=data)
+    response = await clientes_servicios.contenidos.post("/directores", json=data)
 
     # Redirigir con un mensaje si el director se creó correctamente
     if response.status_code == 200:
@@ -2011,7 +1971,7 @@ async def crear_director(
 @app.get("/actores/actualizar", response_class=HTMLResponse)
 async def actualizar_actores(request: Request, success: str = None):
     # Realizar una solicitud GET a la API de contenidos para obtener la lista de actores
-    response = requests.get(f"{BASE_URL_CONTENIDOS}/actores")
+    response = await clientes_servicios.contenidos.get("/actores")
 
     # Verifica si la respuesta fue exitosa
     if response.status_code == 200:
@@ -2044,8 +2004,8 @@ async def actualizar_actor(request: Request):
         actores_actualizados.append(actor_data)
 
     for actor in actores_actualizados:
-        response = requests.put(
-            f"{BASE_URL_CONTENIDOS}/actores/{actor['id']}", json=actor
+        response = await clientes_servicios.contenidos.put(
+            f"/actores/{actor['id']}", json=actor
         )
         if response.status_code != 200:
             raise HTTPException(
@@ -2059,16 +2019,16 @@ async def actualizar_actor(request: Request):
 
 # Endpoints para eliminar actores o directores
 @app.get("/actores/borrar", response_class=HTMLResponse)
-def borrar_actores(request: Request):
+async def borrar_actores(request: Request):
     """
     Obtiene la lista de actores desde la API de Contenidos y redirige a la página HTML.
     """
     try:
         # Petición a la API de Contenidos para obtener el listado de actores
-        response = requests.get(f"{BASE_URL_CONTENIDOS}/actores")
+        response = await clientes_servicios.contenidos.get("/actores")
         response.raise_for_status()
         actores = response.json()
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         return HTMLResponse(
             content=f"<h1>Error al obtener actores: {e}</h1>", status_code=500
         )
@@ -2082,17 +2042,17 @@ def borrar_actores(request: Request):
 
 
 @app.post("/actores/{idActor}/borrar")
-def borrar_actor(idActor: str, request: Request):
+async def borrar_actor(idActor: str, request: Request):
     """
     Realiza una solicitud a la API de Contenidos para eliminar un actor.
     """
     try:
         # Petición a la API de Contenidos para borrar el actor
-        response = requests.delete(f"{BASE_URL_CONTENIDOS}/actores/{idActor}")
+        response = await clientes_servicios.contenidos.delete(f"/actores/{idActor}")
         response.raise_for_status()
         mensaje = response.json().get("message")
 
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         mensaje = f"Error al intentar borrar el actor: {e}"
 
     # Redirigir nuevamente al listado de actores
@@ -2100,16 +2060,16 @@ def borrar_actor(idActor: str, request: Request):
 
 
 @app.get("/directores/borrar", response_class=HTMLResponse)
-def borrar_directores(request: Request):
+async def borrar_directores(request: Request):
     """
     Obtiene la lista de directores desde la API de Contenidos y redirige a la página HTML.
     """
     try:
         # Petición a la API de Contenidos para obtener el listado de actores
-        response = requests.get(f"{BASE_URL_CONTENIDOS}/directores")
+        response = await clientes_servicios.contenidos.get("/directores")
         response.raise_for_status()
         directores = response.json()
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         return HTMLResponse(
             content=f"<h1>Error al obtener directores: {e}</h1>", status_code=500
         )
@@ -2123,17 +2083,17 @@ def borrar_directores(request: Request):
 
 
 @app.post("/directores/{idDirector}/borrar")
-def borrar_director(idDirector: str, request: Request):
+async def borrar_director(idDirector: str, request: Request):
     """
     Realiza una solicitud a la API de Contenidos para eliminar un director.
     """
     try:
         # Petición a la API de Contenidos para borrar el actor
-        response = requests.delete(f"{BASE_URL_CONTENIDOS}/directores/{idDirector}")
+        response = await clientes_servicios.contenidos.delete(f"/directores/{idDirector}")
         response.raise_for_status()
         mensaje = response.json().get("message")
 
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         mensaje = f"Error al intentar borrar el director: {e}"
 
     # Redirigir nuevamente al listado de actores
@@ -2146,7 +2106,7 @@ def borrar_director(idDirector: str, request: Request):
 @app.get("/directores/actualizar", response_class=HTMLResponse)
 async def actualizar_directores(request: Request, success: str = None):
     # Realizar una solicitud GET a la API de contenidos para obtener la lista de directores
-    response = requests.get(f"{BASE_URL_CONTENIDOS}/directores")
+    response = await clientes_servicios.contenidos.get("/directores")
 
     # Verifica si la respuesta fue exitosa
     if response.status_code == 200:
@@ -2180,8 +2140,8 @@ async def actualizar_director(request: Request):
         directores_actualizados.append(director_data)
 
     for director in directores_actualizados:
-        response = requests.put(
-            f"{BASE_URL_CONTENIDOS}/directores/{director['id']}", json=director
+        response = await clientes_servicios.contenidos.put(
+            f"/directores/{director['id']}", json=director
         )
         if response.status_code != 200:
             raise HTTPException(
@@ -2192,115 +2152,84 @@ async def actualizar_director(request: Request):
 
 # Endpoints para dar / quitar me-gusta
 @app.post("/contenidos/{user_id}/dar-me-gusta/{idContenido}")
-def dar_me_gusta(user_id: str, idContenido: str):
+async def dar_me_gusta(user_id: str, idContenido: str):
     
     try:
         # Petición a la API de Contenidos para dar me gusta
-        response = requests.post(f"{BASE_URL_INTERACCIONES}/usuarios/{user_id}/me-gusta/{idContenido}")
+        response = await clientes_servicios.interacciones.post(f"/usuarios/{user_id}/me-gusta/{idContenido}")
         response.raise_for_status()
         mensaje = response.json().get("message")
 
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         mensaje = f"Error al dar me gusta: {e}"
 
 @app.delete("/contenidos/{user_id}/eliminar-me-gusta/{idContenido}")
-def eliminar_me_gusta(user_id: str, idContenido: str):
+async def eliminar_me_gusta(user_id: str, idContenido: str):
     
     try:
         # Petición a la API de Interacciones para eliminar me gusta
-        response = requests.delete(f"{BASE_URL_INTERACCIONES}/usuarios/{user_id}/me-gusta/{idContenido}")
+        response = await clientes_servicios.interacciones.delete(f"/usuarios/{user_id}/me-gusta/{idContenido}")
         response.raise_for_status()
         mensaje = response.json().get("message")
 
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         mensaje = f"Error al eliminar me gusta: {e}"
 
 # Endpoints para aniadir / eliminar de LP
 @app.post("/contenidos/{userId}/aniadir_a_LP/{contentId}")
-def aniadir_a_LP(userId: str, contentId: str):
+async def aniadir_a_LP(userId: str, contentId: str):
     
     try:
         # Petición a la API de Interacciones para aniadir a LP
-        response = requests.post(f"{BASE_URL_INTERACCIONES}/usuarios/{userId}/listaPersonalizada/{contentId}")
+        response = await clientes_servicios.interacciones.post(f"/usuarios/{userId}/listaPersonalizada/{contentId}")
         response.raise_for_status()
         mensaje = response.json().get("message")
 
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         mensaje = f"Error al aniadir a LP: {e}"
 
 @app.delete("/contenidos/{user_id}/eliminar_de_LP/{idContenido}")
-def eliminar_de_LP(user_id: str, idContenido: str):
+async def eliminar_de_LP(user_id: str, idContenido: str):
     
     try:
         # Petición a la API de Contenidos para eliminar de LP
-        response = requests.delete(f"{BASE_URL_INTERACCIONES}/usuarios/{user_id}/listaPersonalizada/{idContenido}")
+        response = await clientes_servicios.interacciones.delete(f"/usuarios/{user_id}/listaPersonalizada/{idContenido}")
         response.raise_for_status()
         mensaje = response.json().get("message")
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         mensaje = f"Error al eliminar de LP: {e}"
 
-@app.get("/contenidos/{user_id}/esta_en_lista/{idContenido}")
-def esta_en_lista(user_id: str, idContenido: str):
-    # Realizar la solicitud al endpoint para obtener la lista personalizada del usuario
-    response = requests.get(f"{BASE_URL_INTERACCIONES}/usuarios/{user_id}/listaPersonalizada")
-
-    # Verificar si la solicitud fue exitosa
-    if response.status_code == 200:
-        try:
-            # Procesar la respuesta JSON (lista de contenidos)
-            lista_personalizada = response.json()
-            
-            # Buscar el contenido por su ID en la lista personalizada
-            for contenido in lista_personalizada:
-                if contenido["id"] == idContenido:  # Si el ID coincide, devolver True
-                    return True
-            
-            # Si no se encuentra el contenido, devolver False
-            return False
-        except ValueError:
-            # Manejar errores si la respuesta no es JSON válido
-            raise HTTPException(
-                status_code=500,
-                detail="La respuesta del servidor no contiene un JSON válido."
-            )
-    else:
-        # Si la solicitud falla, devolver un mensaje de error
+async def obtener_estado_contenido(user_id: str, idContenido: str) -> dict:
+    """
+    Pide a Interacciones el estado del contenido para el usuario ("me gusta", lista personalizada,
+    historial y valoración) sin descargar sus listas completas.
+    """
+    response = await clientes_servicios.interacciones.post(f"/usuarios/{user_id}/estado", json={"ids": [idContenido]})
+    if response.status_code != 200:
         raise HTTPException(
             status_code=response.status_code,
-            detail=f"Error al obtener la lista personalizada: {response.text}"
+            detail=f"Error al obtener el estado del contenido: {response.text}"
         )
+    try:
+        return response.json()[idContenido]
+    except (ValueError, KeyError):
+        # Manejar errores si la respuesta no es JSON válido
+        raise HTTPException(
+            status_code=500,
+            detail="La respuesta del servidor no contiene un JSON válido."
+        )
+
+
+@app.get("/contenidos/{user_id}/esta_en_lista/{idContenido}")
+async def esta_en_lista(user_id: str, idContenido: str):
+    estado = await obtener_estado_contenido(user_id, idContenido)
+    return estado["enLista"]
 
 
 @app.get("/contenidos/{user_id}/esta_en_mg/{idContenido}")
-def esta_en_mg(user_id: str, idContenido: str):
-    # Realizar la solicitud al endpoint para obtener los contenidos marcados como "Me gusta"
-    response = requests.get(f"{BASE_URL_INTERACCIONES}/usuarios/{user_id}/me-gusta")
-    
-    # Verificar si la solicitud fue exitosa
-    if response.status_code == 200:
-        try:
-            # Procesar la respuesta JSON (debe ser una lista de objetos que cumplen con ContenidoMeGusta)
-            me_gusta = response.json()
-            
-            # Buscar el contenido por su ID en la lista de "Me gusta"
-            for contenido in me_gusta:
-                if contenido["id"] == idContenido:  # Si el ID coincide, devolver True
-                    return True
-            
-            # Si no se encuentra el contenido, devolver False
-            return False
-        except ValueError:
-            # Manejar errores si la respuesta no es JSON válido
-            raise HTTPException(
-                status_code=500,
-                detail="La respuesta del servidor no contiene un JSON válido."
-            )
-    else:
-        # Si la solicitud falla, devolver un mensaje de error
-        raise HTTPException(
-            status_code=response.status_code,
-            detail=f"Error al obtener los contenidos 'Me gusta': {response.text}"
-        )
+async def esta_en_mg(user_id: str, idContenido: str):
+    estado = await obtener_estado_contenido(user_id, idContenido)
+    return estado["meGusta"]
     
 @app.post("/usuarios/{userId}/valorarContenido/{contentId}")
 async def valorarContenido(userId: str, contentId: str, request: Request):
@@ -2314,7 +2243,7 @@ async def valorarContenido(userId: str, contentId: str, request: Request):
 
         valoracion = body["valoracion"]
 
-        response = requests.post(f"{BASE_URL_INTERACCIONES}/usuarios/{userId}/valoraciones/{contentId}?valoracion={valoracion}")
+        response = await clientes_servicios.interacciones.post(f"/usuarios/{userId}/valoraciones/{contentId}?valoracion={valoracion}")
 
         if response.status_code == 200:
             return {"message": "Valoración enviada correctamente", "data": response.json()}
@@ -2323,7 +2252,7 @@ async def valorarContenido(userId: str, contentId: str, request: Request):
                 status_code=response.status_code,
                 detail=f"Error al procesar la valoración: {response.text}",
             )
-    except requests.RequestException as e:
+    except httpx.HTTPError as e:
         print("Error al conectar con el servicio:", e)  # Log para depurar
         raise HTTPException(status_code=500, detail=f"Error al conectarse al servicio: {e}")
     except Exception as e:
@@ -2332,14 +2261,14 @@ async def valorarContenido(userId: str, contentId: str, request: Request):
     
 # Endpoint para obtener todos los contenidos (para HTML)
 @app.get("/administrador/contenidos")
-def obtener_todos_los_contenidos():
+async def obtener_todos_los_contenidos():
     """
     Endpoint en el servicio de Streamflix que llama al microservicio Contenido
     para obtener todos los contenidos.
     """
     try:
         # Realiza la llamada al microservicio Contenido
-        response = requests.get(f"{BASE_URL_CONTENIDOS}/contenidos")
+        response = await clientes_servicios.contenidos.get("/contenidos")
         
         # Maneja errores de la respuesta
         response.raise_for_status()
@@ -2347,20 +2276,20 @@ def obtener_todos_los_contenidos():
         # Devuelve los contenidos obtenidos
         return response.json()
     
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         # Lanza una excepción HTTP si hay algún error en la llamada
         raise HTTPException(status_code=500, detail=f"Error al obtener los contenidos: {e}")
     
 # Endpoint para obtener todos los subtitulos de un contenido (para HTML)
 @app.get("/administrador/contenidos/{idSubtitulosContenido}/subtitulos")
-def obtener_subtitulos_contenido(idSubtitulosContenido: str):
+async def obtener_subtitulos_contenido(idSubtitulosContenido: str):
     """
     Endpoint en el servicio de Interface que llama al microservicio Contenido
     para obtener los subtítulos de un contenido específico.
     """
     try:
         # Realiza la llamada al microservicio Contenido para obtener los subtítulos
-        response = requests.get(f"{BASE_URL_CONTENIDOS}/contenidos/{idSubtitulosContenido}/subtitulos")
+        response = await clientes_servicios.contenidos.get(f"/contenidos/{idSubtitulosContenido}/subtitulos")
         
         # Maneja errores de la respuesta
         response.raise_for_status()
@@ -2368,20 +2297,20 @@ def obtener_subtitulos_contenido(idSubtitulosContenido: str):
         # Devuelve los subtítulos obtenidos
         return response.json()
     
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         # Lanza una excepción HTTP si hay algún error en la llamada
         raise HTTPException(status_code=500, detail=f"Error al obtener los subtítulos: {e}")
 
 # Endpoint para obtener todos los subtitulos (para HTML)
 @app.get("/administrador/contenidos/subtitulos")
-def obtener_todos_los_subtitulos():
+async def obtener_todos_los_subtitulos():
     """
     Endpoint en el servicio de Interface que llama al microservicio Contenido
     para obtener todos los subtítulos disponibles.
     """
     try:
         # Realiza la llamada al microservicio Contenido para obtener todos los subtítulos
-        response = requests.get(f"{BASE_URL_CONTENIDOS}/contenidos/subtitulos")
+        response = await clientes_servicios.contenidos.get("/contenidos/subtitulos")
         
         # Maneja errores de la respuesta
         response.raise_for_status()
@@ -2389,7 +2318,7 @@ def obtener_todos_los_subtitulos():
         # Devuelve la lista de subtítulos obtenida
         return response.json()
     
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         # Lanza una excepción HTTP si hay algún error en la llamada
         raise HTTPException(status_code=500, detail=f"Error al obtener los subtítulos: {e}")
     
@@ -2404,7 +2333,7 @@ async def eliminar_subtitulos(
     """
     try:
         # Realiza la llamada DELETE al microservicio Contenido para eliminar el subtítulo
-        response = requests.delete(f"{BASE_URL_CONTENIDOS}/contenidos/{idSubtitulosContenido}/subtitulos/{idSubtitulo}")
+        response = await clientes_servicios.contenidos.delete(f"/contenidos/{idSubtitulosContenido}/subtitulos/{idSubtitulo}")
         
         # Maneja errores de la respuesta
         response.raise_for_status()
@@ -2412,7 +2341,7 @@ async def eliminar_subtitulos(
         # Redirige a la página de actualización de subtítulos con un mensaje de éxito
         return RedirectResponse(url="/administrador/actualizar_subtitulos?success=true&success_message=Se%20han%20actualizado%20los%20subtitulos%20del%20contenido", status_code=303)
     
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         # Lanza una excepción HTTP si hay algún error en la llamada
         raise HTTPException(status_code=500, detail=f"Error al eliminar subtítulo: {e}")
     
@@ -2420,8 +2349,8 @@ async def eliminar_subtitulos(
 @app.get("/administrador/actualizar_subtitulos",  response_class=HTMLResponse)
 async def actualizar_subtitulos(request: Request, success: str = None):
     # Realizar una solicitud GET a la API de contenidos para obtener los subtitulos y los contenidos
-    responseSub = requests.get(f"{BASE_URL_CONTENIDOS}/contenidos/subtitulos")
-    responseCont = requests.get(f"{BASE_URL_CONTENIDOS}/contenidos")
+    responseSub = await clientes_servicios.contenidos.get("/contenidos/subtitulos")
+    responseCont = await clientes_servicios.contenidos.get("/contenidos")
 
     # Verifica si la respuesta fue exitosa
     if responseCont.status_code == 200 and responseSub.status_code == 200:
@@ -2454,8 +2383,8 @@ async def actualizar_subtitulos(
         
 
         # Realiza la llamada GET al endpoint /contenidos/{idContenido}/subtitulos para obtener los subtítulos asignados
-        response_check = requests.get(
-            f"{BASE_URL_CONTENIDOS}/contenidos/{idSubtitulosContenido}/subtitulos"
+        response_check = await clientes_servicios.contenidos.get(
+            f"/contenidos/{idSubtitulosContenido}/subtitulos"
         )
 
         # Si la respuesta es exitosa, obtenemos los subtítulos asignados
@@ -2474,8 +2403,8 @@ async def actualizar_subtitulos(
             )
 
         # Si no está asignado, intenta añadirlo
-        response = requests.post(
-            f"{BASE_URL_CONTENIDOS}/contenidos/{idSubtitulosContenido}/subtitulos/{idSubtitulo}"
+        response = await clientes_servicios.contenidos.post(
+            f"/contenidos/{idSubtitulosContenido}/subtitulos/{idSubtitulo}"
         )
 
         # Verifica si la llamada al backend fue exitosa
@@ -2487,20 +2416,20 @@ async def actualizar_subtitulos(
             status_code=303
         )
 
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         # Lanza una excepción HTTP si hay algún error en la llamada
         raise HTTPException(status_code=500, detail=f"Error al asignar subtítulo: {e}")
     
 # Endpoint para obtener todos los doblajes de un contenido (para HTML)
 @app.get("/administrador/contenidos/{idDoblajeContenido}/doblajes")
-def obtener_doblajes_contenido(idDoblajeContenido: str):
+async def obtener_doblajes_contenido(idDoblajeContenido: str):
     """
     Endpoint en el servicio de Interface que llama al microservicio Contenido
     para obtener los doblajes de un contenido específico.
     """
     try:
         # Realiza la llamada al microservicio Contenido para obtener los doblajes
-        response = requests.get(f"{BASE_URL_CONTENIDOS}/contenidos/{idDoblajeContenido}/doblajes")
+        response = await clientes_servicios.contenidos.get(f"/contenidos/{idDoblajeContenido}/doblajes")
         
         # Maneja errores de la respuesta
         response.raise_for_status()
@@ -2508,20 +2437,20 @@ def obtener_doblajes_contenido(idDoblajeContenido: str):
         # Devuelve los doblajes obtenidos
         return response.json()
     
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         # Lanza una excepción HTTP si hay algún error en la llamada
         raise HTTPException(status_code=500, detail=f"Error al obtener los doblajes: {e}")
     
 # Endpoint para obtener todos los doblajes (para HTML)
 @app.get("/administrador/contenidos/doblajes")
-def obtener_todos_los_doblajes():
+async def obtener_todos_los_doblajes():
     """
     Endpoint en el servicio de Interface que llama al microservicio Contenido
     para obtener todos los doblajes disponibles.
     """
     try:
         # Realiza la llamada al microservicio Contenido para obtener todos los doblajes
-        response = requests.get(f"{BASE_URL_CONTENIDOS}/contenidos/doblajes")
+        response = await clientes_servicios.contenidos.get("/contenidos/doblajes")
         
         # Maneja errores de la respuesta
         response.raise_for_status()
@@ -2529,7 +2458,7 @@ def obtener_todos_los_doblajes():
         # Devuelve la lista de doblajes obtenida
         return response.json()
     
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         # Lanza una excepción HTTP si hay algún error en la llamada
         raise HTTPException(status_code=500, detail=f"Error al obtener los doblajes: {e}")
     
@@ -2544,7 +2473,7 @@ async def eliminar_doblajes(
     """
     try:
         # Realiza la llamada DELETE al microservicio Contenido para eliminar el doblaje
-        response = requests.delete(f"{BASE_URL_CONTENIDOS}/contenidos/{idDoblajeContenido}/doblajes/{idDoblaje}")
+        response = await clientes_servicios.contenidos.delete(f"/contenidos/{idDoblajeContenido}/doblajes/{idDoblaje}")
         
         # Maneja errores de la respuesta
         response.raise_for_status()
@@ -2552,7 +2481,7 @@ async def eliminar_doblajes(
         # Redirige a la página de actualización de doblajes con un mensaje de éxito
         return RedirectResponse(url="/administrador/actualizar_doblajes?success=true&success_message=Se%20han%20actualizado%20los%20doblajes%20del%20contenido", status_code=303)
     
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         # Lanza una excepción HTTP si hay algún error en la llamada
         raise HTTPException(status_code=500, detail=f"Error al eliminar doblaje: {e}")
     
@@ -2560,8 +2489,8 @@ async def eliminar_doblajes(
 @app.get("/administrador/actualizar_doblajes",  response_class=HTMLResponse)
 async def actualizar_doblajes(request: Request, success: str = None):
     # Realizar una solicitud GET a la API de contenidos para obtener la lista de directores
-    responseDobl = requests.get(f"{BASE_URL_CONTENIDOS}/contenidos/doblajes")
-    responseCont = requests.get(f"{BASE_URL_CONTENIDOS}/contenidos")
+    responseDobl = await clientes_servicios.contenidos.get("/contenidos/doblajes")
+    responseCont = await clientes_servicios.contenidos.get("/contenidos")
 
     # Verifica si la respuesta fue exitosa
     if responseCont.status_code == 200 and responseDobl.status_code == 200:
@@ -2593,8 +2522,8 @@ async def actualizar_doblajes(
     """
     try:
         # Realiza la llamada GET al endpoint /contenidos/{idContenido}/doblajes para obtener los doblajes asignados
-        response_check = requests.get(
-            f"{BASE_URL_CONTENIDOS}/contenidos/{idDoblajeContenido}/doblajes"
+        response_check = await clientes_servicios.contenidos.get(
+            f"/contenidos/{idDoblajeContenido}/doblajes"
         )
 
         # Si la respuesta es exitosa, obtenemos los doblajes asignados
@@ -2613,8 +2542,8 @@ async def actualizar_doblajes(
             )
 
         # Si no está asignado, intenta añadirlo
-        response = requests.post(
-            f"{BASE_URL_CONTENIDOS}/contenidos/{idDoblajeContenido}/doblajes/{idDoblaje}"
+        response = await clientes_servicios.contenidos.post(
+            f"/contenidos/{idDoblajeContenido}/doblajes/{idDoblaje}"
         )
 
         # Verifica si la llamada al backend fue exitosa
@@ -2626,7 +2555,7 @@ async def actualizar_doblajes(
             status_code=303
         )
 
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         # Lanza una excepción HTTP si hay algún error en la llamada
         raise HTTPException(status_code=500, detail=f"Error al asignar doblaje: {e}")
     
@@ -2638,7 +2567,7 @@ async def administrar_subtitulos_idiomas(
     Renderiza la página de administración de subtítulos y muestra mensajes según el estado de las operaciones.
     """
     # Realizar una solicitud GET a la API de contenidos para obtener los subtítulos
-    responseSub = requests.get(f"{BASE_URL_CONTENIDOS}/contenidos/subtitulos")
+    responseSub = await clientes_servicios.contenidos.get("/contenidos/subtitulos")
 
     # Verifica si la respuesta fue exitosa
     if responseSub.status_code == 200:
@@ -2669,8 +2598,8 @@ async def crear_subtitulo(nuevoIdioma: str = Form(...)):
         idSubtitulo = str(uuid.uuid4())[:8]  # Puedes ajustar el formato del ID según sea necesario
 
         # Enviar la solicitud al microservicio
-        response = requests.post(
-            f"{BASE_URL_CONTENIDOS}/contenidos/subtitulos/{idSubtitulo}/{nuevoIdioma}"
+        response = await clientes_servicios.contenidos.post(
+            f"/contenidos/subtitulos/{idSubtitulo}/{nuevoIdioma}"
         )
         response.raise_for_status()  # Lanza una excepción si el backend falla
 
@@ -2680,7 +2609,7 @@ async def crear_subtitulo(nuevoIdioma: str = Form(...)):
             status_code=303,
         )
 
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         # Redirige al mismo HTML con un mensaje de error
         return RedirectResponse(
             url=f"/administrador/administrar_subtitulos_idiomas?success=false&message=Error%20al%20crear%20el%20subtítulo",
@@ -2696,7 +2625,7 @@ async def eliminar_subtitulo(idSubtitulo: str = Form(...)):
     """
     try:
         # Realizar la solicitud DELETE al backend
-        response = requests.delete(f"{BASE_URL_CONTENIDOS}/contenidos/subtitulos/{idSubtitulo}")
+        response = await clientes_servicios.contenidos.delete(f"/contenidos/subtitulos/{idSubtitulo}")
         response.raise_for_status()  # Lanza una excepción si el backend falla
 
         # Redirige al mismo HTML con un mensaje de éxito
@@ -2705,7 +2634,7 @@ async def eliminar_subtitulo(idSubtitulo: str = Form(...)):
             status_code=303,
         )
 
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         # Redirige al mismo HTML con un mensaje de error
         return RedirectResponse(
             url=f"/administrador/administrar_subtitulos_idiomas?success=false&message=Error%20al%20eliminar%20el%20subtítulo",
@@ -2720,7 +2649,7 @@ async def administrar_doblajes_idiomas(
     Renderiza la página de administración de doblajes y muestra mensajes según el estado de las operaciones.
     """
     # Realizar una solicitud GET a la API de contenidos para obtener los doblajes
-    responseSub = requests.get(f"{BASE_URL_CONTENIDOS}/contenidos/doblajes")
+    responseSub = await clientes_servicios.contenidos.get("/contenidos/doblajes")
 
     # Verifica si la respuesta fue exitosa
     if responseSub.status_code == 200:
@@ -2751,8 +2680,8 @@ async def crear_doblaje(nuevoIdioma: str = Form(...)):
         idDoblaje = str(uuid.uuid4())[:8]  # Puedes ajustar el formato del ID según sea necesario
 
         # Enviar la solicitud al microservicio
-        response = requests.post(
-            f"{BASE_URL_CONTENIDOS}/contenidos/doblajes/{idDoblaje}/{nuevoIdioma}"
+        response = await clientes_servicios.contenidos.post(
+            f"/contenidos/doblajes/{idDoblaje}/{nuevoIdioma}"
         )
         response.raise_for_status()  # Lanza una excepción si el backend falla
 
@@ -2762,7 +2691,7 @@ async def crear_doblaje(nuevoIdioma: str = Form(...)):
             status_code=303,
         )
 
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         # Redirige al mismo HTML con un mensaje de error
         return RedirectResponse(
             url=f"/administrador/administrar_doblajes_idiomas?success=false&message=Error%20al%20crear%20el%20doblaje",
@@ -2778,7 +2707,7 @@ async def eliminar_doblaje(idDoblaje: str = Form(...)):
     """
     try:
         # Realizar la solicitud DELETE al backend
-        response = requests.delete(f"{BASE_URL_CONTENIDOS}/contenidos/doblajes/{idDoblaje}")
+        response = await clientes_servicios.contenidos.delete(f"/contenidos/doblajes/{idDoblaje}")
         response.raise_for_status()  # Lanza una excepción si el backend falla
 
         # Redirige al mismo HTML con un mensaje de éxito
@@ -2787,7 +2716,7 @@ async def eliminar_doblaje(idDoblaje: str = Form(...)):
             status_code=303,
         )
 
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         # Redirige al mismo HTML con un mensaje de error
         return RedirectResponse(
             url=f"/administrador/administrar_doblajes_idiomas?success=false&message=Error%20al%20eliminar%20el%20doblaje",
@@ -2797,15 +2726,15 @@ async def eliminar_doblaje(idDoblaje: str = Form(...)):
 
 #Endpoint para acceder a la lista de planes de suscripción para actualizarlo o cambiarlo
 @app.get("/usuarios/{user_id}/plan_suscripcion")
-def obtener_planes_de_suscripcion(request: Request, user_id: str, mensaje: str = None):
+async def obtener_planes_de_suscripcion(request: Request, user_id: str, mensaje: str = None):
     # Se obtienen todos los planes de suscripcion
-    response = requests.get(f"{BASE_URL_USUARIOS}/planes-suscripcion")
+    response = await clientes_servicios.usuarios.get("/planes-suscripcion")
     if response.status_code != 200:
         mensaje = "Error: no se ha encontrado ningún Plan de Suscripción"
     planes_suscripcionBD = response.json()
     
     # Se obtiene el id del plan de suscripción que posee el usuario
-    response = requests.get(f"{BASE_URL_USUARIOS}/usuarios/{user_id}")
+    response = await clientes_servicios.usuarios.get(f"/usuarios/{user_id}")
     if response.status_code != 200:
         mensaje = "Error: No se ha podido obtener el Plan del Usuario"
     usuario = response.json()
@@ -2832,8 +2761,8 @@ async def actualizar_plan(request: Request, user_id: str, plan_id: str = Form(..
     }
 
     # Hacer la solicitud PUT al servicio de usuarios
-    response = requests.put(
-        f"{BASE_URL_USUARIOS}/usuarios/{user_id}/suscripcion",
+    response = await clientes_servicios.usuarios.put(
+        f"/usuarios/{user_id}/suscripcion",
         json=data
     )
 
@@ -2847,15 +2776,15 @@ async def actualizar_plan(request: Request, user_id: str, plan_id: str = Form(..
     )
 
 @app.post("/usuarios/{user_id}/cancelar_suscripcion")
-def cancelar_suscripcion(request: Request, user_id: str):
+async def cancelar_suscripcion(request: Request, user_id: str):
     data = {
         "accion": "cancelar",
         "idPlanSuscripcion": None
     }
 
     # Hacer la solicitud PUT al servicio de usuarios
-    response = requests.put(
-        f"{BASE_URL_USUARIOS}/usuarios/{user_id}/suscripcion",
+    response = await clientes_servicios.usuarios.put(
+        f"/usuarios/{user_id}/suscripcion",
         json=data
     )
 
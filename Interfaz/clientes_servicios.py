@@ -0,0 +1,186 @@
+import asyncio
+import os
+from collections import OrderedDict
+import httpx
+
+"""
+Autor: Grupo GA01 - ASEE
+Versión: 1.0
+Descripción: Clientes HTTP de la interfaz Streamflix hacia los microservicios de
+contenidos, usuarios e interacciones. Son asíncronos (los endpoints de la interfaz son
+async) y cada uno mantiene su pool de conexiones, reintenta las peticiones fallidas y
+revalida con If-None-Match las respuestas GET que ya tiene guardadas. Se crean en el
+arranque de Streamflix (lifespan) y se cierran al pararlo.
+"""
+
+"""
+
+Acceso a los microservicios antes de realizar los cambios de Docker
+
+BASE_URL_CONTENIDOS = "http://127.0.0.1:8000"
+BASE_URL_USUARIOS = "http://127.0.0.1:8001"
+BASE_URL_INTERACCIONES = "http://127.0.0.1:8002"
+
+"""
+
+BASE_URL_CONTENIDOS = os.getenv("BASE_URL_CONTENIDOS", "http://contenidos:8000")  # Nombre del servicio 'contenidos' en docker-compose.yml
+BASE_URL_USUARIOS = os.getenv("BASE_URL_USUARIOS", "http://usuarios:8001")  # Nombre del servicio 'usuarios' en docker-compose.yml
+BASE_URL_INTERACCIONES = os.getenv("BASE_URL_INTERACCIONES", "http://interacciones:8002")  # Nombre del servicio 'interacciones' en docker-compose.yml
+
+# Configuración del pool de conexiones, timeouts (segundos) y reintentos
+HTTP_MAX_CONEXIONES = int(os.getenv("HTTP_MAX_CONEXIONES", "50"))
+HTTP_MAX_CONEXIONES_KEEPALIVE = int(os.getenv("HTTP_MAX_CONEXIONES_KEEPALIVE", "20"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "5"))
+HTTP_TIMEOUT_CONEXION = float(os.getenv("HTTP_TIMEOUT_CONEXION", "2"))
+HTTP_REINTENTOS = int(os.getenv("HTTP_REINTENTOS", "2"))
+HTTP_BACKOFF = float(os.getenv("HTTP_BACKOFF", "0.1"))
+# Respuestas GET con ETag que se guardan para revalidarlas con If-None-Match
+HTTP_CACHE_VALIDADORES = int(os.getenv("HTTP_CACHE_VALIDADORES", "256"))
+
+# Solo se repiten las peticiones que no cambian el resultado si se ejecutan dos veces. PUT no está:
+# PUT /contenidos/{id}/valoracion y PUT /usuarios/{id}/vistas/{idContenido} suman en contadores,
+# así que solo se repiten si la conexión no llegó a abrirse
+METODOS_IDEMPOTENTES = {"GET", "HEAD", "OPTIONS", "DELETE"}
+ESTADOS_REINTENTABLES = {502, 503, 504}
+
+
+def _configuracion_cliente():
+    return {
+        "limits": httpx.Limits(
+            max_connections=HTTP_MAX_CONEXIONES,
+            max_keepalive_connections=HTTP_MAX_CONEXIONES_KEEPALIVE,
+        ),
+        "timeout": httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_TIMEOUT_CONEXION),
+    }
+
+
+def _debe_reintentar(metodo: str, intento: int, response: httpx.Response = None, error: Exception = None) -> bool:
+    if intento >= HTTP_REINTENTOS:
+        return False
+    if error is not None:
+        # Si no se llegó a abrir la conexión la petición no se envió, así que siempre se puede repetir
+        if isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)):
+            return True
+        return metodo in METODOS_IDEMPOTENTES
+    return metodo in METODOS_IDEMPOTENTES and response.status_code in ESTADOS_REINTENTABLES
+
+
+def _espera(intento: int) -> float:
+    # Espera exponencial: 0.1s, 0.2s, 0.4s...
+    return HTTP_BACKOFF * (2 ** intento)
+
+
+class CacheValidadores:
+    """
+    Guarda el ETag y el cuerpo de las últimas respuestas GET. Si el servicio contesta 304
+    (no ha cambiado) se reutiliza el cuerpo guardado en lugar de volver a descargarlo.
+    """
+
+    def __init__(self, tamano: int):
+        self.tamano = tamano
+        self._entradas = OrderedDict()  # url -> (etag, cabeceras, cuerpo)
+
+    @staticmethod
+    def clave(url: str, kwargs: dict) -> str:
+        return str(httpx.URL(url, params=kwargs.get("params")))
+
+    def preparar(self, clave: str, kwargs: dict):
+        """
+        Añade If-None-Match si hay una copia de esa URL y devuelve la copia (o None).
+        """
+        if self.tamano <= 0 or "If-None-Match" in (kwargs.get("headers") or {}):
+            return None
+        entrada = self._entradas.get(clave)
+        if entrada is not None:
+            kwargs["headers"] = {**(kwargs.get("headers") or {}), "If-None-Match": entrada[0]}
+        return entrada
+
+    def procesar(self, clave: str, entrada, response: httpx.Response) -> httpx.Response:
+        if self.tamano <= 0:
+            return response
+        if response.status_code == 304 and entrada is not None:
+            if clave in self._entradas:
+                self._entradas.move_to_end(clave)
+            _, cabeceras, cuerpo = entrada
+            return httpx.Response(200, headers=cabeceras, content=cuerpo, request=response.request)
+        etag = response.headers.get("ETag")
+        if response.status_code == 200 and etag:
+            cabeceras = {nombre: valor for nombre, valor in response.headers.items()
+                         if nombre.lower() not in ("content-encoding", "transfer-encoding", "content-length")}
+            self._entradas[clave] = (etag, cabeceras, response.content)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.tamano:
+                self._entradas.popitem(last=False)
+        return response
+
+
+class ClienteServicioAsync:
+    """
+    Cliente asíncrono con pool de conexiones para un microservicio.
+    Las rutas son relativas a la URL base del servicio.
+    """
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url
+        self._cliente = httpx.AsyncClient(base_url=base_url, **_configuracion_cliente())
+        self.validadores = CacheValidadores(HTTP_CACHE_VALIDADORES)
+
+    async def request(self, metodo: str, url: str, **kwargs) -> httpx.Response:
+        metodo = metodo.upper()
+        clave = CacheValidadores.clave(url, kwargs) if metodo == "GET" else None
+        entrada = self.validadores.preparar(clave, kwargs) if clave else None
+        intento = 0
+        while True:
+            try:
+                response = await self._cliente.request(metodo, url, **kwargs)
+            except httpx.TransportError as error:
+                if not _debe_reintentar(metodo, intento, error=error):
+                    raise
+            else:
+                if not _debe_reintentar(metodo, intento, response=response):
+                    return self.validadores.procesar(clave, entrada, response) if clave else response
+                await response.aclose()
+            await asyncio.sleep(_espera(intento))
+            intento += 1
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    async def put(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("PUT", url, **kwargs)
+
+    async def delete(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("DELETE", url, **kwargs)
+
+    async def aclose(self):
+        await self._cliente.aclose()
+
+
+# Clientes de cada microservicio (se crean en iniciar_clientes)
+contenidos = None
+usuarios = None
+interacciones = None
+
+
+def iniciar_clientes():
+    """
+    Crea un cliente por microservicio. Se llama una sola vez al arrancar la interfaz.
+    """
+    global contenidos, usuarios, interacciones
+    contenidos = ClienteServicioAsync(BASE_URL_CONTENIDOS)
+    usuarios = ClienteServicioAsync(BASE_URL_USUARIOS)
+    interacciones = ClienteServicioAsync(BASE_URL_INTERACCIONES)
+
+
+async def cerrar_clientes():
+    """
+    Cierra las conexiones abiertas de todos los clientes al parar la interfaz.
+    """
+    global contenidos, usuarios, interacciones
+    for cliente in (contenidos, usuarios, interacciones):
+        if cliente is not None:
+            await cliente.aclose()
+    contenidos = usuarios = interacciones = None
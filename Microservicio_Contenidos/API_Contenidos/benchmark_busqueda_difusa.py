@@ -0,0 +1,128 @@
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+from .busqueda_difusa import IndiceDifuso
+
+"""
+Autor: Grupo GA01 - ASEE
+Versión: 1.0
+Descripción: Benchmark del índice de búsqueda difusa y autocompletado con un catálogo sintético.
+Mide el tiempo de construcción, la memoria ocupada y la latencia de autocompletar, de la
+búsqueda con erratas y de las actualizaciones incrementales. No usa la base de datos.
+
+Comando de ejecución (desde Microservicio_Contenidos o /app en el contenedor):
+    python -m API_Contenidos.benchmark_busqueda_difusa --titulos 1000000
+
+"""
+
+PALABRAS = (
+    "el la los las de del un una sombra noche luz guerra amor ciudad mar rio viaje regreso ultimo primer "
+    "secreto camino tierra fuego hielo sol luna estrella reino imperio hijo padre madre hermano leyenda "
+    "historia misterio silencio tiempo memoria sueño destino corazon alma venganza verano invierno otoño "
+    "primavera bosque montaña desierto isla puerto tren casa jardin ventana puerta espejo sangre oro plata "
+    "acero cristal dragon lobo aguila tigre caballo detective capitan doctor profesor rey reina principe "
+    "princesa guardian cazador ladron espia soldado piloto pirata mago bruja fantasma vampiro robot"
+).split()
+
+NOMBRES = "ana luis maria jose carmen antonio lucia javier elena pablo sara david laura diego marta".split()
+APELLIDOS = "garcia lopez martinez sanchez perez gomez fernandez ruiz diaz moreno alvarez romero navarro".split()
+
+
+def generar_titulo(azar: random.Random, numero: int) -> str:
+    palabras = azar.sample(PALABRAS, azar.randint(2, 5))
+    titulo = " ".join(palabras).capitalize()
+    # Un sufijo numérico evita que se repitan títulos con catálogos grandes
+    return f"{titulo} {numero}" if azar.random() < 0.3 else titulo
+
+
+def introducir_errata(azar: random.Random, texto: str) -> str:
+    posicion = azar.randrange(len(texto))
+    operacion = azar.choice(("borrar", "cambiar", "intercambiar"))
+    if operacion == "borrar":
+        return texto[:posicion] + texto[posicion + 1:]
+    if operacion == "cambiar":
+        return texto[:posicion] + azar.choice("abcdefghijklmnopqrstuvwxyz") + texto[posicion + 1:]
+    return texto[:posicion] + texto[posicion + 1:posicion + 2] + texto[posicion:posicion + 1] + texto[posicion + 2:]
+
+
+def percentiles(tiempos: list) -> str:
+    tiempos = sorted(tiempos)
+    p50 = tiempos[len(tiempos) // 2] * 1000
+    p99 = tiempos[min(len(tiempos) - 1, int(len(tiempos) * 0.99))] * 1000
+    return f"p50 {p50:.3f} ms, p99 {p99:.3f} ms"
+
+
+def medir(funcion, argumentos: list) -> list:
+    tiempos = []
+    for argumento in argumentos:
+        inicio = time.perf_counter()
+        funcion(argumento)
+        tiempos.append(time.perf_counter() - inicio)
+    return tiempos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del índice de búsqueda difusa")
+    parser.add_argument("--titulos", type=int, default=1_000_000, help="Títulos sintéticos del catálogo")
+    parser.add_argument("--personas", type=int, default=50_000, help="Actores y directores sintéticos")
+    parser.add_argument("--consultas", type=int, default=1000, help="Consultas que se miden de cada tipo")
+    parser.add_argument("--semilla", type=int, default=24)
+    parser.add_argument("--tracemalloc", action="store_true",
+                        help="Mide la memoria con tracemalloc (más exacto, pero la construcción es mucho más lenta)")
+    args = parser.parse_args()
+
+    azar = random.Random(args.semilla)
+    titulos = [generar_titulo(azar, numero) for numero in range(args.titulos)]
+    personas = [f"{azar.choice(NOMBRES)} {azar.choice(APELLIDOS)} {azar.choice(APELLIDOS)}".title()
+                for _ in range(args.personas)]
+    documentos = [("contenido", str(numero), titulo) for numero, titulo in enumerate(titulos)]
+    documentos += [("actor", f"a{numero}", nombre) for numero, nombre in enumerate(personas)]
+
+    indice = IndiceDifuso()
+    if args.tracemalloc:
+        tracemalloc.start()
+    memoria_inicial = tracemalloc.get_traced_memory()[0]
+    indice.construir(documentos)
+    memoria_indice = tracemalloc.get_traced_memory()[0] - memoria_inicial
+    tracemalloc.stop()
+
+    estadisticas = indice.estadisticas()
+    print(f"Documentos indexados: {estadisticas['documentos']}")
+    print(f"Trigramas distintos: {estadisticas['trigramas']}, "
+          f"entradas del índice invertido: {estadisticas['entradas_indice_invertido']}, "
+          f"claves de autocompletado: {estadisticas['claves_autocompletado']}")
+    print(f"Construcción: {estadisticas['segundos_construccion']:.2f} s")
+    print(f"Memoria estimada: {estadisticas['memoria_bytes'] / 2**20:.1f} MiB")
+    if args.tracemalloc:
+        print(f"Memoria medida con tracemalloc: {memoria_indice / 2**20:.1f} MiB")
+
+    muestras = [azar.choice(titulos) for _ in range(args.consultas)]
+    prefijos = [muestra[:azar.randint(2, 8)] for muestra in muestras]
+    tiempos = medir(lambda prefijo: indice.autocompletar(prefijo, limite=10), prefijos)
+    print(f"Autocompletar (top 10): {percentiles(tiempos)}")
+
+    erratas = [introducir_errata(azar, muestra) for muestra in muestras]
+    aciertos = 0
+    tiempos = []
+    for original, consulta in zip(muestras, erratas):
+        inicio = time.perf_counter()
+        resultados = indice.buscar(consulta, tipo="contenido", limite=10)
+        tiempos.append(time.perf_counter() - inicio)
+        aciertos += any(resultado["texto"] == original for resultado in resultados)
+    print(f"Búsqueda con erratas (top 10): {percentiles(tiempos)}, "
+          f"título original encontrado en el {100 * aciertos / len(muestras):.1f}% de las consultas")
+
+    nombres = [introducir_errata(azar, azar.choice(personas)) for _ in range(args.consultas)]
+    tiempos = medir(lambda nombre: indice.buscar(nombre, tipo="actor", limite=10), nombres)
+    print(f"Búsqueda de actores con erratas (top 10): {percentiles(tiempos)}")
+
+    tiempos = medir(lambda numero: indice.indexar("contenido", str(numero), generar_titulo(azar, numero)),
+                    [azar.randrange(args.titulos) for _ in range(args.consultas)])
+    print(f"Actualización de un título: {percentiles(tiempos)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
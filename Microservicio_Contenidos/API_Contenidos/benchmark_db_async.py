@@ -0,0 +1,117 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+"""
+Autor: Grupo GA01 - ASEE
+Versión: 1.0
+Descripción: Benchmark de los endpoints de lectura con el pool de hilos (DB_ASYNC=0) frente al
+bucle de eventos con aiosqlite (DB_ASYNC=1) sobre la misma carga.
+Cada modo se ejecuta en un proceso aparte (DB_ASYNC se lee al importar la aplicación) con una
+copia de la base de datos y la caché de lecturas desactivada, para que todas las peticiones
+lleguen a SQLite. Las peticiones se hacen en el propio proceso con httpx.ASGITransport, así
+que la medida no incluye la red ni el servidor HTTP.
+
+Comando de ejecución (desde Microservicio_Contenidos o /app en el contenedor):
+    python -m API_Contenidos.benchmark_db_async --concurrencia 64 --segundos 10
+
+"""
+
+MODOS = {"hilos": "0", "eventos": "1"}
+
+
+def rutas_carga(db_path: str, azar: random.Random) -> list:
+    conexion = sqlite3.connect(db_path)
+    try:
+        ids = [fila[0] for fila in conexion.execute('SELECT id FROM "Contenido"')]
+    finally:
+        conexion.close()
+    rutas = ["/generos", "/todopeliculas", "/contenidos?limit=50", "/actores"]
+    rutas += [f"/contenidos/{id}" for id in ids]
+    rutas += [f"/contenidos/{id}/reparto" for id in ids]
+    azar.shuffle(rutas)
+    return rutas
+
+
+async def generar_carga(concurrencia: int, segundos: float, rutas: list) -> dict:
+    import httpx
+    from .main import app
+
+    latencias = []
+    errores = 0
+    fin = time.perf_counter() + segundos
+
+    async def cliente(numero: int, http):
+        nonlocal errores
+        posicion = numero
+        while time.perf_counter() < fin:
+            inicio = time.perf_counter()
+            try:
+                response = await http.get(rutas[posicion % len(rutas)])
+                errores += response.status_code >= 500
+            except Exception:
+                # ASGITransport propaga las excepciones de la aplicación (p. ej. el pool de conexiones agotado)
+                errores += 1
+            latencias.append(time.perf_counter() - inicio)
+            posicion += concurrencia
+
+    transporte = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transporte, base_url="http://benchmark") as http:
+        inicio = time.perf_counter()
+        await asyncio.gather(*(cliente(numero, http) for numero in range(concurrencia)))
+        duracion = time.perf_counter() - inicio
+
+    latencias.sort()
+    return {
+        "peticiones_s": len(latencias) / duracion,
+        "p50_ms": latencias[len(latencias) // 2] * 1000,
+        "p99_ms": latencias[min(len(latencias) - 1, int(len(latencias) * 0.99))] * 1000,
+        "errores": errores,
+    }
+
+
+def ejecutar_modo(modo: str, args) -> dict:
+    with tempfile.TemporaryDirectory() as directorio:
+        db_path = os.path.join(directorio, "contenidos.db")
+        shutil.copy(args.db, db_path)
+        entorno = dict(os.environ, DB_PATH=db_path, DB_ASYNC=MODOS[modo], CACHE_TTL="0")
+        proceso = subprocess.run(
+            [sys.executable, "-m", "API_Contenidos.benchmark_db_async", "--hijo",
+             "--concurrencia", str(args.concurrencia), "--segundos", str(args.segundos)],
+            env=entorno, capture_output=True, text=True, check=True,
+        )
+    # La última línea de la salida del proceso hijo es el resultado en JSON
+    return json.loads(proceso.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de pool de hilos frente a bucle de eventos")
+    parser.add_argument("--db", default="contenidos.db", help="Base de datos de partida (se copia)")
+    parser.add_argument("--concurrencia", type=int, default=64, help="Peticiones simultáneas")
+    parser.add_argument("--segundos", type=float, default=10.0)
+    parser.add_argument("--hijo", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.hijo:
+        rutas = rutas_carga(os.environ["DB_PATH"], random.Random(15))
+        print(json.dumps(asyncio.run(generar_carga(args.concurrencia, args.segundos, rutas))))
+        return 0
+
+    print(f"{'modo':8} {'peticiones/s':>13} {'p50 (ms)':>9} {'p99 (ms)':>9} {'errores':>8}")
+    for modo in MODOS:
+        resultado = ejecutar_modo(modo, args)
+        print(f"{modo:8} {resultado['peticiones_s']:13.0f} {resultado['p50_ms']:9.1f} "
+              f"{resultado['p99_ms']:9.1f} {resultado['errores']:8d}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from . import configuracion_sqlite
+
+"""
+Autor: Grupo GA01 - ASEE
+Versión: 1.0
+Descripción: Benchmark de los perfiles de SQLite de configuracion_sqlite.py.
+Para cada perfil crea una base de datos temporal y mide, durante unos segundos, cuántas
+lecturas y escrituras por segundo se completan con varios hilos lectores y escritores a la vez
+(cada hilo con su propia conexión del pool), además de los commits por segundo de un único
+escritor. Las variables SQLITE_* del entorno no se aplican para que los perfiles sean comparables.
+
+Comando de ejecución (desde Microservicio_Contenidos o /app en el contenedor):
+    python -m API_Contenidos.benchmark_sqlite_perfiles --lectores 8 --escritores 2 --segundos 5
+
+"""
+
+
+def crear_motor(ruta: str, perfil: str, conexiones: int):
+    engine = create_engine(
+        f"sqlite:///{ruta}",
+        connect_args={"check_same_thread": False},
+        pool_size=conexiones,
+        max_overflow=0,
+    )
+    configuracion_sqlite.configurar_motor(engine, perfil)
+    return engine
+
+
+def preparar_datos(engine, filas: int):
+    with engine.begin() as conexion:
+        conexion.execute(text("CREATE TABLE catalogo (id TEXT PRIMARY KEY, titulo TEXT, valoracion REAL)"))
+        conexion.execute(
+            text("INSERT INTO catalogo (id, titulo, valoracion) VALUES (:id, :titulo, :valoracion)"),
+            [{"id": str(numero), "titulo": f"Título {numero}", "valoracion": 5.0} for numero in range(filas)],
+        )
+
+
+def commits_secuenciales(engine, filas: int, operaciones: int) -> float:
+    inicio = time.perf_counter()
+    for numero in range(operaciones):
+        with engine.begin() as conexion:
+            conexion.execute(text("UPDATE catalogo SET valoracion = valoracion + 1 WHERE id = :id"),
+                             {"id": str(numero % filas)})
+    return operaciones / (time.perf_counter() - inicio)
+
+
+def carga_concurrente(engine, filas: int, lectores: int, escritores: int, segundos: float) -> dict:
+    contadores = {"lecturas": 0, "escrituras": 0, "bloqueos": 0}
+    lock = threading.Lock()
+    fin = time.perf_counter() + segundos
+
+    def lector(semilla: int):
+        azar = random.Random(semilla)
+        hechas = 0
+        with engine.connect() as conexion:
+            while time.perf_counter() < fin:
+                conexion.execute(text("SELECT titulo, valoracion FROM catalogo WHERE id = :id"),
+                                 {"id": str(azar.randrange(filas))}).fetchall()
+                conexion.rollback()  # Cierra la transacción de lectura para ver los cambios nuevos
+                hechas += 1
+        with lock:
+            contadores["lecturas"] += hechas
+
+    def escritor(semilla: int):
+        azar = random.Random(semilla)
+        hechas = bloqueos = 0
+        with engine.connect() as conexion:
+            while time.perf_counter() < fin:
+                try:
+                    conexion.execute(text("UPDATE catalogo SET valoracion = valoracion + 1 WHERE id = :id"),
+                                     {"id": str(azar.randrange(filas))})
+                    conexion.commit()
+                    hechas += 1
+                except OperationalError:
+                    conexion.rollback()
+                    bloqueos += 1
+        with lock:
+            contadores["escrituras"] += hechas
+            contadores["bloqueos"] += bloqueos
+
+    hilos = [threading.Thread(target=lector, args=(numero,)) for numero in range(lectores)]
+    hilos += [threading.Thread(target=escritor, args=(1000 + numero,)) for numero in range(escritores)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    return {
+        "lecturas_s": contadores["lecturas"] / segundos,
+        "escrituras_s": contadores["escrituras"] / segundos,
+        "bloqueos": contadores["bloqueos"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de los perfiles de rendimiento de SQLite")
+    parser.add_argument("--perfiles", nargs="+", default=list(configuracion_sqlite.PERFILES),
+                        choices=list(configuracion_sqlite.PERFILES))
+    parser.add_argument("--filas", type=int, default=20000)
+    parser.add_argument("--lectores", type=int, default=8)
+    parser.add_argument("--escritores", type=int, default=2)
+    parser.add_argument("--segundos", type=float, default=5.0)
+    parser.add_argument("--commits", type=int, default=500, help="Commits del escritor secuencial")
+    parser.add_argument("--directorio", default=None,
+                        help="Directorio de las bases de datos temporales (mejor en el mismo disco que la real)")
+    args = parser.parse_args()
+
+    for nombre in configuracion_sqlite.AJUSTES:
+        os.environ.pop(f"SQLITE_{nombre.upper()}", None)
+
+    print(f"{'perfil':12} {'commits/s (1 hilo)':>19} {'lecturas/s':>11} {'escrituras/s':>13} {'bloqueos':>9}")
+    for perfil in args.perfiles:
+        with tempfile.TemporaryDirectory(dir=args.directorio) as directorio:
+            engine = crear_motor(os.path.join(directorio, "benchmark.db"), perfil, args.lectores + args.escritores)
+            try:
+                preparar_datos(engine, args.filas)
+                secuencial = commits_secuenciales(engine, args.filas, args.commits)
+                concurrente = carga_concurrente(engine, args.filas, args.lectores, args.escritores, args.segundos)
+            finally:
+                engine.dispose()
+        print(f"{perfil:12} {secuencial:19.0f} {concurrente['lecturas_s']:11.0f} "
+              f"{concurrente['escrituras_s']:13.0f} {concurrente['bloqueos']:9d}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,389 @@
+import os
+import re
+import sys
+import threading
+import time
+import unicodedata
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter
+from heapq import nlargest
+from math import ceil
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from . import models
+from .cache import cache
+
+"""
+Autor: Grupo GA01 - ASEE
+Versión: 1.0
+Descripción: Índice en memoria para búsqueda tolerante a erratas y autocompletado.
+Búsqueda difusa: cada texto (título de contenido, nombre de actor o de director) se descompone
+en trigramas por palabra y se guarda un índice invertido trigrama -> documentos. Una consulta
+puntúa los documentos según la fracción de sus trigramas que comparten, así "padrno" o
+"deniro robrt" siguen encontrando "El Padrino" o "Robert Deniro".
+Autocompletado: lista ordenada de claves (el texto completo y el texto desde cada palabra
+significativa) en la que se busca el prefijo por bisección; las sugerencias salen en orden
+alfabético, con lo que los textos más cortos para un mismo prefijo aparecen primero.
+El índice se construye al arrancar y las funciones de escritura de crud.py lo actualizan. Es local
+a cada proceso: guarda la versión de sus tablas en la base de datos y le suma lo que cambian las
+escrituras del propio proceso, así que una versión distinta solo puede venir de otro proceso (otros
+workers, el comando de importación). Entonces se vuelve a construir en un hilo aparte, sobre un
+índice nuevo que sustituye al actual al terminar: las búsquedas no esperan a la reconstrucción.
+"""
+
+# Tipos de documento que se indexan
+TIPOS = ("contenido", "actor", "director")
+
+# Fracción mínima de trigramas de la consulta que debe tener un resultado
+UMBRAL_SIMILITUD = float(os.getenv("BUSQUEDA_DIFUSA_UMBRAL", "0.5"))
+
+# Tablas de las que salen los documentos del índice
+TABLAS_INDICE = ("Contenido", "Actor", "Director")
+# Segundos entre comprobaciones de si esas tablas han cambiado (ver comprobar_cambios)
+REVISION_SEGUNDOS = float(os.getenv("BUSQUEDA_DIFUSA_REVISION", "30"))
+
+# Palabras más cortas que esto no generan clave de autocompletado propia (de, el, la...)
+LONGITUD_MINIMA_PALABRA = 3
+# Claves de autocompletado como máximo por documento
+MAX_CLAVES_DOCUMENTO = 4
+# Claves que se revisan como máximo por cada sugerencia pedida
+VENTANA_AUTOCOMPLETADO = 20
+
+# Relación de coste entre verificar un candidato y recorrer una entrada del índice invertido
+COSTE_VERIFICACION = 200
+
+_SEPARADOR = "\x00"
+_VACIA = array("I")
+
+# Sentencia de escritura que no cambia nada: abre la transacción de escritura (ningún otro proceso
+# puede confirmar cambios hasta el commit) para leer la versión de partida dentro de ella
+_BLOQUEO_ESCRITURA = text('UPDATE "VersionTabla" SET version = version WHERE 0')
+
+
+def normalizar(texto: str) -> str:
+    """
+    Minúsculas, sin tildes y con cualquier signo de puntuación convertido en espacio.
+    """
+    texto = unicodedata.normalize("NFKD", texto or "")
+    texto = "".join(caracter for caracter in texto if not unicodedata.combining(caracter))
+    return " ".join(re.findall(r"\w+", texto.lower()))
+
+
+def trigramas(texto_normalizado: str) -> set:
+    resultado = set()
+    for palabra in texto_normalizado.split():
+        palabra = f"  {palabra} "
+        for posicion in range(len(palabra) - 2):
+            resultado.add(palabra[posicion:posicion + 3])
+    return resultado
+
+
+def _claves_autocompletado(texto_normalizado: str) -> list:
+    palabras = texto_normalizado.split()
+    claves = [texto_normalizado] if texto_normalizado else []
+    for posicion in range(1, len(palabras)):
+        if len(claves) >= MAX_CLAVES_DOCUMENTO:
+            break
+        if len(palabras[posicion]) >= LONGITUD_MINIMA_PALABRA:
+            claves.append(" ".join(palabras[posicion:]))
+    return claves
+
+
+class IndiceDifuso:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._lock_construccion = threading.Lock()  # Una sola reconstrucción a la vez
+        self.versiones = None  # Versión de TABLAS_INDICE que refleja el índice
+        self.proxima_revision = 0.0
+        self._pendientes = None  # Cambios recibidos durante una reconstrucción (ver construir)
+        self._vaciar()
+
+    def _vaciar(self):
+        self._documentos = []  # posición -> (tipo, id, texto), o None si está libre
+        self._num_trigramas = array("I")  # posición -> número de trigramas del documento
+        self._posiciones = {}  # (tipo, id) -> posición
+        self._libres = []  # posiciones de documentos eliminados que se pueden reutilizar
+        self._trigramas = {}  # trigrama -> array de posiciones
+        self._claves = []  # claves de autocompletado ordenadas: "texto\x00posición"
+        self.segundos_construccion = 0.0
+
+    def _anadir(self, tipo: str, id: str, texto: str, ordenado: bool):
+        normalizado = normalizar(texto)
+        trigramas_documento = trigramas(normalizado)
+        if self._libres:
+            posicion = self._libres.pop()
+            self._documentos[posicion] = (tipo, id, texto)
+            self._num_trigramas[posicion] = len(trigramas_documento)
+        else:
+            posicion = len(self._documentos)
+            self._documentos.append((tipo, id, texto))
+            self._num_trigramas.append(len(trigramas_documento))
+        self._posiciones[(tipo, id)] = posicion
+
+        for trigrama in trigramas_documento:
+            lista = self._trigramas.get(trigrama)
+            if lista is None:
+                lista = self._trigramas[trigrama] = array("I")
+            lista.append(posicion)
+        for clave in _claves_autocompletado(normalizado):
+            clave = f"{clave}{_SEPARADOR}{posicion}"
+            if ordenado:
+                insort(self._claves, clave)
+            else:
+                self._claves.append(clave)
+
+    def _quitar(self, tipo: str, id: str):
+        posicion = self._posiciones.pop((tipo, id), None)
+        if posicion is None:
+            return
+        normalizado = normalizar(self._documentos[posicion][2])
+        for trigrama in trigramas(normalizado):
+            lista = self._trigramas[trigrama]
+            lista.remove(posicion)
+            if not lista:
+                del self._trigramas[trigrama]
+        for clave in _claves_autocompletado(normalizado):
+            clave = f"{clave}{_SEPARADOR}{posicion}"
+            indice = bisect_left(self._claves, clave)
+            if indice < len(self._claves) and self._claves[indice] == clave:
+                del self._claves[indice]
+        self._documentos[posicion] = None
+        self._libres.append(posicion)
+
+    def _aplicar_cambio(self, cambio):
+        # cambio = (versión antes, versión después) de una escritura de este proceso
+        if cambio is not None and self.versiones is not None:
+            antes, despues = cambio
+            self.versiones = tuple(version + d - a for version, a, d in zip(self.versiones, antes, despues))
+
+    def construir(self, documentos, versiones=None):
+        """
+        Sustituye el contenido del índice por los documentos (tipo, id, texto) indicados, leídos con
+        la versión "versiones" (o una función que la lee, a la que se llama antes de recorrer los
+        documentos). El índice nuevo se construye sin bloquear el actual, que sigue atendiendo
+        búsquedas, y los cambios que lleguen mientras tanto se repiten sobre él al final.
+        """
+        with self._lock_construccion:
+            self._construir(documentos, versiones)
+
+    def _construir(self, documentos, versiones):
+        inicio = time.perf_counter()
+        with self._lock:
+            self._pendientes = []
+        nuevo = IndiceDifuso()
+        try:
+            if callable(versiones):
+                versiones = versiones()
+            for tipo, id, texto in documentos:
+                nuevo._anadir(tipo, id, texto, ordenado=False)
+            nuevo._claves.sort()
+        except BaseException:
+            with self._lock:
+                self._pendientes = None
+            raise
+        nuevo.versiones = versiones
+        with self._lock:
+            for operacion, argumentos, cambio in self._pendientes:
+                if operacion == "indexar":
+                    nuevo._quitar(*argumentos[:2])
+                    nuevo._anadir(*argumentos, ordenado=True)
+                else:
+                    nuevo._quitar(*argumentos)
+                # Solo se suman las escrituras que empezaron después de leer "versiones"
+                if cambio is not None and versiones is not None and all(
+                        a >= v for a, v in zip(cambio[0], versiones)):
+                    nuevo._aplicar_cambio(cambio)
+            self._pendientes = None
+            self._documentos, self._num_trigramas = nuevo._documentos, nuevo._num_trigramas
+            self._posiciones, self._libres = nuevo._posiciones, nuevo._libres
+            self._trigramas, self._claves = nuevo._trigramas, nuevo._claves
+            self.versiones = nuevo.versiones
+            self.segundos_construccion = time.perf_counter() - inicio
+
+    def indexar(self, tipo: str, id: str, texto: str, cambio=None):
+        """
+        Añade un documento o lo reemplaza si ya estaba indexado. "cambio" es lo que devuelve
+        fin_escritura para la escritura que lo ha modificado.
+        """
+        with self._lock:
+            self._quitar(tipo, id)
+            self._anadir(tipo, id, texto, ordenado=True)
+            self._aplicar_cambio(cambio)
+            if self._pendientes is not None:
+                self._pendientes.append(("indexar", (tipo, id, texto), cambio))
+
+    def eliminar(self, tipo: str, id: str, cambio=None):
+        with self._lock:
+            self._quitar(tipo, id)
+            self._aplicar_cambio(cambio)
+            if self._pendientes is not None:
+                self._pendientes.append(("eliminar", (tipo, id), cambio))
+
+    def buscar(self, consulta: str, tipo: str = None, limite: int = 10, umbral: float = UMBRAL_SIMILITUD) -> list:
+        """
+        Devuelve [{"tipo", "id", "texto", "similitud"}] de mayor a menor similitud. La similitud es
+        la fracción de trigramas de la consulta presentes en el texto; a igualdad gana el texto
+        más parecido en longitud.
+        """
+        trigramas_consulta = trigramas(normalizar(consulta))
+        if not trigramas_consulta or limite <= 0:
+            return []
+        total = len(trigramas_consulta)
+        minimo = max(1, ceil(umbral * total))
+
+        with self._lock:
+            # Un resultado con al menos "minimo" trigramas comunes tiene que aparecer en alguna de
+            # las (total - minimo + 1) listas más cortas, así que solo esas fijan los candidatos
+            listas = sorted((self._trigramas.get(trigrama, _VACIA) for trigrama in trigramas_consulta), key=len)
+            corte = total - minimo + 1
+            coincidencias = Counter()
+            for lista in listas[:corte]:
+                coincidencias.update(lista)
+            restantes = listas[corte:]
+            if sum(len(lista) for lista in restantes) <= COSTE_VERIFICACION * len(coincidencias):
+                for lista in restantes:
+                    coincidencias.update(lista)
+            else:
+                # Con pocos candidatos sale más barato contar sus trigramas que recorrer listas largas
+                for posicion in coincidencias:
+                    texto = normalizar(self._documentos[posicion][2])
+                    coincidencias[posicion] = len(trigramas_consulta & trigramas(texto))
+
+            candidatos = []
+            for posicion, comunes in coincidencias.items():
+                if comunes < minimo:
+                    continue
+                documento = self._documentos[posicion]
+                if tipo is not None and documento[0] != tipo:
+                    continue
+                jaccard = comunes / (total + self._num_trigramas[posicion] - comunes)
+                candidatos.append((comunes / total, jaccard, documento))
+
+        mejores = nlargest(limite, candidatos, key=lambda candidato: (candidato[0], candidato[1]))
+        return [
+            {"tipo": documento[0], "id": documento[1], "texto": documento[2], "similitud": round(similitud, 3)}
+            for similitud, _, documento in mejores
+        ]
+
+    def autocompletar(self, prefijo: str, tipo: str = None, limite: int = 10) -> list:
+        """
+        Devuelve hasta "limite" sugerencias [{"tipo", "id", "texto"}] cuyo texto (o alguna de sus
+        palabras significativas) empieza por el prefijo.
+        """
+        prefijo = normalizar(prefijo)
+        if not prefijo or limite <= 0:
+            return []
+        sugerencias = []
+        vistas = set()
+        with self._lock:
+            indice = bisect_left(self._claves, prefijo)
+            fin = min(len(self._claves), indice + limite * VENTANA_AUTOCOMPLETADO)
+            while indice < fin and len(sugerencias) < limite:
+                clave = self._claves[indice]
+                indice += 1
+                if not clave.startswith(prefijo):
+                    break
+                posicion = int(clave.rsplit(_SEPARADOR, 1)[1])
+                documento = self._documentos[posicion]
+                if posicion in vistas or (tipo is not None and documento[0] != tipo):
+                    continue
+                vistas.add(posicion)
+                sugerencias.append({"tipo": documento[0], "id": documento[1], "texto": documento[2]})
+        return sugerencias
+
+    def memoria_bytes(self) -> int:
+        """
+        Estimación del tamaño del índice en memoria (contenedores y los objetos que guardan).
+        """
+        with self._lock:
+            total = sys.getsizeof(self._documentos) + sys.getsizeof(self._num_trigramas)
+            total += sys.getsizeof(self._posiciones) + sys.getsizeof(self._libres)
+            total += sys.getsizeof(self._trigramas) + sys.getsizeof(self._claves)
+            for documento in self._documentos:
+                if documento is not None:
+                    total += sys.getsizeof(documento) + sum(sys.getsizeof(valor) for valor in documento)
+            for trigrama, lista in self._trigramas.items():
+                total += sys.getsizeof(trigrama) + sys.getsizeof(lista)
+            total += sum(sys.getsizeof(clave) for clave in self._claves)
+        return total
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            documentos = len(self._posiciones)
+            por_tipo = Counter(tipo for tipo, _ in self._posiciones)
+            trigramas_distintos = len(self._trigramas)
+            entradas = sum(len(lista) for lista in self._trigramas.values())
+            claves = len(self._claves)
+            segundos = self.segundos_construccion
+            reconstruyendo = self._pendientes is not None
+        return {
+            "documentos": documentos,
+            "documentos_por_tipo": dict(por_tipo),
+            "trigramas": trigramas_distintos,
+            "entradas_indice_invertido": entradas,
+            "claves_autocompletado": claves,
+            "segundos_construccion": round(segundos, 3),
+            "reconstruyendo": reconstruyendo,
+            "memoria_bytes": self.memoria_bytes(),
+        }
+
+
+indice = IndiceDifuso()
+
+
+# Documentos (tipo, id, texto) de la base de datos que se indexan
+def documentos_bd(db: Session):
+    for id, titulo in db.query(models.Contenido.id, models.Contenido.titulo):
+        yield "contenido", id, titulo
+    for id, nombre in db.query(models.Actor.id, models.Actor.nombre):
+        yield "actor", id, nombre
+    for id, nombre in db.query(models.Director.id, models.Director.nombre):
+        yield "director", id, nombre
+
+
+# Construye el índice con los datos actuales de la base de datos. La versión se lee antes que los
+# documentos: si otro proceso escribe a la vez, la siguiente comprobación lo vuelve a construir
+def reconstruir(db: Session):
+    indice.construir(documentos_bd(db), lambda: cache.versiones(TABLAS_INDICE, db))
+
+
+# Las escrituras de crud.py en TABLAS_INDICE llaman a inicio_escritura antes de escribir y a
+# fin_escritura justo antes del commit, y pasan el resultado a indice.indexar / indice.eliminar.
+# Como nadie más puede confirmar cambios entre las dos lecturas, la diferencia es exactamente lo que
+# ha cambiado la versión por esa escritura
+def inicio_escritura(db: Session) -> tuple:
+    db.execute(_BLOQUEO_ESCRITURA)
+    return cache.versiones(TABLAS_INDICE, db)
+
+
+def fin_escritura(db: Session, antes: tuple) -> tuple:
+    db.flush()
+    return antes, cache.versiones(TABLAS_INDICE, db)
+
+
+_hilo_reconstruccion = None
+
+
+def _reconstruir_en_segundo_plano():
+    try:
+        with Session(cache.motor) as db:
+            reconstruir(db)
+        print(f"Índice de búsqueda difusa reconstruido en {indice.segundos_construccion:.3f} s.")
+    except Exception as e:
+        print(f"Error al reconstruir el índice de búsqueda difusa: {e}")
+
+
+# Comprueba, como mucho cada REVISION_SEGUNDOS, si otro proceso ha cambiado las tablas del índice.
+# Si es así lo reconstruye en un hilo aparte; la petición que lo detecta no espera
+def comprobar_cambios(db: Session):
+    global _hilo_reconstruccion
+    ahora = time.monotonic()
+    if ahora < indice.proxima_revision:
+        return
+    indice.proxima_revision = ahora + REVISION_SEGUNDOS
+    if cache.versiones(TABLAS_INDICE, db) == indice.versiones:
+        return
+    if _hilo_reconstruccion is None or not _hilo_reconstruccion.is_alive():
+        _hilo_reconstruccion = threading.Thread(target=_reconstruir_en_segundo_plano, daemon=True)
+        _hilo_reconstruccion.start()
@@ -0,0 +1,162 @@
+import re
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+"""
+Autor: Grupo GA01 - ASEE
+Versión: 1.0
+Descripción: Búsqueda de texto completo con índices SQLite FTS5.
+Hay un índice FTS5 por tabla buscable (contenidos, géneros, actores y directores). Los índices
+usan la tabla original como contenido externo (content=...), así que no duplican los textos, y
+se mantienen sincronizados mediante triggers, por lo que cualquier escritura (crud, importaciones
+o SQL directo) queda reflejada. Los resultados se ordenan por relevancia BM25.
+"""
+
+# Tokenizador: separa por caracteres Unicode y no distingue mayúsculas ni tildes
+TOKENIZADOR = "unicode61 remove_diacritics 2"
+
+# tabla FTS -> (tabla original, columnas indexadas)
+INDICES_FTS = {
+    "fts_contenido": ("Contenido", ("titulo", "descripcion")),
+    "fts_genero": ("Genero", ("nombre",)),
+    "fts_actor": ("Actor", ("nombre",)),
+    "fts_director": ("Director", ("nombre",)),
+}
+
+# Peso de cada columna en BM25 (el título cuenta más que la descripción)
+PESOS_CONTENIDO = (10.0, 1.0)
+
+
+def _sentencias_indice(tabla_fts: str, tabla: str, columnas: tuple) -> list:
+    lista = ", ".join(columnas)
+    nuevas = ", ".join(f"new.{columna}" for columna in columnas)
+    antiguas = ", ".join(f"old.{columna}" for columna in columnas)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {tabla_fts} USING fts5("
+        f"{lista}, content='{tabla}', content_rowid='rowid', tokenize='{TOKENIZADOR}')",
+        f"CREATE TRIGGER IF NOT EXISTS {tabla_fts}_ai AFTER INSERT ON \"{tabla}\" BEGIN "
+        f"INSERT INTO {tabla_fts}(rowid, {lista}) VALUES (new.rowid, {nuevas}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {tabla_fts}_ad AFTER DELETE ON \"{tabla}\" BEGIN "
+        f"INSERT INTO {tabla_fts}({tabla_fts}, rowid, {lista}) VALUES ('delete', old.rowid, {antiguas}); END",
+        # Solo cuando cambia el texto indexado (las valoraciones actualizan Contenido continuamente)
+        f"CREATE TRIGGER IF NOT EXISTS {tabla_fts}_au AFTER UPDATE OF {lista} ON \"{tabla}\" BEGIN "
+        f"INSERT INTO {tabla_fts}({tabla_fts}, rowid, {lista}) VALUES ('delete', old.rowid, {antiguas}); "
+        f"INSERT INTO {tabla_fts}(rowid, {lista}) VALUES (new.rowid, {nuevas}); END",
+    ]
+
+
+def inicializar_indices(engine):
+    """
+    Crea los índices FTS5 y sus triggers si no existen. Los índices recién creados se rellenan
+    con los datos que ya hubiera en las tablas. Se puede llamar en cada arranque.
+    """
+    with engine.begin() as conexion:
+        existentes = {
+            fila[0] for fila in conexion.execute(text("SELECT name FROM sqlite_master WHERE type = 'table'"))
+        }
+        for tabla_fts, (tabla, columnas) in INDICES_FTS.items():
+            for sentencia in _sentencias_indice(tabla_fts, tabla, columnas):
+                conexion.execute(text(sentencia))
+            if tabla_fts not in existentes:
+                conexion.execute(text(f"INSERT INTO {tabla_fts}({tabla_fts}) VALUES ('rebuild')"))
+
+
+def recrear_triggers_actualizacion(conexion):
+    """
+    Sentencia de migración: sustituye los triggers de actualización de los índices que ya existen
+    por la definición actual (CREATE TRIGGER IF NOT EXISTS no cambia los que ya están creados).
+    """
+    existentes = {
+        fila[0] for fila in conexion.execute(text("SELECT name FROM sqlite_master WHERE type = 'table'"))
+    }
+    for tabla_fts, (tabla, columnas) in INDICES_FTS.items():
+        if tabla_fts in existentes:
+            conexion.execute(text(f"DROP TRIGGER IF EXISTS {tabla_fts}_au"))
+            conexion.execute(text(_sentencias_indice(tabla_fts, tabla, columnas)[-1]))
+
+
+def reconstruir_indices(engine, tablas_fts=None):
+    """
+    Vuelve a generar los índices (todos o los indicados) desde las tablas originales, p. ej. tras
+    un VACUUM, que puede cambiar los rowid de las tablas, o tras una importación sin triggers.
+    """
+    with engine.begin() as conexion:
+        for tabla_fts in tablas_fts or INDICES_FTS:
+            conexion.execute(text(f"INSERT INTO {tabla_fts}({tabla_fts}) VALUES ('rebuild')"))
+
+
+def eliminar_triggers(engine, tablas) -> list:
+    """
+    Elimina los triggers de los índices de las tablas indicadas (para cargas masivas) y devuelve
+    los índices afectados. Se restauran con inicializar_indices y reconstruir_indices.
+    """
+    afectados = [tabla_fts for tabla_fts, (tabla, _) in INDICES_FTS.items() if tabla in tablas]
+    with engine.begin() as conexion:
+        for tabla_fts in afectados:
+            for sufijo in ("ai", "ad", "au"):
+                conexion.execute(text(f"DROP TRIGGER IF EXISTS {tabla_fts}_{sufijo}"))
+    return afectados
+
+
+def consulta_fts(busqueda: str) -> str:
+    """
+    Convierte el texto del usuario en una consulta FTS5 segura: cada palabra se busca como
+    prefijo ("pala"*) y tienen que aparecer todas. Devuelve "" si no hay palabras.
+    """
+    palabras = re.findall(r"\w+", busqueda)
+    return " ".join(f'"{palabra}"*' for palabra in palabras)
+
+
+def buscar_contenidos(db: Session, busqueda: str, offset: int = 0, limit: int = 50) -> list:
+    """
+    Contenidos cuyo título o descripción coincide con la búsqueda, o cuyo género coincide.
+    Devuelve [{"id", "titulo", "genero"}] ordenado por relevancia.
+    """
+    consulta = consulta_fts(busqueda)
+    if not consulta:
+        return []
+    filas = db.execute(text(f"""
+        WITH coincidencias(id, rango) AS (
+            SELECT c.id, bm25(fts_contenido, {PESOS_CONTENIDO[0]}, {PESOS_CONTENIDO[1]})
+            FROM fts_contenido JOIN "Contenido" AS c ON c.rowid = fts_contenido.rowid
+            WHERE fts_contenido MATCH :consulta
+            UNION ALL
+            SELECT c.id, bm25(fts_genero)
+            FROM fts_genero
+            JOIN "Genero" AS gm ON gm.rowid = fts_genero.rowid
+            JOIN "Contenido" AS c ON c."idGenero" = gm.id
+            WHERE fts_genero MATCH :consulta
+        )
+        SELECT c.id, c.titulo, g.nombre AS genero
+        FROM (SELECT id, MIN(rango) AS rango FROM coincidencias GROUP BY id) AS m
+        JOIN "Contenido" AS c ON c.id = m.id
+        LEFT JOIN "Genero" AS g ON g.id = c."idGenero"
+        ORDER BY m.rango, c.id
+        LIMIT :limit OFFSET :offset
+    """), {"consulta": consulta, "limit": limit, "offset": offset})
+    return [
+        {"id": fila.id, "titulo": fila.titulo, "genero": fila.genero or "Género desconocido"}
+        for fila in filas
+    ]
+
+
+def _buscar_personas(db: Session, tabla_fts: str, tabla: str, busqueda: str, offset: int, limit: int) -> list:
+    consulta = consulta_fts(busqueda)
+    if not consulta:
+        return []
+    filas = db.execute(text(f"""
+        SELECT p.id, p.nombre, p.nacionalidad
+        FROM {tabla_fts} JOIN "{tabla}" AS p ON p.rowid = {tabla_fts}.rowid
+        WHERE {tabla_fts} MATCH :consulta
+        ORDER BY bm25({tabla_fts}), p.id
+        LIMIT :limit OFFSET :offset
+    """), {"consulta": consulta, "limit": limit, "offset": offset})
+    return [{"id": fila.id, "nombre": fila.nombre, "nacionalidad": fila.nacionalidad} for fila in filas]
+
+
+def buscar_actores(db: Session, busqueda: str, offset: int = 0, limit: int = 50) -> list:
+    return _buscar_personas(db, "fts_actor", "Actor", busqueda, offset, limit)
+
+
+def buscar_directores(db: Session, busqueda: str, offset: int = 0, limit: int = 50) -> list:
+    return _buscar_personas(db, "fts_director", "Director", busqueda, offset, limit)
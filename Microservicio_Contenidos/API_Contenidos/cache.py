@@ -0,0 +1,241 @@
+import functools
+import hashlib
+import inspect
+import os
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy import text
+
+"""
+Autor: Grupo GA01 - ASEE
+Versión: 1.0
+Descripción: Caché en memoria (TTL + LRU) para las lecturas del catálogo.
+Cada entrada se guarda junto con la versión de las tablas de las que depende. Las versiones están
+en la tabla VersionTabla de la propia base de datos y las incrementan triggers de SQLite en cada
+fila insertada, modificada o borrada, dentro de la misma transacción que la escritura: solo cuentan
+las escrituras confirmadas y da igual quién las haga (este proceso, otro worker, los comandos de
+importación y compactación o SQL directo). Al leer se consultan las versiones actuales, así que una
+entrada antigua deja de ser accesible en cuanto se confirma el cambio y acaba saliendo por LRU o TTL.
+Las valoraciones de los contenidos tienen su propia versión: al valorar no se descarta el catálogo
+cacheado, solo se vuelven a leer la media y el número de valoraciones de los contenidos servidos.
+Las mismas versiones sirven para generar los ETag de las respuestas (ver etag_tablas).
+"""
+
+CACHE_TAMANO = int(os.getenv("CACHE_TAMANO", "2048"))  # Número máximo de entradas
+CACHE_TTL = float(os.getenv("CACHE_TTL", "60"))  # Segundos que vive cada entrada
+
+# Tablas del catálogo con versión en VersionTabla
+TABLAS_VERSIONADAS = ("Contenido", "Temporada", "Episodio", "Trailer", "Genero", "Reparto", "Actor", "Director",
+                      "SubtituloContenido", "Subtitulo", "DoblajeContenido", "Doblaje")
+
+# Versión aparte para la media y el número de valoraciones de los contenidos: valorar un contenido no
+# cambia la versión de Contenido, así que no invalida el catálogo cacheado (ver cacheado)
+VALORACIONES = "Valoraciones"
+COLUMNAS_VALORACION = ("valoracionPromedio", "sumaValoraciones", "numeroValoraciones")
+
+# Fila de VersionTabla con un número aleatorio fijado al crear la tabla: si la base de datos se vuelve
+# a crear, las versiones empiezan de nuevo en 0 pero los ETag no se repiten
+GENERACION = "*"
+
+_CONSULTA_VERSIONES = text('SELECT tabla, version FROM "VersionTabla"')
+
+
+def _trigger_version(nombre: str, evento: str, tabla: str, version: str) -> str:
+    return (f'CREATE TRIGGER IF NOT EXISTS "version_{nombre}" AFTER {evento} ON "{tabla}" '
+            f'BEGIN UPDATE "VersionTabla" SET version = version + 1 WHERE tabla = \'{version}\'; END')
+
+
+def triggers_version(tabla: str) -> dict:
+    """
+    Triggers (nombre -> sentencia) que incrementan la versión de la tabla en cada fila escrita. En
+    Contenido, las actualizaciones que solo tocan las valoraciones incrementan VALORACIONES.
+    """
+    actualizacion = "UPDATE"
+    triggers = {}
+    if tabla == "Contenido":
+        from . import models  # Importación diferida: models importa database, que importa este módulo
+        columnas = [columna.name for columna in models.Contenido.__table__.columns
+                    if columna.name not in COLUMNAS_VALORACION]
+        actualizacion = "UPDATE OF " + ", ".join(f'"{columna}"' for columna in columnas)
+        triggers[f"{VALORACIONES}_au"] = _trigger_version(
+            f"{VALORACIONES}_au", "UPDATE OF " + ", ".join(f'"{columna}"' for columna in COLUMNAS_VALORACION),
+            tabla, VALORACIONES)
+    for sufijo, evento in (("ai", "INSERT"), ("ad", "DELETE"), ("au", actualizacion)):
+        triggers[f"{tabla}_{sufijo}"] = _trigger_version(f"{tabla}_{sufijo}", evento, tabla, tabla)
+    return triggers
+
+
+def _versiones_de(tabla: str) -> tuple:
+    return (tabla, VALORACIONES) if tabla == "Contenido" else (tabla,)
+
+
+def crear_versionado(conexion):
+    """
+    Crea (si no existen) VersionTabla, sus filas y los triggers de cada tabla versionada.
+    Se llama en cada arranque, después de las migraciones.
+    """
+    conexion.execute(text('CREATE TABLE IF NOT EXISTS "VersionTabla" (tabla VARCHAR NOT NULL PRIMARY KEY, '
+                          'version INTEGER NOT NULL DEFAULT 0)'))
+    conexion.execute(text('INSERT OR IGNORE INTO "VersionTabla" (tabla, version) VALUES (:tabla, random())'),
+                     {"tabla": GENERACION})
+    for tabla in TABLAS_VERSIONADAS:
+        for version in _versiones_de(tabla):
+            conexion.execute(text('INSERT OR IGNORE INTO "VersionTabla" (tabla, version) VALUES (:tabla, 0)'),
+                             {"tabla": version})
+        for sentencia in triggers_version(tabla).values():
+            conexion.execute(text(sentencia))
+
+
+def eliminar_triggers_version(conexion, tablas):
+    """
+    Elimina los triggers de versión de las tablas indicadas (para cargas masivas). Se restauran con
+    restaurar_triggers_version, que además incrementa una vez la versión de cada tabla.
+    """
+    for tabla in tablas:
+        for nombre in triggers_version(tabla):
+            conexion.execute(text(f'DROP TRIGGER IF EXISTS "version_{nombre}"'))
+
+
+def restaurar_triggers_version(conexion, tablas):
+    for tabla in tablas:
+        for sentencia in triggers_version(tabla).values():
+            conexion.execute(text(sentencia))
+        for version in _versiones_de(tabla):
+            conexion.execute(text('UPDATE "VersionTabla" SET version = version + 1 WHERE tabla = :tabla'),
+                             {"tabla": version})
+
+
+class CacheCatalogo:
+    def __init__(self, tamano: int, ttl: float):
+        self.tamano = tamano
+        self.ttl = ttl
+        self._entradas = OrderedDict()  # clave -> (instante de caducidad, valor)
+        self._motor = None  # Motor con el que se leen las versiones fuera de una petición
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.expulsiones = 0
+
+    def usar_motor(self, engine):
+        self._motor = engine
+
+    @property
+    def motor(self):
+        return self._motor
+
+    def _leer_versiones(self, db=None) -> dict:
+        if db is not None:
+            return dict(db.execute(_CONSULTA_VERSIONES).all())
+        with self._motor.connect() as conexion:
+            return dict(conexion.execute(_CONSULTA_VERSIONES).all())
+
+    def versiones(self, tablas, db=None) -> tuple:
+        """
+        Generación de la base de datos y versión confirmada de cada tabla. Con db se leen en la
+        transacción de esa sesión (la misma que verá la consulta); sin ella, con el motor registrado.
+        """
+        versiones = self._leer_versiones(db)
+        return (versiones.get(GENERACION, 0),) + tuple(versiones.get(tabla, 0) for tabla in tablas)
+
+    def etag_tablas(self, tablas) -> str:
+        """
+        ETag fuerte (entre comillas) que cambia cada vez que se modifica alguna de las tablas.
+        """
+        generacion, *versiones = self.versiones(tablas)
+        firma = f"{generacion}|" + "|".join(f"{tabla}:{version}" for tabla, version in zip(tablas, versiones))
+        return '"' + hashlib.sha1(firma.encode()).hexdigest() + '"'
+
+    def obtener(self, clave):
+        """
+        Devuelve (True, valor) si la clave está en caché y no ha caducado, o (False, None).
+        """
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None:
+                if entrada[0] > time.monotonic():
+                    self._entradas.move_to_end(clave)
+                    self.aciertos += 1
+                    return True, entrada[1]
+                del self._entradas[clave]
+            self.fallos += 1
+            return False, None
+
+    def guardar(self, clave, valor):
+        with self._lock:
+            self._entradas[clave] = (time.monotonic() + self.ttl, valor)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.tamano:
+                self._entradas.popitem(last=False)
+                self.expulsiones += 1
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+
+    def estadisticas(self) -> dict:
+        versiones = self._leer_versiones() if self._motor is not None else {}
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                "entradas": len(self._entradas),
+                "tamano_maximo": self.tamano,
+                "ttl_segundos": self.ttl,
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "tasa_aciertos": round(self.aciertos / consultas, 4) if consultas else 0.0,
+                "expulsiones": self.expulsiones,
+                "versiones": versiones,
+            }
+
+
+cache = CacheCatalogo(CACHE_TAMANO, CACHE_TTL)
+
+
+def _desvincular(db, resultado):
+    # Los objetos ORM se separan de la sesión para poder reutilizarlos en otras peticiones
+    valores = resultado.values() if isinstance(resultado, dict) else (
+        resultado if isinstance(resultado, list) else [resultado])
+    for valor in valores:
+        if hasattr(valor, "_sa_instance_state") and valor in db:
+            db.expunge(valor)
+
+
+def cacheado(*tablas: str, valoraciones=None):
+    """
+    Decorador para funciones de lectura de crud.py que dependen de las tablas indicadas.
+    La sesión (parámetro db) no forma parte de la clave.
+    valoraciones es una función (db, resultado) que actualiza en el sitio las valoraciones de los
+    contenidos del resultado: si se indica, una entrada guardada con otra versión de VALORACIONES
+    no se descarta, solo se actualizan sus valoraciones.
+    """
+    def decorador(funcion):
+        firma = inspect.signature(funcion)
+
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            argumentos = firma.bind(*args, **kwargs)
+            argumentos.apply_defaults()
+            db = argumentos.arguments.pop("db")
+            # Las versiones se leen en la misma sesión y antes de consultar: si hay una escritura a la
+            # vez, el resultado se guarda con la versión antigua y no se vuelve a servir
+            versiones = cache.versiones(tablas + (VALORACIONES,) if valoraciones else tablas, db)
+            if valoraciones:
+                versiones, version_valoraciones = versiones[:-1], versiones[-1]
+            clave = (funcion.__name__, repr(sorted(argumentos.arguments.items())), versiones)
+            encontrado, valor = cache.obtener(clave)
+            if encontrado:
+                if valoraciones is None:
+                    return valor
+                # valor es [resultado, versión de VALORACIONES con la que están sus valoraciones]
+                if valor[1] != version_valoraciones:
+                    valoraciones(db, valor[0])
+                    valor[1] = version_valoraciones
+                return valor[0]
+            valor = funcion(*args, **kwargs)
+            _desvincular(db, valor)
+            cache.guardar(clave, valor if valoraciones is None else [valor, version_valoraciones])
+            return valor
+
+        return envoltura
+    return decorador
@@ -0,0 +1,113 @@
+import argparse
+import sys
+import time
+from sqlalchemy import text
+from . import busqueda_fts
+
+"""
+Autor: Grupo GA01 - ASEE
+Versión: 1.0
+Descripción: Limpieza puntual de filas huérfanas y compactación de contenidos.db.
+Antes de que crud.delete_content borrase en cascada, al eliminar un contenido o una temporada
+se quedaban en la base de datos sus temporadas, episodios, reparto, tráileres e idiomas. Este
+comando borra esas filas en una transacción (DELETE por tabla), ejecuta VACUUM para devolver al
+sistema el espacio libre y reconstruye los índices FTS5, porque VACUUM puede cambiar los rowid
+de las tablas. El servicio debe estar parado (VACUUM necesita acceso exclusivo) y conviene
+reiniciarlo después para que la caché y el índice de búsqueda difusa se regeneren.
+
+Comando de ejecución (desde Microservicio_Contenidos o /app en el contenedor):
+    python -m API_Contenidos.compactacion             -> borra los huérfanos y compacta
+    python -m API_Contenidos.compactacion --simular   -> solo cuenta los huérfanos
+
+"""
+
+# tabla -> condición que cumplen sus filas huérfanas. El orden importa: los episodios se revisan
+# después de las temporadas y los doblajes después de los tráileres
+HUERFANOS = {
+    "Temporada": '"idContenido" NOT IN (SELECT id FROM "Contenido")',
+    "Episodio": '"idContenido" NOT IN (SELECT id FROM "Contenido") '
+                'OR "idTemporada" NOT IN (SELECT "idTemporada" FROM "Temporada")',
+    "Reparto": '"idContenido" NOT IN (SELECT id FROM "Contenido") OR "idActor" NOT IN (SELECT id FROM "Actor")',
+    "Trailer": '"idContenido" NOT IN (SELECT id FROM "Contenido")',
+    "SubtituloContenido": '"idSubtitulosContenido" NOT IN '
+                          '(SELECT "idSubtitulosContenido" FROM "Contenido" WHERE "idSubtitulosContenido" IS NOT NULL)',
+    "DoblajeContenido": '"idDoblajeContenido" NOT IN '
+                        '(SELECT "idDoblajeContenido" FROM "Contenido" WHERE "idDoblajeContenido" IS NOT NULL) '
+                        'AND "idDoblajeContenido" NOT IN '
+                        '(SELECT "idDoblajeContenido" FROM "Trailer" WHERE "idDoblajeContenido" IS NOT NULL)',
+}
+
+
+def tamano_bd(conexion) -> dict:
+    pagina = conexion.execute(text("PRAGMA page_size")).scalar()
+    return {
+        "bytes": conexion.execute(text("PRAGMA page_count")).scalar() * pagina,
+        "bytes_libres": conexion.execute(text("PRAGMA freelist_count")).scalar() * pagina,
+    }
+
+
+def contar_huerfanos(engine) -> dict:
+    with engine.connect() as conexion:
+        return {
+            tabla: conexion.execute(text(f'SELECT COUNT(*) FROM "{tabla}" WHERE {condicion}')).scalar()
+            for tabla, condicion in HUERFANOS.items()
+        }
+
+
+def borrar_huerfanos(engine) -> dict:
+    """
+    Borra las filas huérfanas de todas las tablas en una sola transacción y devuelve cuántas había en cada una.
+    """
+    borradas = {}
+    with engine.begin() as conexion:
+        for tabla, condicion in HUERFANOS.items():
+            borradas[tabla] = conexion.execute(text(f'DELETE FROM "{tabla}" WHERE {condicion}')).rowcount
+    return borradas
+
+
+def compactar(engine) -> dict:
+    """
+    Ejecuta VACUUM (fuera de una transacción) y reconstruye los índices FTS5.
+    Devuelve el tamaño de la base de datos antes y después.
+    """
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conexion:
+        antes = tamano_bd(conexion)
+        conexion.execute(text("VACUUM"))
+        # En modo WAL el fichero principal no se reduce hasta pasar el WAL a la base de datos
+        conexion.execute(text("PRAGMA wal_checkpoint(TRUNCATE)"))
+        despues = tamano_bd(conexion)
+    busqueda_fts.reconstruir_indices(engine)
+    return {"antes": antes, "despues": despues}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Borra las filas huérfanas y compacta la base de datos")
+    parser.add_argument("--simular", action="store_true", help="Solo cuenta las filas huérfanas")
+    parser.add_argument("--sin-vacuum", action="store_true", help="Borra los huérfanos pero no compacta")
+    args = parser.parse_args()
+
+    from . import models  # noqa: F401 (models se importa antes que database, como en main.py)
+    from .database import engine, initialize_database
+
+    initialize_database()
+    if args.simular:
+        for tabla, filas in contar_huerfanos(engine).items():
+            print(f"{tabla:20} {filas:10d} filas huérfanas")
+        return 0
+
+    inicio = time.perf_counter()
+    borradas = borrar_huerfanos(engine)
+    for tabla, filas in borradas.items():
+        print(f"{tabla:20} {filas:10d} filas huérfanas borradas")
+    if args.sin_vacuum:
+        return 0
+
+    tamanos = compactar(engine)
+    recuperado = tamanos["antes"]["bytes"] - tamanos["despues"]["bytes"]
+    print(f"Tamaño: {tamanos['antes']['bytes'] / 2**20:.2f} MiB -> {tamanos['despues']['bytes'] / 2**20:.2f} MiB "
+          f"({recuperado / 2**20:.2f} MiB recuperados) en {time.perf_counter() - inicio:.2f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
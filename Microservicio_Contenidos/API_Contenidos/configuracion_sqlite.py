@@ -0,0 +1,109 @@
+import os
+from sqlalchemy import event
+
+"""
+Autor: Grupo GA01 - ASEE
+Versión: 1.0
+Descripción: Ajustes de rendimiento de SQLite (PRAGMAs) que se aplican a cada conexión nueva.
+Se elige un perfil con SQLITE_PERFIL y cualquier ajuste se puede sobrescribir con su propia
+variable de entorno (SQLITE_JOURNAL_MODE, SQLITE_SYNCHRONOUS, SQLITE_MMAP_SIZE,
+SQLITE_CACHE_SIZE, SQLITE_TEMP_STORE y SQLITE_BUSY_TIMEOUT).
+- compatible: los valores por defecto de SQLite (diario de rollback, dos fsync por commit).
+- equilibrado: WAL (los lectores no esperan a los escritores) con synchronous=NORMAL, que en
+  WAL no puede corromper la base de datos; solo se pueden perder los últimos commits si se cae
+  el sistema operativo.
+- rapido: como equilibrado pero sin fsync (synchronous=OFF) y con más memoria. Para cargas
+  masivas o entornos de pruebas.
+"""
+
+# Orden en el que se aplican los PRAGMAs (journal_mode primero, porque cambia el fichero)
+AJUSTES = ("journal_mode", "synchronous", "mmap_size", "cache_size", "temp_store", "busy_timeout")
+
+PERFILES = {
+    "compatible": {
+        "journal_mode": "DELETE",
+        "synchronous": "FULL",
+        "mmap_size": 0,
+        "cache_size": -2000,  # Valores negativos: KiB (2 MiB, el valor por defecto)
+        "temp_store": "DEFAULT",
+        "busy_timeout": 5000,  # Milisegundos esperando a que se libere un bloqueo
+    },
+    "equilibrado": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": 256 * 2**20,
+        "cache_size": -64 * 1024,
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+    },
+    "rapido": {
+        "journal_mode": "WAL",
+        "synchronous": "OFF",
+        "mmap_size": 1024 * 2**20,
+        "cache_size": -256 * 1024,
+        "temp_store": "MEMORY",
+        "busy_timeout": 10000,
+    },
+}
+
+PERFIL_POR_DEFECTO = "equilibrado"
+
+
+def nombre_perfil() -> str:
+    return os.getenv("SQLITE_PERFIL", PERFIL_POR_DEFECTO)
+
+
+def ajustes_perfil(perfil: str = None) -> dict:
+    """
+    Ajustes del perfil indicado (o de SQLITE_PERFIL) con las sobrescrituras de las variables de entorno.
+    """
+    perfil = perfil or nombre_perfil()
+    if perfil not in PERFILES:
+        raise ValueError(f"Perfil de SQLite desconocido: {perfil} (disponibles: {', '.join(PERFILES)})")
+    ajustes = dict(PERFILES[perfil])
+    for nombre in AJUSTES:
+        valor = os.getenv(f"SQLITE_{nombre.upper()}")
+        if valor:
+            ajustes[nombre] = valor
+    return ajustes
+
+
+def aplicar_pragmas(conexion_dbapi, ajustes: dict):
+    cursor = conexion_dbapi.cursor()
+    try:
+        for nombre in AJUSTES:
+            if nombre in ajustes:
+                cursor.execute(f"PRAGMA {nombre} = {ajustes[nombre]}")
+    finally:
+        cursor.close()
+
+
+def configurar_motor(engine, perfil: str = None) -> dict:
+    """
+    Registra los PRAGMAs del perfil para cada conexión que abra el motor y devuelve los ajustes.
+    """
+    ajustes = ajustes_perfil(perfil)
+
+    @event.listens_for(engine, "connect")
+    def _al_conectar(conexion_dbapi, _registro):
+        aplicar_pragmas(conexion_dbapi, ajustes)
+
+    return ajustes
+
+
+def configuracion_efectiva(engine) -> dict:
+    """
+    Lee de una conexión real el valor que tiene cada ajuste.
+    """
+    with engine.connect() as conexion:
+        return {
+            nombre: conexion.exec_driver_sql(f"PRAGMA {nombre}").scalar()
+            for nombre in AJUSTES
+        }
+
+
+def describir(engine, perfil: str = None) -> str:
+    efectiva = configuracion_efectiva(engine)
+    return f"SQLite (perfil {perfil or nombre_perfil()}): " + ", ".join(
+        f"{nombre}={valor}" for nombre, valor in efectiva.items()
+    )
@@ -1,7 +1,48 @@
-from sqlalchemy.orm import Session
-from . import models, schemas
+from sqlalchemy import select, update, delete, insert, bindparam, case, func
+from sqlalchemy.orm import Session, aliased
+from . import models, schemas, busqueda_fts, busqueda_difusa
+from .cache import cacheado
 import uuid
-from typing import Union
+from typing import Optional, Union
+
+# La valoración con la que se crea un contenido cuenta como su primera valoración solo si es una
+# puntuación real: None o 0.0 (lo que envían los formularios de alta) significa "sin valorar"
+def _valoraciones_iniciales(valoracionPromedio: Optional[float]) -> dict:
+    if not valoracionPromedio or valoracionPromedio <= 0:
+        return {"sumaValoraciones": 0.0, "numeroValoraciones": 0}
+    return {"sumaValoraciones": valoracionPromedio, "numeroValoraciones": 1}
+
+# Contenidos (objetos Contenido o esquemas con valoracionPromedio) de un resultado de crud: sueltos,
+# en listas, en diccionarios por id o dentro de las estanterías
+def _contenidos_resultado(resultado):
+    if isinstance(resultado, list):
+        for valor in resultado:
+            yield from _contenidos_resultado(valor)
+    elif isinstance(resultado, dict):
+        for valor in resultado.values():
+            yield from _contenidos_resultado(valor)
+    elif hasattr(resultado, "valoracionPromedio"):
+        yield resultado
+
+# Máximo de ids por consulta IN; con más contenidos se leen las valoraciones de toda la tabla
+MAX_IDS_VALORACIONES = 900
+
+# Actualiza en el sitio la media y el número de valoraciones de los contenidos de un resultado cacheado
+# (ver cacheado en cache.py). Solo lee esas columnas, con una consulta por clave primaria
+def _refrescar_valoraciones(db: Session, resultado):
+    contenidos = list(_contenidos_resultado(resultado))
+    if not contenidos:
+        return
+    consulta = select(models.Contenido.id, models.Contenido.valoracionPromedio, models.Contenido.numeroValoraciones)
+    ids = {contenido.id for contenido in contenidos}
+    if len(ids) <= MAX_IDS_VALORACIONES:
+        consulta = consulta.where(models.Contenido.id.in_(ids))
+    valoraciones = {fila.id: fila for fila in db.execute(consulta)}
+    for contenido in contenidos:
+        fila = valoraciones.get(contenido.id)
+        if fila is not None:
+            contenido.valoracionPromedio = fila.valoracionPromedio
+            contenido.numeroValoraciones = fila.numeroValoraciones
 
 # Función para crear una película
 def create_pelicula(db: Session, pelicula: schemas.PeliculaCreate):  
@@ -12,14 +53,18 @@ def create_pelicula(db: Session, pelicula: schemas.PeliculaCreate):
         fechaLanzamiento=pelicula.fechaLanzamiento,
         idGenero=pelicula.idGenero,
         valoracionPromedio=pelicula.valoracionPromedio,
+        **_valoraciones_iniciales(pelicula.valoracionPromedio),
         idSubtitulosContenido=pelicula.idSubtitulosContenido,
         idDoblajeContenido=pelicula.idDoblajeContenido,
         duracion=pelicula.duracion,
         idDirector=pelicula.idDirector
     )
+    antes = busqueda_difusa.inicio_escritura(db)
     db.add(db_contenido)
+    cambio = busqueda_difusa.fin_escritura(db, antes)
     db.commit()
     db.refresh(db_contenido)
+    busqueda_difusa.indice.indexar("contenido", db_contenido.id, db_contenido.titulo, cambio)
     
     return db_contenido
 
@@ -33,14 +78,18 @@ def create_serie(db: Session, serie: schemas.ContenidoBase):
         fechaLanzamiento=serie.fechaLanzamiento,
         idGenero=serie.idGenero,
         valoracionPromedio=serie.valoracionPromedio,
+        **_valoraciones_iniciales(serie.valoracionPromedio),
         idSubtitulosContenido=serie.idSubtitulosContenido,
         idDoblajeContenido=serie.idDoblajeContenido,
         duracion=None,
         idDirector=None
     )
+    antes = busqueda_difusa.inicio_escritura(db)
     db.add(db_serie)
+    cambio = busqueda_difusa.fin_escritura(db, antes)
     db.commit()
     db.refresh(db_serie)
+    busqueda_difusa.indice.indexar("contenido", db_serie.id, db_serie.titulo, cambio)
 
     return db_serie
 
@@ -80,14 +129,27 @@ def update_content(db: Session, content_id: str, content_data: Union[schemas.Pel
 
     # Convertir los datos en un diccionario, excluyendo los campos no enviados
     update_data = {k: v for k, v in content_data.model_dump(exclude_unset=True).items() if v is not None}
+    antes = busqueda_difusa.inicio_escritura(db)
     
     # Actualizar los campos del contenido usando setattr
     for key, value in update_data.items():
         setattr(content, key, value)
+
+    # Si se fija la media a mano se conserva el número de valoraciones y se ajusta la suma;
+    # una media de 0 deja el contenido sin valorar
+    if "valoracionPromedio" in update_data:
+        if update_data["valoracionPromedio"] > 0:
+            content.numeroValoraciones = max(content.numeroValoraciones or 0, 1)
+            content.sumaValoraciones = update_data["valoracionPromedio"] * content.numeroValoraciones
+        else:
+            content.numeroValoraciones = 0
+            content.sumaValoraciones = 0.0
     
     # Confirmar los cambios en la base de datos
+    cambio = busqueda_difusa.fin_escritura(db, antes)
     db.commit()
     db.refresh(content)
+    busqueda_difusa.indice.indexar("contenido", content.id, content.titulo, cambio)
     
     return content
 
@@ -126,6 +188,7 @@ def update_subtitulo(db: Session, idSubtitulosContenido: str, subtitulo_id: str)
 
     return db_SubtituloContenido
 
+@cacheado("Subtitulo", "SubtituloContenido")
 def get_subtitulos(db: Session, idSubtitulosContenido: str):
     # Realizamos la consulta uniendo las tablas SubtituloContenido y Subtitulo por idSubtitulo
     subtitulos = (
@@ -219,6 +282,7 @@ def update_doblaje(db: Session, idDoblajeContenido: str, doblaje_id: str):
     return db_DoblajeContenido
 
 #Funcion para obtener los doblajes
+@cacheado("Doblaje", "DoblajeContenido")
 def get_doblajes(db: Session, idDoblajeContenido: str):
     # Realizamos la consulta uniendo las tablas DoblajesContenido y Doblajes por idDoblaje
     doblajes = (
@@ -230,6 +294,7 @@ def get_doblajes(db: Session, idDoblajeContenido: str):
     return doblajes  
 
 # Funcion para obtener todos los subtitulos
+@cacheado("Subtitulo")
 def get_all_subtitulos(db: Session):
     subtitulos = (
         db.query(models.Subtitulo).all()
@@ -237,6 +302,7 @@ def get_all_subtitulos(db: Session):
     return subtitulos
 
 # Funcion para obtener todos los doblajes
+@cacheado("Doblaje")
 def get_all_doblajes(db: Session):
     doblajes = (
         db.query(models.Doblaje).all()
@@ -244,22 +310,51 @@ def get_all_doblajes(db: Session):
     return doblajes
 
 
-# Función para eliminar una película o serie
+# Indica si otro contenido (o un tráiler de otro contenido) usa el mismo grupo de subtítulos o doblajes
+def _grupo_idiomas_compartido(db: Session, idContenido: str, idGrupo: str, columna_contenido, columna_trailer=None) -> bool:
+    consultas = [select(models.Contenido.id).where(columna_contenido == idGrupo, models.Contenido.id != idContenido)]
+    if columna_trailer is not None:
+        consultas.append(select(models.Trailer.id).where(columna_trailer == idGrupo,
+                                                         models.Trailer.idContenido != idContenido))
+    return any(db.scalar(consulta.limit(1)) is not None for consulta in consultas)
+
+# Función para eliminar una película o serie junto con todo lo que cuelga de ella (temporadas, episodios,
+# reparto, tráileres y sus idiomas si no los comparte otro contenido) con un DELETE por tabla y un commit
 def delete_content(db: Session, idContenido: str) -> bool:
     content = db.query(models.Contenido).filter(models.Contenido.id == idContenido).first()
-    if content:
-        db.delete(content)
-        db.commit()
-        return True
-    return False
+    if not content:
+        return False
+    subtitulos_libres = content.idSubtitulosContenido and not _grupo_idiomas_compartido(
+        db, idContenido, content.idSubtitulosContenido, models.Contenido.idSubtitulosContenido)
+    doblajes_libres = content.idDoblajeContenido and not _grupo_idiomas_compartido(
+        db, idContenido, content.idDoblajeContenido, models.Contenido.idDoblajeContenido, models.Trailer.idDoblajeContenido)
+
+    antes = busqueda_difusa.inicio_escritura(db)
+    db.execute(delete(models.Episodio).where(models.Episodio.idContenido == idContenido))
+    db.execute(delete(models.Temporada).where(models.Temporada.idContenido == idContenido))
+    db.execute(delete(models.Reparto).where(models.Reparto.idContenido == idContenido))
+    db.execute(delete(models.Trailer).where(models.Trailer.idContenido == idContenido))
+    if subtitulos_libres:
+        db.execute(delete(models.SubtituloContenido).where(
+            models.SubtituloContenido.idSubtitulosContenido == content.idSubtitulosContenido))
+    if doblajes_libres:
+        db.execute(delete(models.DoblajeContenido).where(
+            models.DoblajeContenido.idDoblajeContenido == content.idDoblajeContenido))
+    db.delete(content)
+    cambio = busqueda_difusa.fin_escritura(db, antes)
+    db.commit()
+    busqueda_difusa.indice.eliminar("contenido", idContenido, cambio)
+    return True
 
-# Función para eliminar una temporada de una serie
+# Función para eliminar una temporada de una serie junto con sus episodios
 def delete_season(db: Session, idContenido: str, idTemporada: str) -> bool:
     season = db.query(models.Temporada).filter(
         models.Temporada.idContenido == idContenido,
         models.Temporada.idTemporada == idTemporada
     ).first()
     if season:
+        db.execute(delete(models.Episodio).where(models.Episodio.idContenido == idContenido,
+                                                 models.Episodio.idTemporada == idTemporada))
         db.delete(season)
         db.commit()
         return True
@@ -279,6 +374,7 @@ def delete_episode(db: Session, idContenido: str, idTemporada: str, idEpisodio:
     return False
 
 # Obtiene datos específicos de una Pelicula por id
+@cacheado("Contenido", valoraciones=_refrescar_valoraciones)
 def get_pelicula_by_id(db: Session, id_contenido: str):
     return db.query(models.Contenido).filter(
         models.Contenido.id == id_contenido,
@@ -288,34 +384,30 @@ def get_pelicula_by_id(db: Session, id_contenido: str):
 def get_serie_by_id(db: Session, id_contenido: str):
     return db.query(models.Contenido).filter(models.Contenido.id == id_contenido and models.Contenido.tipoContenido == "Serie").first()
 
-# Consulta de todos los contenidos
-def get_all_contenidos(db: Session):
-    # Obtener todos los contenidos generales (Peliculas o Series)
-    contenidos = db.query(models.Contenido).all()
-    
-    # Crear una lista para almacenar los resultados
-    resultado_contenidos = []
-
-    # Iterar sobre cada contenido y diferenciar si es Pelicula o Serie
-    for contenido in contenidos:
-        if contenido.tipoContenido == "Pelicula":
-            pelicula = get_pelicula_by_id(db, contenido.id)  # Obtener detalles de la Película
-            if pelicula:
-                resultado_contenidos.append(pelicula)
-        elif contenido.tipoContenido == "Serie":
-            serie = get_serie_by_id(db, contenido.id)  # Obtener detalles de la Serie
-            if serie:
-                resultado_contenidos.append(serie)
-
-    return resultado_contenidos
+# Consulta de una página de contenidos (Peliculas o Series) ordenada por id, con paginación por clave:
+# after_id es el último id de la página anterior, así cada página es una única consulta por índice
+def get_contenidos_pagina(db: Session, after_id: Optional[str] = None, limit: int = 100,
+                          tipoContenido: Optional[str] = None, idGenero: Optional[str] = None):
+    query = db.query(models.Contenido)
+    if tipoContenido:
+        query = query.filter(models.Contenido.tipoContenido == tipoContenido)
+    else:
+        query = query.filter(models.Contenido.tipoContenido.in_(("Pelicula", "Serie")))
+    if idGenero:
+        query = query.filter(models.Contenido.idGenero == idGenero)
+    if after_id:
+        query = query.filter(models.Contenido.id > after_id)
+    return query.order_by(models.Contenido.id).limit(limit).all()
 
 # Consulta de todas las series
+@cacheado("Contenido", valoraciones=_refrescar_valoraciones)
 def get_todoseries(db: Session):
-    return db.query(models.Contenido).filter(models.Contenido.tipoContenido == "Serie")
+    return db.query(models.Contenido).filter(models.Contenido.tipoContenido == "Serie").all()
 
 # Consulta de todas las series
+@cacheado("Contenido", valoraciones=_refrescar_valoraciones)
 def get_todopeliculas(db: Session):
-    return db.query(models.Contenido).filter(models.Contenido.tipoContenido == "Pelicula")
+    return db.query(models.Contenido).filter(models.Contenido.tipoContenido == "Pelicula").all()
 
 # Consulta de todas las temporadas de una serie
 def get_temporadas_by_serie(db: Session, idSerie: str):
@@ -326,28 +418,24 @@ def get_temporadas_by_serie(db: Session, idSerie: str):
     return temporadas
 
 
+@cacheado("Contenido", valoraciones=_refrescar_valoraciones)
 def get_contenido_by_id(db: Session, id_contenido: str):
     return db.query(models.Contenido).filter(models.Contenido.id == id_contenido).first()    
 
-def get_serie_con_temporadas_episodios(db: Session, idSerie: str):
-
-    serie = db.query(models.Contenido).filter(
-        models.Contenido.id == idSerie,
-        models.Contenido.tipoContenido == "Serie"
-    ).first()
-
-    if not serie:
-        return None
-    
-    #Obtener todas sus temporadas y episodios
-    temporadas = db.query(models.Temporada).filter(models.Temporada.idContenido == idSerie).all()
-    temporadas_data = []
-
-    for temporada in temporadas:
-        episodios = db.query(models.Episodio).filter(models.Episodio.idTemporada == temporada.idTemporada).all()
-        
-        # Estructura de episodios para la respuesta
-        episodios_data = [
+# Obtiene varios contenidos con una sola consulta (IN) y los devuelve indexados por id
+@cacheado("Contenido", valoraciones=_refrescar_valoraciones)
+def get_contenidos_by_ids(db: Session, ids: list[str]):
+    if not ids:
+        return {}
+    contenidos = db.query(models.Contenido).filter(models.Contenido.id.in_(set(ids))).all()
+    return {contenido.id: contenido for contenido in contenidos}
+
+# Construye la respuesta SeriesGet a partir de las series, temporadas y episodios ya cargados
+def _agrupar_series(series, temporadas, episodios):
+    # Episodios agrupados por temporada
+    episodios_por_temporada = {}
+    for episodio in episodios:
+        episodios_por_temporada.setdefault(episodio.idTemporada, []).append(
             schemas.Episodio(
                 idDirector=episodio.idDirector,
                 idEpisodio=episodio.idEpisodio,
@@ -355,62 +443,174 @@ def get_serie_con_temporadas_episodios(db: Session, idSerie: str):
                 numeroEpisodio=episodio.numeroEpisodio,
                 idContenido=episodio.idContenido,
                 idTemporada=episodio.idTemporada
-            ) for episodio in episodios
-        ]
+            )
+        )
 
-        # Añadir los datos de la temporada con sus episodios
-        temporadas_data.append(schemas.TemporadasGet(
+    # Temporadas (con sus episodios) agrupadas por serie
+    temporadas_por_serie = {}
+    for temporada in temporadas:
+        temporadas_por_serie.setdefault(temporada.idContenido, []).append(schemas.TemporadasGet(
             idTemporada=temporada.idTemporada,
             numeroTemporada=temporada.numeroTemporada,
-            Episodios=episodios_data
+            Episodios=episodios_por_temporada.get(temporada.idTemporada, [])
         ))
-    return schemas.SeriesGet(
-        idSerie=serie.id,
-        titulo=serie.titulo,
-        Temporadas=temporadas_data
+
+    return [
+        schemas.SeriesGet(
+            idSerie=serie.id,
+            titulo=serie.titulo,
+            Temporadas=temporadas_por_serie.get(serie.id, [])
+        )
+        for serie in series
+    ]
+
+# Carga las temporadas y episodios de las series seleccionadas por la subconsulta ids_series (2 consultas)
+def _cargar_temporadas_episodios(db: Session, ids_series):
+    temporadas = (
+        db.query(models.Temporada)
+        .filter(models.Temporada.idContenido.in_(ids_series))
+        .order_by(models.Temporada.numeroTemporada)
+        .all()
+    )
+    ids_temporadas = select(models.Temporada.idTemporada).where(models.Temporada.idContenido.in_(ids_series))
+    episodios = (
+        db.query(models.Episodio)
+        .filter(models.Episodio.idTemporada.in_(ids_temporadas))
+        .order_by(models.Episodio.numeroEpisodio)
+        .all()
     )
+    return temporadas, episodios
+
+# Obtiene una serie con sus temporadas y episodios (3 consultas)
+@cacheado("Contenido", "Temporada", "Episodio")
+def get_serie_con_temporadas_episodios(db: Session, idSerie: str):
+
+    serie = db.query(models.Contenido).filter(
+        models.Contenido.id == idSerie,
+        models.Contenido.tipoContenido == "Serie"
+    ).first()
+
+    if not serie:
+        return None
+
+    temporadas, episodios = _cargar_temporadas_episodios(db, [serie.id])
+    return _agrupar_series([serie], temporadas, episodios)[0]
+
+# Tablas de las que depende el documento de detalle de un contenido
+TABLAS_DETALLE = ("Contenido", "Genero", "Director", "Actor", "Reparto", "Subtitulo", "SubtituloContenido",
+                  "Doblaje", "DoblajeContenido", "Temporada", "Episodio")
+
+# Obtiene el detalle completo de un contenido con los nombres ya resueltos: género, director, reparto,
+# idiomas y, si es una serie, temporadas y episodios con el nombre de su director.
+# Son como máximo 6 consultas, independientemente del número de actores, temporadas o episodios
+@cacheado(*TABLAS_DETALLE, valoraciones=_refrescar_valoraciones)
+def get_detalle_contenido(db: Session, idContenido: str):
+    fila = (
+        db.query(models.Contenido, models.Genero.nombre, models.Director.nombre)
+        .outerjoin(models.Genero, models.Genero.id == models.Contenido.idGenero)
+        .outerjoin(models.Director, models.Director.id == models.Contenido.idDirector)
+        .filter(models.Contenido.id == idContenido)
+        .first()
+    )
+    if not fila:
+        return None
+    contenido, genero, director = fila
 
-def get_all_series_con_temporadas_episodios(db: Session):
-    # Obtener todas las series
-    series = db.query(models.Contenido).filter(models.Contenido.tipoContenido == "Serie").all()
-    series_data = []
-
-    for serie in series:
-        # Obtener todas las temporadas para la serie actual
-        temporadas = db.query(models.Temporada).filter(models.Temporada.idContenido == serie.id).all()
-        temporadas_data = []
-
-        for temporada in temporadas:
-            # Obtener todos los episodios para la temporada actual
-            episodios = db.query(models.Episodio).filter(models.Episodio.idTemporada == temporada.idTemporada).all()
-            
-            # Estructura de episodios para la respuesta
-            episodios_data = [
-                schemas.Episodio(
-                    idDirector=episodio.idDirector,
-                    idEpisodio=episodio.idEpisodio,
-                    duracion=episodio.duracion,
-                    numeroEpisodio=episodio.numeroEpisodio,
-                    idContenido=episodio.idContenido,
-                    idTemporada=episodio.idTemporada
-                ) for episodio in episodios
-            ]
-
-            # Añadir los datos de la temporada con sus episodios
-            temporadas_data.append(schemas.TemporadasGet(
+    reparto = (
+        db.query(models.Actor.id, models.Actor.nombre, models.Actor.nacionalidad)
+        .join(models.Reparto, models.Reparto.idActor == models.Actor.id)
+        .filter(models.Reparto.idContenido == idContenido)
+        .order_by(models.Actor.nombre)
+        .all()
+    )
+    subtitulos = (
+        db.query(models.Subtitulo.idSubtitulo, models.Subtitulo.idioma)
+        .join(models.SubtituloContenido, models.SubtituloContenido.idSubtitulo == models.Subtitulo.idSubtitulo)
+        .filter(models.SubtituloContenido.idSubtitulosContenido == contenido.idSubtitulosContenido)
+        .all()
+    ) if contenido.idSubtitulosContenido else []
+    doblajes = (
+        db.query(models.Doblaje.idDoblaje, models.Doblaje.idioma)
+        .join(models.DoblajeContenido, models.DoblajeContenido.idDoblaje == models.Doblaje.idDoblaje)
+        .filter(models.DoblajeContenido.idDoblajeContenido == contenido.idDoblajeContenido)
+        .all()
+    ) if contenido.idDoblajeContenido else []
+
+    temporadas = []
+    if contenido.tipoContenido == "Serie":
+        episodios_por_temporada = {}
+        episodios = (
+            db.query(models.Episodio, models.Director.nombre)
+            .outerjoin(models.Director, models.Director.id == models.Episodio.idDirector)
+            .filter(models.Episodio.idContenido == idContenido)
+            .order_by(models.Episodio.numeroEpisodio)
+            .all()
+        )
+        for episodio, director_episodio in episodios:
+            episodios_por_temporada.setdefault(episodio.idTemporada, []).append(schemas.EpisodioDetalle(
+                idEpisodio=episodio.idEpisodio,
+                idTemporada=episodio.idTemporada,
+                numeroEpisodio=episodio.numeroEpisodio,
+                duracion=episodio.duracion,
+                idDirector=episodio.idDirector,
+                director=director_episodio,
+            ))
+        temporadas = [
+            schemas.TemporadaDetalle(
                 idTemporada=temporada.idTemporada,
                 numeroTemporada=temporada.numeroTemporada,
-                Episodios=episodios_data
-            ))
+                Episodios=episodios_por_temporada.get(temporada.idTemporada, []),
+            )
+            for temporada in db.query(models.Temporada)
+            .filter(models.Temporada.idContenido == idContenido)
+            .order_by(models.Temporada.numeroTemporada)
+        ]
 
-        # Añadir los datos de la serie con sus temporadas
-        series_data.append(schemas.SeriesGet(
-            idSerie=serie.id,
-            titulo=serie.titulo,
-            Temporadas=temporadas_data
-        ))
+    return schemas.ContenidoDetalle(
+        id=contenido.id,
+        tipoContenido=contenido.tipoContenido,
+        titulo=contenido.titulo,
+        descripcion=contenido.descripcion,
+        fechaLanzamiento=contenido.fechaLanzamiento,
+        valoracionPromedio=contenido.valoracionPromedio,
+        numeroValoraciones=contenido.numeroValoraciones,
+        duracion=contenido.duracion,
+        idGenero=contenido.idGenero,
+        genero=genero,
+        idDirector=contenido.idDirector,
+        director=director,
+        idSubtitulosContenido=contenido.idSubtitulosContenido,
+        idDoblajeContenido=contenido.idDoblajeContenido,
+        reparto=[schemas.ActorReparto(id=id, nombre=nombre, nacionalidad=nacionalidad)
+                 for id, nombre, nacionalidad in reparto],
+        subtitulos=[schemas.Idioma(id=id, idioma=idioma) for id, idioma in subtitulos],
+        doblajes=[schemas.Idioma(id=id, idioma=idioma) for id, idioma in doblajes],
+        Temporadas=temporadas,
+    )
 
-    return series_data  # Devolver todas las series con temporadas y episodios
+# Obtiene las series (paginadas con offset/limit) con sus temporadas y episodios.
+# Siempre son 3 consultas, independientemente del número de series, temporadas o episodios.
+@cacheado("Contenido", "Temporada", "Episodio")
+def get_all_series_con_temporadas_episodios(db: Session, offset: int = 0, limit: Optional[int] = None):
+    # Subconsulta con los ids de las series de la página pedida
+    ids_series = (
+        select(models.Contenido.id)
+        .where(models.Contenido.tipoContenido == "Serie")
+        .order_by(models.Contenido.titulo, models.Contenido.id)
+        .offset(offset)
+        .limit(limit)
+    )
+    series = (
+        db.query(models.Contenido)
+        .filter(models.Contenido.id.in_(ids_series))
+        .order_by(models.Contenido.titulo, models.Contenido.id)
+        .all()
+    )
+    if not series:
+        return []
+
+    temporadas, episodios = _cargar_temporadas_episodios(db, ids_series)
+    return _agrupar_series(series, temporadas, episodios)
 
 # Función para obtener una temporada por idContenido y idTemporada
 def get_temporada(db: Session, idContenido: str, idTemporada: str):
@@ -457,10 +657,12 @@ def update_episodio(db: Session,  idContenido: str, idTemporada: str, idEpisodio
     return episodio_actual
 
 # Función para consultar todos los géneros de la base de datos
+@cacheado("Genero")
 def get_generos(db: Session):
     return db.query(models.Genero).all()
 
 # Función para consultar los datos de un género
+@cacheado("Genero")
 def get_genero(db: Session, genero_id: str):
     return db.query(models.Genero).filter(models.Genero.id == genero_id).first()
     
@@ -499,6 +701,7 @@ def delete_genero(db: Session, genero_id: str) -> bool:
         return True
 
 #Funcion para obtener el reparto
+@cacheado("Reparto", "Actor")
 def get_reparto(db: Session, idContenido: str):
     # Realizamos la consulta uniendo las tablas Reparto y Actor por idActor
     reparto = (
@@ -524,14 +727,17 @@ def update_reparto(db: Session, idContenido: str, idActor: str):
 
     return db_reparto
 
+@cacheado("Actor")
 def get_actor(db: Session, idActor: str):
     actor = db.query(models.Actor).filter(models.Actor.id == idActor).first()
     return actor
 
+@cacheado("Director")
 def get_director(db: Session, idDirector: str):
     director = db.query(models.Director).filter(models.Director.id == idDirector).first()
     return director
 
+@cacheado("Reparto", "Contenido", valoraciones=_refrescar_valoraciones)
 def get_content_by_actor(db: Session, idActor: str):
     #Obtener los idContenido de Reparto en los que existe el idActor
     idsContenido_by_actor = db.query(models.Reparto.idContenido).filter(models.Reparto.idActor == idActor).all()
@@ -544,11 +750,13 @@ def get_content_by_actor(db: Session, idActor: str):
 
     return contenidos
 
+@cacheado("Contenido", valoraciones=_refrescar_valoraciones)
 def get_content_by_director(db: Session, idDirector: str):
     # Recuperar los contenidos dentro de la tabla contenidos con ese idDirector
     contenidos = db.query(models.Contenido).filter(models.Contenido.idDirector == idDirector ).all()
     return contenidos
 
+@cacheado("Reparto", "Actor")
 def get_actors_by_content(db: Session, idContenido: str):
     #Obtener los idActores de Reparto en los que existe el idContenido
     idsActor_by_content = db.query(models.Reparto.idActor).filter(models.Reparto.idContenido == idContenido).all()
@@ -561,25 +769,85 @@ def get_actors_by_content(db: Session, idContenido: str):
 
     return actors
 
+@cacheado("Contenido", "Director")
 def get_director_by_content(db: Session, idContenido: str):
     # Recuperar el director dentro de la tabla contenidos con ese idContenido
     id_director = db.query(models.Contenido.idDirector).filter(models.Contenido.id == idContenido )
     director = db.query(models.Director).filter(models.Director.id == id_director).first()
     return director
 
+# Sustituye el reparto de un contenido por la lista de actores indicada: solo se insertan los actores
+# nuevos y se borran los que sobran, todo en una transacción. Si algún actor no existe no se cambia nada
+def reemplazar_reparto(db: Session, idContenido: str, idsActor: list[str]):
+    if db.scalar(select(models.Contenido.id).where(models.Contenido.id == idContenido)) is None:
+        return None
+    nuevos = list(dict.fromkeys(idsActor))  # Sin duplicados, conservando el orden
+    existentes = set(db.scalars(select(models.Actor.id).where(models.Actor.id.in_(nuevos)))) if nuevos else set()
+    desconocidos = [idActor for idActor in nuevos if idActor not in existentes]
+    if desconocidos:
+        return {"actoresAnadidos": [], "actoresEliminados": [], "actoresNoEncontrados": desconocidos}
+
+    actuales = set(db.scalars(select(models.Reparto.idActor).where(models.Reparto.idContenido == idContenido)))
+    anadidos = [idActor for idActor in nuevos if idActor not in actuales]
+    eliminados = sorted(actuales - set(nuevos))
+    if eliminados:
+        db.execute(delete(models.Reparto).where(models.Reparto.idContenido == idContenido,
+                                                models.Reparto.idActor.in_(eliminados)))
+    if anadidos:
+        db.execute(insert(models.Reparto), [{"idContenido": idContenido, "idActor": idActor} for idActor in anadidos])
+    db.commit()
+    return {"actoresAnadidos": anadidos, "actoresEliminados": eliminados, "actoresNoEncontrados": []}
+
 def delete_reparto(db: Session, contenido_id: str):
-    reparto = db.query(models.Reparto).filter(models.Reparto.idContenido == contenido_id).all()
-    if reparto:
-        for item in reparto:
-            db.delete(item)
-            db.commit()
-        return True
-    return False
+    # Un único DELETE y un commit en lugar de uno por fila
+    eliminados = db.execute(delete(models.Reparto).where(models.Reparto.idContenido == contenido_id)).rowcount
+    db.commit()
+    return eliminados > 0
 
 # Función para obtener los contenidos de un género específico
+@cacheado("Contenido", valoraciones=_refrescar_valoraciones)
 def get_contenidos_por_genero(db: Session, idGenero: str):
     return db.query(models.Contenido).filter(models.Contenido.idGenero == idGenero).all()
 
+# Fecha de lanzamiento comparable como texto: las fechas guardadas como DD-MM-YYYY se pasan a YYYY-MM-DD
+def _fecha_ordenable(columna):
+    return case(
+        (func.substr(columna, 3, 1) == "-",
+         func.substr(columna, 7, 4) + "-" + func.substr(columna, 4, 2) + "-" + func.substr(columna, 1, 2)),
+        else_=columna,
+    )
+
+# Criterios de orden de las estanterías de la pantalla principal
+ORDENES_ESTANTERIAS = {
+    "valoracion": lambda: (models.Contenido.valoracionPromedio.desc().nulls_last(), models.Contenido.id),
+    "fecha": lambda: (_fecha_ordenable(models.Contenido.fechaLanzamiento).desc(), models.Contenido.id),
+}
+
+# Los N primeros contenidos de cada género en una sola consulta: ROW_NUMBER() numera los contenidos
+# dentro de cada género según el orden pedido y solo se devuelven las primeras posiciones.
+# Las valoraciones nuevas actualizan las medias mostradas, pero el orden por valoración y qué
+# contenidos entran en cada estantería solo se recalculan al cambiar el catálogo o caducar la caché
+@cacheado("Contenido", "Genero", valoraciones=_refrescar_valoraciones)
+def get_estanterias_generos(db: Session, por_genero: int, orden: str = "valoracion"):
+    posicion = func.row_number().over(
+        partition_by=models.Contenido.idGenero, order_by=ORDENES_ESTANTERIAS[orden]()
+    ).label("posicion")
+    ranking = select(models.Contenido, posicion).subquery()
+    contenido = aliased(models.Contenido, ranking)
+    filas = (
+        db.query(models.Genero.id, models.Genero.nombre, contenido)
+        .join(ranking, ranking.c.idGenero == models.Genero.id)
+        .filter(ranking.c.posicion <= por_genero)
+        .order_by(models.Genero.nombre, models.Genero.id, ranking.c.posicion)
+        .all()
+    )
+
+    estanterias = {}
+    for idGenero, nombre, item in filas:
+        estanteria = estanterias.setdefault(idGenero, {"id": idGenero, "nombre": nombre, "contenidos": []})
+        estanteria["contenidos"].append(schemas.Contenido.model_validate(item))
+    return list(estanterias.values())
+
 # Función para crear un actor
 def create_actor(db: Session, actor: schemas.ActorCreate):
     db_actor = models.Actor (
@@ -587,9 +855,12 @@ def create_actor(db: Session, actor: schemas.ActorCreate):
         nacionalidad=actor.nacionalidad,
         fechaNacimiento=actor.fechaNacimiento
     )
+    antes = busqueda_difusa.inicio_escritura(db)
     db.add(db_actor)
+    cambio = busqueda_difusa.fin_escritura(db, antes)
     db.commit()
     db.refresh(db_actor)
+    busqueda_difusa.indice.indexar("actor", db_actor.id, db_actor.nombre, cambio)
     
     return db_actor
 
@@ -600,9 +871,12 @@ def create_director(db: Session, director: schemas.DirectorCreate):
         nacionalidad=director.nacionalidad,
         fechaNacimiento=director.fechaNacimiento
     )
+    antes = busqueda_difusa.inicio_escritura(db)
     db.add(db_director)
+    cambio = busqueda_difusa.fin_escritura(db, antes)
     db.commit()
     db.refresh(db_director)
+    busqueda_difusa.indice.indexar("director", db_director.id, db_director.nombre, cambio)
     
     return db_director    
 
@@ -610,30 +884,39 @@ def create_director(db: Session, director: schemas.DirectorCreate):
 def update_actor(db: Session, idActor: str, actor: schemas.ActorUpdate):
     actor_query = db.query(models.Actor).filter(models.Actor.id == idActor).first()
     if actor_query:
+        antes = busqueda_difusa.inicio_escritura(db)
         actor_query.nombre=actor.nombre
         actor_query.nacionalidad=actor.nacionalidad
         actor_query.fechaNacimiento=actor.fechaNacimiento
+        cambio = busqueda_difusa.fin_escritura(db, antes)
         db.commit()
         db.refresh(actor_query)
+        busqueda_difusa.indice.indexar("actor", actor_query.id, actor_query.nombre, cambio)
     return actor_query
 
 # Función para actualizar un director
 def update_director(db: Session, idDirector: str, director: schemas.DirectorUpdate):
     director_query = db.query(models.Director).filter(models.Director.id == idDirector).first()
     if director_query:
+        antes = busqueda_difusa.inicio_escritura(db)
         director_query.nombre=director.nombre
         director_query.nacionalidad=director.nacionalidad
         director_query.fechaNacimiento=director.fechaNacimiento
+        cambio = busqueda_difusa.fin_escritura(db, antes)
         db.commit()
         db.refresh(director_query)
+        busqueda_difusa.indice.indexar("director", director_query.id, director_query.nombre, cambio)
     return director_query
 
 # Función para eliminar un actor
 def delete_actor(db: Session, actor_id: str) -> bool:
     actor = db.query(models.Actor).filter(models.Actor.id == actor_id).first()
     if actor:
+        antes = busqueda_difusa.inicio_escritura(db)
         db.delete(actor)
+        cambio = busqueda_difusa.fin_escritura(db, antes)
         db.commit()
+        busqueda_difusa.indice.eliminar("actor", actor_id, cambio)
         return True
     return False
 
@@ -641,85 +924,143 @@ def delete_actor(db: Session, actor_id: str) -> bool:
 def delete_director(db: Session, director_id: str) -> bool:
     director = db.query(models.Director).filter(models.Director.id == director_id).first()
     if director:
+        antes = busqueda_difusa.inicio_escritura(db)
         db.delete(director)
+        cambio = busqueda_difusa.fin_escritura(db, antes)
         db.commit()
+        busqueda_difusa.indice.eliminar("director", director_id, cambio)
         return True
     return False
 
+# UPDATE atómico de la suma y el número de valoraciones; la media se recalcula en la misma sentencia
+# con los valores nuevos, así que dos valoraciones simultáneas nunca se pisan
+def _sentencia_valoracion():
+    tabla = models.Contenido.__table__
+    suma = tabla.c.sumaValoraciones + bindparam("delta_suma")
+    numero = tabla.c.numeroValoraciones + bindparam("delta_numero")
+    return (
+        update(tabla)
+        .where(tabla.c.id == bindparam("id_contenido"))
+        .values(
+            sumaValoraciones=suma,
+            numeroValoraciones=numero,
+            valoracionPromedio=case((numero > 0, suma / numero), else_=None),
+        )
+    )
+
+# Cambio que produce una valoración: si el usuario ya había valorado el contenido se sustituye
+# su valoración anterior (no cambia el número de valoraciones)
+def _delta_valoracion(valoracion: float, valoracionAnterior: Optional[float] = None):
+    if valoracionAnterior is None:
+        return float(valoracion), 1
+    return float(valoracion - valoracionAnterior), 0
+
 # Función para dar una valoración a un contenido
-def valorar_contenido(db: Session, idContenido: str, valoracion: int):
-    contenido = db.query(models.Contenido).filter(models.Contenido.id == idContenido).first()
-    if not contenido:
-        return None   
-    contenido.valoracionPromedio = (contenido.valoracionPromedio + valoracion)/2
+def valorar_contenido(db: Session, idContenido: str, valoracion: float, valoracionAnterior: Optional[float] = None):
+    delta_suma, delta_numero = _delta_valoracion(valoracion, valoracionAnterior)
+    tabla = models.Contenido.__table__
+    fila = db.execute(
+        _sentencia_valoracion().returning(tabla.c.valoracionPromedio, tabla.c.numeroValoraciones),
+        {"id_contenido": idContenido, "delta_suma": delta_suma, "delta_numero": delta_numero},
+    ).first()
+    if not fila:
+        db.rollback()
+        return None
     db.commit()
-    db.refresh(contenido)
-    return contenido
-
-def obtener_contenidos_busqueda(db: Session, busqueda: str):
-    # Se obtienen todos los contenidos que contienen la búsqueda en el título
-    contenidos_por_titulo = db.query(models.Contenido).filter(
-        models.Contenido.titulo.ilike(f"%{busqueda}%")
-    ).all()
-
-    # Se buscan los géneros cuyo nombre incluye la búsqueda
-    generos_coincidentes = db.query(models.Genero).filter(
-        models.Genero.nombre.ilike(f"%{busqueda}%")
-    ).all()
-
-    # Crear un mapa completo de idGenero -> nombre (todos los géneros en la base de datos)
-    todos_los_generos = db.query(models.Genero).all()
-    genero_map = {genero.id: genero.nombre for genero in todos_los_generos}
-
-    # Extraer los IDs de los géneros coincidentes con la búsqueda
-    genero_ids = [genero.id for genero in generos_coincidentes]
-
-    # Buscar contenidos por género
-    contenidos_por_genero = db.query(models.Contenido).filter(
-        models.Contenido.idGenero.in_(genero_ids)
-    ).all()
-
-    # Se juntan resultados y eliminan los duplicados
-    contenidos_totales = contenidos_por_titulo + contenidos_por_genero
-    contenidos_unicos = {contenido.id: contenido for contenido in contenidos_totales}.values()
-
-    # Formatear la respuesta incluyendo el nombre del género
-    resultados = [
-        {
-            "id": contenido.id,
-            "titulo": contenido.titulo,
-            "genero": genero_map.get(contenido.idGenero, "Género desconocido")  # Siempre usa el mapa completo
-        }
-        for contenido in contenidos_unicos
+    # RETURNING puede devolver como entero un REAL sin decimales
+    promedio = float(fila.valoracionPromedio) if fila.valoracionPromedio is not None else None
+    return {"valoracionPromedio": promedio, "numeroValoraciones": fila.numeroValoraciones}
+
+# Aplica un lote de valoraciones en una sola transacción. Los cambios de un mismo contenido se
+# suman antes, de modo que cada contenido se actualiza una única vez
+def valorar_contenidos_lote(db: Session, valoraciones: list[schemas.ValoracionDelta]):
+    deltas = {}
+    for item in valoraciones:
+        delta_suma, delta_numero = _delta_valoracion(item.valoracion, item.valoracionAnterior)
+        suma, numero = deltas.get(item.idContenido, (0.0, 0))
+        deltas[item.idContenido] = (suma + delta_suma, numero + delta_numero)
+
+    existentes = set()
+    if deltas:
+        existentes = set(db.scalars(select(models.Contenido.id).where(models.Contenido.id.in_(deltas))))
+    parametros = [
+        {"id_contenido": idContenido, "delta_suma": suma, "delta_numero": numero}
+        for idContenido, (suma, numero) in deltas.items() if idContenido in existentes
     ]
-
+    if parametros:
+        db.execute(_sentencia_valoracion(), parametros)
+    actualizados = db.execute(
+        select(models.Contenido.id, models.Contenido.valoracionPromedio, models.Contenido.numeroValoraciones)
+        .where(models.Contenido.id.in_(existentes))
+    ).all() if existentes else []
+    db.commit()
+    return {
+        "actualizados": {
+            fila.id: {"valoracionPromedio": fila.valoracionPromedio, "numeroValoraciones": fila.numeroValoraciones}
+            for fila in actualizados
+        },
+        "noEncontrados": [idContenido for idContenido in deltas if idContenido not in existentes],
+    }
+
+# Búsqueda de contenidos por título, descripción o género usando los índices FTS5
+@cacheado("Contenido", "Genero")
+def obtener_contenidos_busqueda(db: Session, busqueda: str, offset: int = 0, limit: int = 50):
+    resultados = busqueda_fts.buscar_contenidos(db, busqueda, offset, limit)
     if not resultados:
         return None
-    
     return resultados
 
 
-def obtener_actores_busqueda(db: Session, busqueda: str):
-    actores = db.query(models.Actor).filter(models.Actor.nombre.ilike(f"%{busqueda}%"))
-
-    
-    actores_coincidentes = [
-        {
-            "id": actor.id,
-            "nombre": actor.nombre,
-            "nacionalidad": actor.nacionalidad
-        }
-        for actor in actores
-    ]
-
+# Búsqueda de actores por nombre usando el índice FTS5
+@cacheado("Actor")
+def obtener_actores_busqueda(db: Session, busqueda: str, offset: int = 0, limit: int = 50):
+    actores_coincidentes = busqueda_fts.buscar_actores(db, busqueda, offset, limit)
     if not actores_coincidentes:
         return None
     return actores_coincidentes
 
 
+# Búsqueda de directores por nombre usando el índice FTS5
+@cacheado("Director")
+def obtener_directores_busqueda(db: Session, busqueda: str, offset: int = 0, limit: int = 50):
+    directores_coincidentes = busqueda_fts.buscar_directores(db, busqueda, offset, limit)
+    if not directores_coincidentes:
+        return None
+    return directores_coincidentes
+
+
+# Búsqueda tolerante a erratas con el índice en memoria. Completa cada resultado con los mismos
+# campos que devuelve la búsqueda por texto completo del tipo correspondiente
+def obtener_busqueda_difusa(db: Session, busqueda: str, tipo: str = "contenido", limit: int = 20):
+    busqueda_difusa.comprobar_cambios(db)
+    coincidencias = busqueda_difusa.indice.buscar(busqueda, tipo=tipo, limite=limit)
+    if not coincidencias:
+        return None
+    ids = [coincidencia["id"] for coincidencia in coincidencias]
+
+    if tipo == "contenido":
+        filas = db.query(models.Contenido.id, models.Contenido.titulo, models.Genero.nombre).outerjoin(
+            models.Genero, models.Genero.id == models.Contenido.idGenero
+        ).filter(models.Contenido.id.in_(ids)).all()
+        datos = {id: {"id": id, "titulo": titulo, "genero": genero or "Género desconocido"}
+                 for id, titulo, genero in filas}
+    else:
+        modelo = models.Actor if tipo == "actor" else models.Director
+        filas = db.query(modelo.id, modelo.nombre, modelo.nacionalidad).filter(modelo.id.in_(ids)).all()
+        datos = {id: {"id": id, "nombre": nombre, "nacionalidad": nacionalidad} for id, nombre, nacionalidad in filas}
+
+    return [
+        {**datos[coincidencia["id"]], "similitud": coincidencia["similitud"]}
+        for coincidencia in coincidencias
+        if coincidencia["id"] in datos
+    ]
+
+
+@cacheado("Actor")
 def get_actores(db: Session):
     return db.query(models.Actor).all()
 
+@cacheado("Director")
 def get_directores(db: Session):
     return db.query(models.Director).all()
 
@@ -729,8 +1070,11 @@ def eliminar_actor(db: Session, idActor: str) -> bool:
     if not actor:
         return False
 
+    antes = busqueda_difusa.inicio_escritura(db)
     db.delete(actor)
+    cambio = busqueda_difusa.fin_escritura(db, antes)
     db.commit()  # Confirmar los cambios en la base de datos
+    busqueda_difusa.indice.eliminar("actor", idActor, cambio)
     return True
 
 def eliminar_director(db: Session, idDirector: str) -> bool:
@@ -739,7 +1083,10 @@ def eliminar_director(db: Session, idDirector: str) -> bool:
     if not director:
         return False
 
+    antes = busqueda_difusa.inicio_escritura(db)
     db.delete(director)
+    cambio = busqueda_difusa.fin_escritura(db, antes)
     db.commit()  # Confirmar los cambios en la base de datos
+    busqueda_difusa.indice.eliminar("director", idDirector, cambio)
     return True
 
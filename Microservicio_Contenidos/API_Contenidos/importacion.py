@@ -0,0 +1,346 @@
+import argparse
+import contextlib
+import csv
+import json
+import os
+import sys
+import time
+from sqlalchemy import Float, Integer, text
+from sqlalchemy.exc import IntegrityError
+from . import models, busqueda_fts
+from .cache import eliminar_triggers_version, restaurar_triggers_version
+from .crud import _valoraciones_iniciales
+
+"""
+Autor: Grupo GA01 - ASEE
+Versión: 1.0
+Descripción: Importación masiva del catálogo desde ficheros CSV o JSONL.
+Los ficheros se leen en streaming y las filas se insertan con executemany en lotes de tamaño
+configurable, confirmando la transacción cada muchas filas en lugar de en cada fila. Opcionalmente
+se eliminan los índices secundarios y los triggers de FTS5 de las tablas que se cargan y se vuelven
+a crear al final, que es mucho más rápido que mantenerlos fila a fila.
+Las columnas de cada fichero son las de la tabla (ver models.py); los ids que falten se generan.
+Para cargas muy grandes conviene además SQLITE_PERFIL=rapido (ver configuracion_sqlite.py).
+Un servicio en marcha ve los cambios sin reiniciarse: la caché y los ETag dependen de la versión de
+las tablas guardada en la base de datos (ver cache.py) y el índice de búsqueda difusa se reconstruye en
+segundo plano cuando cambia esa versión (ver busqueda_difusa.comprobar_cambios).
+
+Comando de ejecución (desde Microservicio_Contenidos o /app en el contenedor):
+    python -m API_Contenidos.importacion --contenidos contenidos.jsonl --actores actores.csv \\
+        --reparto reparto.csv --lote 5000 --transaccion 100000 --diferir-indices
+
+"""
+
+# Entidades importables en orden de dependencias (las referenciadas antes que las que las referencian)
+ENTIDADES = {
+    "generos": models.Genero,
+    "directores": models.Director,
+    "actores": models.Actor,
+    "subtitulos": models.Subtitulo,
+    "doblajes": models.Doblaje,
+    "contenidos": models.Contenido,
+    "temporadas": models.Temporada,
+    "episodios": models.Episodio,
+    "reparto": models.Reparto,
+    "subtitulos_contenido": models.SubtituloContenido,
+    "doblajes_contenido": models.DoblajeContenido,
+}
+
+# Entidades que alimentan el índice de búsqueda difusa
+ENTIDADES_DIFUSAS = {"contenidos", "actores", "directores"}
+
+FORMATOS = ("csv", "jsonl")
+CONFLICTOS = ("ignorar", "actualizar")  # Qué hacer con las filas cuya clave primaria ya existe
+
+TAMANO_LOTE = 5000
+FILAS_TRANSACCION = 100000
+# Ids como máximo por consulta IN al comprobar las referencias (límite de parámetros de SQLite antiguo)
+MAX_IDS_CONSULTA = 900
+
+
+def formato_fichero(ruta: str) -> str:
+    extension = os.path.splitext(ruta)[1].lower().lstrip(".")
+    if extension in ("jsonl", "ndjson"):
+        return "jsonl"
+    if extension == "csv":
+        return "csv"
+    raise ValueError(f"Formato de fichero no reconocido: {ruta} (se admite .csv o .jsonl)")
+
+
+def leer_filas(fichero, formato: str):
+    """
+    Genera las filas (diccionarios) de un fichero de texto CSV con cabecera o JSONL, sin cargarlo entero.
+    """
+    if formato == "csv":
+        yield from csv.DictReader(fichero)
+    elif formato == "jsonl":
+        for numero, linea in enumerate(fichero, start=1):
+            if linea.strip():
+                try:
+                    yield json.loads(linea)
+                except json.JSONDecodeError as error:
+                    raise ValueError(f"Línea {numero}: JSON no válido ({error.msg})") from None
+    else:
+        raise ValueError(f"Formato desconocido: {formato} (disponibles: {', '.join(FORMATOS)})")
+
+
+def _tipo_columna(columna):
+    # CSV entrega siempre texto: se convierte según el tipo de la columna (en las numéricas "" es nulo)
+    if isinstance(columna.type, Integer):
+        return int
+    if isinstance(columna.type, Float):
+        return float
+    return str
+
+
+def _preparador(entidad: str):
+    """
+    Devuelve la función que convierte una fila leída en la tupla de valores del INSERT de la
+    entidad, en el orden de las columnas de la tabla. Los valores por defecto de models.py (ids
+    generados, contadores...) se aplican aquí.
+    """
+    tabla = ENTIDADES[entidad].__table__
+    conversiones = [(columna.name, _tipo_columna(columna)) for columna in tabla.columns]
+    nombres = {nombre for nombre, _ in conversiones}
+    posiciones = {nombre: posicion for posicion, (nombre, _) in enumerate(conversiones)}
+    defectos = [(posiciones[columna.name], columna.default) for columna in tabla.columns if columna.default is not None]
+    inicializar_valoraciones = entidad == "contenidos"
+
+    def preparar(fila: dict, numero: int) -> tuple:
+        if not nombres.issuperset(fila):
+            raise ValueError(f"{entidad}, fila {numero}: columnas desconocidas {sorted(set(fila) - nombres)} "
+                             f"(válidas: {', '.join(sorted(nombres))})")
+        valores = []
+        try:
+            for nombre, tipo in conversiones:
+                valor = fila.get(nombre)
+                if valor is None or valor == "":
+                    valores.append(valor if tipo is str else None)
+                else:
+                    valores.append(tipo(valor))
+        except (TypeError, ValueError) as error:
+            raise ValueError(f"{entidad}, fila {numero}: columna {nombre}: {error}") from None
+        if inicializar_valoraciones and valores[posiciones["sumaValoraciones"]] is None:
+            iniciales = _valoraciones_iniciales(valores[posiciones["valoracionPromedio"]])
+            for nombre, valor in iniciales.items():
+                valores[posiciones[nombre]] = valor
+        for posicion, defecto in defectos:
+            if valores[posicion] is None or valores[posicion] == "":
+                valores[posicion] = defecto.arg(None) if defecto.is_callable else defecto.arg
+        return tuple(valores)
+
+    return preparar
+
+
+def _referencias(entidad: str) -> list:
+    """
+    Columnas de la entidad que referencian otra tabla (ForeignKey de models.py), en el orden de la
+    tabla: [(posición en la tupla de valores, columna, tabla referenciada, columna referenciada)].
+    """
+    tabla = ENTIDADES[entidad].__table__
+    posiciones = {columna.name: posicion for posicion, columna in enumerate(tabla.columns)}
+    return sorted((posiciones[clave.parent.name], clave.parent.name, clave.column.table.name, clave.column.name)
+                  for clave in tabla.foreign_keys)
+
+
+def _comprobar_referencias(conexion, entidad: str, referencias: list, lote: list, primera: int, existentes: dict):
+    """
+    Lanza ValueError con la primera fila del lote que referencia un id inexistente. SQLite no lo comprueba:
+    PRAGMA foreign_keys está desactivado (el esquema tiene claves ajenas hacia columnas que no son únicas,
+    como Episodio.idTemporada, que lo harían fallar). existentes guarda los ids ya comprobados en esta
+    importación para cada tabla y columna referenciadas.
+    """
+    for posicion, columna, tabla, columna_referenciada in referencias:
+        conocidos = existentes.setdefault((tabla, columna_referenciada), set())
+        pendientes = list({fila[posicion] for fila in lote if fila[posicion] not in (None, "")} - conocidos)
+        for inicio in range(0, len(pendientes), MAX_IDS_CONSULTA):
+            ids = tuple(pendientes[inicio:inicio + MAX_IDS_CONSULTA])
+            marcadores = ", ".join("?" for _ in ids)
+            conocidos.update(fila[0] for fila in conexion.exec_driver_sql(
+                f'SELECT DISTINCT "{columna_referenciada}" FROM "{tabla}" WHERE "{columna_referenciada}" IN ({marcadores})',
+                ids))
+        for desplazamiento, fila in enumerate(lote):
+            if fila[posicion] not in (None, "") and fila[posicion] not in conocidos:
+                raise ValueError(f"{entidad}, fila {primera + desplazamiento}: {columna} {fila[posicion]!r} "
+                                 f"no existe en {tabla}")
+
+
+def _insertar_lote(conexion, entidad: str, sentencia: str, lote: list, primera: int) -> int:
+    """
+    Ejecuta el lote y devuelve las filas escritas. Si una fila incumple una restricción (p. ej. un NOT NULL)
+    se repite el lote fila a fila para indicar cuál es en el ValueError; la transacción la deshace importar.
+    """
+    try:
+        return conexion.exec_driver_sql(sentencia, lote).rowcount
+    except IntegrityError as error:
+        for desplazamiento, fila in enumerate(lote):
+            try:
+                conexion.exec_driver_sql(sentencia, fila)
+            except IntegrityError as error_fila:
+                raise ValueError(f"{entidad}, fila {primera + desplazamiento}: {error_fila.orig}") from None
+        raise ValueError(f"{entidad}: {error.orig}") from None
+
+
+def _sentencia_insercion(entidad: str, conflictos: str) -> str:
+    # SQL directo con parámetros posicionales: executemany de tuplas sin pasar por el compilador de SQLAlchemy
+    tabla = ENTIDADES[entidad].__table__
+    columnas = [columna.name for columna in tabla.columns]
+    claves = [columna.name for columna in tabla.primary_key.columns]
+    lista = ", ".join(f'"{columna}"' for columna in columnas)
+    lista_claves = ", ".join(f'"{clave}"' for clave in claves)
+    marcadores = ", ".join("?" for _ in columnas)
+    sentencia = f'INSERT INTO "{tabla.name}" ({lista}) VALUES ({marcadores}) ON CONFLICT ({lista_claves}) '
+    resto = [columna for columna in columnas if columna not in claves]
+    if conflictos == "actualizar" and resto:
+        # Solo se actualizan las filas que cambian: las idénticas cuentan como omitidas y no disparan triggers
+        actuales = ", ".join(f'"{tabla.name}"."{columna}"' for columna in resto)
+        nuevas = ", ".join(f'excluded."{columna}"' for columna in resto)
+        return (sentencia + "DO UPDATE SET " + ", ".join(f'"{columna}" = excluded."{columna}"' for columna in resto)
+                + f" WHERE ({actuales}) IS NOT ({nuevas})")
+    if conflictos not in CONFLICTOS:
+        raise ValueError(f"Modo de conflictos desconocido: {conflictos} (disponibles: {', '.join(CONFLICTOS)})")
+    return sentencia + "DO NOTHING"
+
+
+def importar(engine, entidad: str, filas, tamano_lote: int = TAMANO_LOTE,
+             filas_transaccion: int = FILAS_TRANSACCION, conflictos: str = "ignorar") -> dict:
+    """
+    Inserta las filas de una entidad en lotes de tamano_lote (executemany) y confirma cada
+    filas_transaccion filas. Si una fila no es válida (columnas o valores incorrectos, ids referenciados
+    que no existen o restricciones de la tabla) se deshace la transacción en curso (las anteriores ya
+    están confirmadas) y se lanza ValueError indicando la fila.
+    Devuelve las filas leídas, las escritas (insertadas o actualizadas), las omitidas (ya existían;
+    con conflictos="actualizar", ya existían con los mismos valores) y las filas por segundo.
+    """
+    if entidad not in ENTIDADES:
+        raise ValueError(f"Entidad desconocida: {entidad} (disponibles: {', '.join(ENTIDADES)})")
+    preparar = _preparador(entidad)
+    sentencia = _sentencia_insercion(entidad, conflictos)
+    referencias = _referencias(entidad)
+    existentes = {}
+    leidas = escritas = 0
+    inicio = time.perf_counter()
+
+    with engine.connect() as conexion:
+        transaccion = conexion.begin()
+        try:
+            lote = []
+            sin_confirmar = 0
+            for numero, fila in enumerate(filas, start=1):
+                lote.append(preparar(fila, numero))
+                if len(lote) >= tamano_lote:
+                    _comprobar_referencias(conexion, entidad, referencias, lote, leidas + 1, existentes)
+                    escritas += _insertar_lote(conexion, entidad, sentencia, lote, leidas + 1)
+                    sin_confirmar += len(lote)
+                    leidas += len(lote)
+                    lote = []
+                    if sin_confirmar >= filas_transaccion:
+                        transaccion.commit()
+                        transaccion = conexion.begin()
+                        sin_confirmar = 0
+            if lote:
+                _comprobar_referencias(conexion, entidad, referencias, lote, leidas + 1, existentes)
+                escritas += _insertar_lote(conexion, entidad, sentencia, lote, leidas + 1)
+                leidas += len(lote)
+            transaccion.commit()
+        except Exception:
+            transaccion.rollback()
+            raise
+
+    segundos = time.perf_counter() - inicio
+    return {
+        "entidad": entidad,
+        "filas": leidas,
+        "escritas": escritas,
+        "omitidas": leidas - escritas,
+        "segundos": round(segundos, 3),
+        "filas_s": round(leidas / segundos) if segundos > 0 else None,
+    }
+
+
+@contextlib.contextmanager
+def indices_diferidos(engine, entidades):
+    """
+    Elimina los índices secundarios y los triggers de FTS5 y de versión de las tablas de las entidades
+    y los vuelve a crear (y rellenar) al salir, aunque la importación falle. La versión de cada tabla
+    se incrementa entonces una sola vez en lugar de en cada fila.
+    """
+    tablas = [ENTIDADES[entidad].__table__ for entidad in entidades]
+    with engine.begin() as conexion:
+        for tabla in tablas:
+            for indice in tabla.indexes:
+                conexion.execute(text(f'DROP INDEX IF EXISTS "{indice.name}"'))
+        eliminar_triggers_version(conexion, [tabla.name for tabla in tablas])
+    tablas_fts = busqueda_fts.eliminar_triggers(engine, {tabla.name for tabla in tablas})
+    try:
+        yield
+    finally:
+        inicio = time.perf_counter()
+        with engine.begin() as conexion:
+            for tabla in tablas:
+                for indice in tabla.indexes:
+                    indice.create(conexion, checkfirst=True)
+            restaurar_triggers_version(conexion, [tabla.name for tabla in tablas])
+        busqueda_fts.inicializar_indices(engine)
+        if tablas_fts:
+            busqueda_fts.reconstruir_indices(engine, tablas_fts)
+        print(f"Índices reconstruidos en {time.perf_counter() - inicio:.2f} s.")
+
+
+def importar_ficheros(engine, ficheros: dict, tamano_lote: int = TAMANO_LOTE,
+                      filas_transaccion: int = FILAS_TRANSACCION, conflictos: str = "ignorar",
+                      diferir_indices: bool = False) -> list:
+    """
+    Importa {entidad: ruta} en orden de dependencias y devuelve el resultado de cada entidad.
+    """
+    entidades = [entidad for entidad in ENTIDADES if entidad in ficheros]
+    resultados = []
+    contexto = indices_diferidos(engine, entidades) if diferir_indices else contextlib.nullcontext()
+    with contexto:
+        for entidad in entidades:
+            ruta = ficheros[entidad]
+            with open(ruta, encoding="utf-8", newline="") as fichero:
+                resultado = importar(engine, entidad, leer_filas(fichero, formato_fichero(ruta)),
+                                     tamano_lote, filas_transaccion, conflictos)
+            print(f"{entidad}: {resultado['filas']} filas ({resultado['escritas']} escritas, "
+                  f"{resultado['omitidas']} omitidas) "
+                  f"en {resultado['segundos']:.2f} s, {resultado['filas_s']} filas/s")
+            resultados.append(resultado)
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Importación masiva del catálogo desde CSV o JSONL")
+    for entidad in ENTIDADES:
+        parser.add_argument(f"--{entidad.replace('_', '-')}", dest=entidad, metavar="FICHERO",
+                            help=f"Fichero .csv o .jsonl de {entidad.replace('_', ' ')}")
+    parser.add_argument("--lote", type=int, default=TAMANO_LOTE, help="Filas por executemany")
+    parser.add_argument("--transaccion", type=int, default=FILAS_TRANSACCION, help="Filas por commit")
+    parser.add_argument("--conflictos", choices=CONFLICTOS, default="ignorar",
+                        help="Qué hacer si la clave primaria ya existe")
+    parser.add_argument("--diferir-indices", action="store_true",
+                        help="Elimina los índices secundarios durante la carga y los crea al final")
+    args = parser.parse_args()
+
+    ficheros = {entidad: getattr(args, entidad) for entidad in ENTIDADES if getattr(args, entidad)}
+    if not ficheros:
+        parser.error("Indica al menos un fichero a importar")
+
+    from .database import engine, initialize_database
+
+    initialize_database()
+    inicio = time.perf_counter()
+    try:
+        resultados = importar_ficheros(engine, ficheros, args.lote, args.transaccion, args.conflictos,
+                                       args.diferir_indices)
+    except (OSError, ValueError) as error:
+        print(f"Error en la importación: {error}")
+        return 1
+    segundos = time.perf_counter() - inicio
+    filas = sum(resultado["filas"] for resultado in resultados)
+    print(f"Total: {filas} filas en {segundos:.2f} s ({filas / segundos:.0f} filas/s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
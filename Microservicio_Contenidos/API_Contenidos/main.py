@@ -1,7 +1,13 @@
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from typing import Optional
 from sqlalchemy.orm import Session
-from . import models, schemas, crud
-from .database import engine, get_db, initialize_database
+import io
+import tempfile
+from . import models, schemas, crud, busqueda_fts, busqueda_difusa, importacion
+from .cache import cache
+from .database import engine, get_db, initialize_database, usa_bd, SessionLocal
 
 """
 Autor: Grupo GA01 - ASEE
@@ -20,29 +26,66 @@ app = FastAPI(
 )
 
 initialize_database()
-
-# Dependency para obtener la sesión de base de datos
-def get_database():
-    db = next(get_db())
-    return db
+# Índices de búsqueda de texto completo (se crean y rellenan solo la primera vez)
+busqueda_fts.inicializar_indices(engine)
+
+# Índice en memoria para la búsqueda tolerante a erratas y el autocompletado
+with SessionLocal() as db_indice:
+    busqueda_difusa.reconstruir(db_indice)
+print(f"Índice de búsqueda difusa construido en {busqueda_difusa.indice.segundos_construccion:.3f} s.")
+
+# Número máximo de ids que se aceptan en una consulta de contenidos por lotes y de valoraciones por lote
+MAX_IDS_LOTE = 500
+MAX_VALORACIONES_LOTE = 10000
+
+# Tamaño de página interno al recorrer el catálogo completo y máximo de limit en GET /contenidos
+TAMANO_PAGINA_CONTENIDOS = 500
+MAX_LIMITE_CONTENIDOS = 1000
+
+# Máximo de contenidos por género en las estanterías de la pantalla principal
+MAX_POR_GENERO = 100
+
+# Dependency para las peticiones condicionales: añade el ETag de las tablas consultadas y,
+# si el cliente ya tiene esa versión (If-None-Match), responde 304 sin cuerpo.
+# Las respuestas que incluyen la media de valoraciones dependen además de "Valoraciones"
+def versionado(*tablas: str):
+    def comprobar_etag(request: Request, response: Response):
+        etag = cache.etag_tablas(tablas)
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match:
+            etiquetas = [etiqueta.strip().removeprefix("W/") for etiqueta in if_none_match.split(",")]
+            if "*" in etiquetas or etag in etiquetas:
+                raise HTTPException(status_code=304, headers={"ETag": etag})
+        response.headers["ETag"] = etag
+    return Depends(comprobar_etag)
+
+# Endpoint para consultar el estado de la caché de lecturas del catálogo
+@app.get("/cache/estadisticas")
+def get_estadisticas_cache():
+    return cache.estadisticas()
 
 @app.post("/peliculas", response_model=schemas.Pelicula)
+@usa_bd
 def create_pelicula(pelicula: schemas.PeliculaCreate, db: Session = Depends(get_db)):
     return crud.create_pelicula(db=db, pelicula=pelicula)
 
 @app.post("/series", response_model=schemas.Contenido)
+@usa_bd
 def create_serie(serie: schemas.SerieCreate, db: Session = Depends(get_db)):
     return crud.create_serie(db=db, serie=serie)
 
 @app.post("/contenidos/{idContenido}/temporadas", response_model=schemas.Temporada)
+@usa_bd
 def create_temporada(idContenido: str, temporada: schemas.TemporadaCreate, db: Session = Depends(get_db)):
     return crud.create_temporada(db=db, temporada=temporada, idContenido=idContenido)
 
 @app.post("/contenidos/{idContenido}/temporadas/{idTemporada}/episodios", response_model=schemas.Episodio)
+@usa_bd
 def create_episodio(idContenido: str, idTemporada: str, episodio: schemas.EpisodioCreate, db: Session = Depends(get_db)):
     return crud.create_episodio(db=db, episodio=episodio, idContenido=idContenido, idTemporada=idTemporada)
 
 @app.put("/peliculas/{idPelicula}")
+@usa_bd
 def update_pelicula(idPelicula: str, pelicula_data: schemas.PeliculaUpdate, db: Session = Depends(get_db)):
     # Si no todos los campos son enviados mediante el cliente, el metodo debe recibir un "None"
     pelicula = crud.update_content(db=db, content_id=idPelicula, content_data=pelicula_data)
@@ -51,6 +94,7 @@ def update_pelicula(idPelicula: str, pelicula_data: schemas.PeliculaUpdate, db:
     return {"message": "Datos de película actualizados exitosamente"}
 
 @app.put("/series/{idSerie}")
+@usa_bd
 def update_serie(idSerie: str, serie_data: schemas.SerieUpdate, db: Session = Depends(get_db)):
     serie = crud.update_content(db=db, content_id=idSerie, content_data=serie_data)
     if serie is None:
@@ -58,22 +102,27 @@ def update_serie(idSerie: str, serie_data: schemas.SerieUpdate, db: Session = De
     return {"message": "Datos de serie actualizados exitosamente"}
 
 @app.post("/contenidos/subtitulos/{idSubtitulo}/{idioma}")
+@usa_bd
 def create_subtitulos(idSubtitulo: str, idioma: str, db: Session = Depends(get_db)):
     return crud.create_subtitulos(db=db, subtitulo_id=idSubtitulo, idioma=idioma)
 
 @app.delete("/contenidos/subtitulos/{idSubtitulo}")
+@usa_bd
 def delete_subtitulo(idSubtitulo: str, db: Session = Depends(get_db)):
     return crud.delete_subtitulo(db=db, subtitulo_id=idSubtitulo)
 
 @app.post("/contenidos/{idSubtitulosContenido}/subtitulos/{idSubtitulo}")
+@usa_bd
 def update_subtitulos(idSubtitulosContenido: str, idSubtitulo: str, db: Session = Depends(get_db)):
     return crud.update_subtitulo(db=db, idSubtitulosContenido=idSubtitulosContenido, subtitulo_id=idSubtitulo)  
 
-@app.get("/contenidos/{idSubtitulosContenido}/subtitulos")
+@app.get("/contenidos/{idSubtitulosContenido}/subtitulos", dependencies=[versionado("Subtitulo", "SubtituloContenido")])
+@usa_bd
 def get_subtitulos(idSubtitulosContenido: str, db: Session = Depends(get_db)):
     return crud.get_subtitulos(db=db, idSubtitulosContenido=idSubtitulosContenido)
 
 @app.delete("/contenidos/{idSubtitulosContenido}/subtitulos/{idSubtitulo}") 
+@usa_bd
 def delete_subtitulos(idSubtitulosContenido: str, idSubtitulo: str, db: Session = Depends(get_db)):
     result = crud.delete_subtitulos(db=db, idSubtitulosContenido=idSubtitulosContenido, subtitulo_id=idSubtitulo)
     
@@ -84,22 +133,27 @@ def delete_subtitulos(idSubtitulosContenido: str, idSubtitulo: str, db: Session
         raise HTTPException(status_code=400, detail=result.get("message")) 
 
 @app.post("/contenidos/doblajes/{idDoblaje}/{idioma}")
+@usa_bd
 def create_doblajes(idDoblaje: str, idioma: str, db: Session = Depends(get_db)):
     return crud.create_doblajes(db=db, doblaje_id=idDoblaje, idioma=idioma)
 
 @app.delete("/contenidos/doblajes/{idDoblaje}")
+@usa_bd
 def delete_doblaje(idDoblaje: str, db: Session = Depends(get_db)):
     return crud.delete_doblaje(db=db, doblaje_id=idDoblaje)
 
 @app.post("/contenidos/{idDoblajeContenido}/doblajes/{idDoblaje}")
+@usa_bd
 def update_doblaje(idDoblajeContenido: str, idDoblaje: str, db: Session = Depends(get_db)):
     return crud.update_doblaje(db=db, idDoblajeContenido=idDoblajeContenido, doblaje_id=idDoblaje)
 
-@app.get("/contenidos/{idDoblajeContenido}/doblajes")
+@app.get("/contenidos/{idDoblajeContenido}/doblajes", dependencies=[versionado("Doblaje", "DoblajeContenido")])
+@usa_bd
 def get_doblajes(idDoblajeContenido: str, db: Session = Depends(get_db)):
     return crud.get_doblajes(db=db, idDoblajeContenido=idDoblajeContenido)
 
 @app.delete("/contenidos/{idDoblajeContenido}/doblajes/{idDoblaje}") 
+@usa_bd
 def delete_doblajes(idDoblajeContenido: str, idDoblaje: str, db: Session = Depends(get_db)):
     result = crud.delete_doblajes(db=db, idDoblajeContenido=idDoblajeContenido, doblaje_id=idDoblaje)
     
@@ -110,12 +164,14 @@ def delete_doblajes(idDoblajeContenido: str, idDoblaje: str, db: Session = Depen
         raise HTTPException(status_code=400, detail=result.get("message"))
 
 # Endpoint para obtener todos los subtitulos
-@app.get("/contenidos/subtitulos")
+@app.get("/contenidos/subtitulos", dependencies=[versionado("Subtitulo")])
+@usa_bd
 def get_all_subtitulos(db: Session = Depends(get_db)):
     return crud.get_all_subtitulos(db=db)
 
 # Endpoint para obtener todos los doblajes
-@app.get("/contenidos/doblajes")
+@app.get("/contenidos/doblajes", dependencies=[versionado("Doblaje")])
+@usa_bd
 def get_all_doblajes(db: Session = Depends(get_db)):
     return crud.get_all_doblajes(db=db)
 
@@ -123,6 +179,7 @@ def get_all_doblajes(db: Session = Depends(get_db)):
 @app.delete("/contenidos/{idContenido}/temporadas/{idTemporada}/episodios/{idEpisodio}", tags=["Eliminar contenido"])
 @app.delete("/contenidos/{idContenido}/temporadas/{idTemporada}", tags=["Eliminar contenido"])
 @app.delete("/contenidos/{idContenido}", tags=["Eliminar contenido"])
+@usa_bd
 def delete_content(
     idContenido: str, 
     idTemporada: str = None, 
@@ -150,7 +207,8 @@ def delete_content(
             raise HTTPException(status_code=404, detail="Contenido no encontrado")
         return {"message": "Contenido eliminado exitosamente"}
     
-@app.get("/peliculas/{idContenido}", response_model=schemas.Contenido)
+@app.get("/peliculas/{idContenido}", response_model=schemas.Contenido, dependencies=[versionado("Contenido", "Valoraciones")])
+@usa_bd
 def get_peliculas(idContenido: str, db: Session = Depends(get_db)):
     # Llamada al CRUD para obtener el contenido por id
     contenido = crud.get_pelicula_by_id(db=db, id_contenido=idContenido)    
@@ -159,28 +217,75 @@ def get_peliculas(idContenido: str, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Pelicula no encontrada")    
     return contenido
 
-@app.get("/contenidos", response_model=list[schemas.Contenido])
-def obtener_todos_los_contenidos(db: Session = Depends(get_db)):
-    contenidos = crud.get_all_contenidos(db)
-    return contenidos
-
-@app.get("/todoseries", response_model=list[schemas.Contenido])
+# Genera las páginas de contenidos una a una con su propia sesión, porque el cuerpo de la
+# respuesta se envía cuando la sesión de la petición ya se ha cerrado
+def paginas_contenidos(after_id: Optional[str], tipoContenido: Optional[str], idGenero: Optional[str]):
+    db = SessionLocal()
+    try:
+        while True:
+            pagina = crud.get_contenidos_pagina(db, after_id, TAMANO_PAGINA_CONTENIDOS, tipoContenido, idGenero)
+            if pagina:
+                yield pagina
+            if len(pagina) < TAMANO_PAGINA_CONTENIDOS:
+                return
+            after_id = pagina[-1].id
+            db.expunge_all()  # Memoria constante aunque el catálogo sea grande
+    finally:
+        db.close()
+
+# Serializa las páginas como un único array JSON sin tenerlo entero en memoria
+def json_contenidos(paginas):
+    yield "["
+    separador = ""
+    for pagina in paginas:
+        for contenido in pagina:
+            yield separador + schemas.Contenido.model_validate(contenido).model_dump_json()
+            separador = ","
+    yield "]"
+
+# Listado de contenidos. Con limit devuelve una página y la cabecera X-Siguiente-Cursor (valor para
+# after_id) si puede haber más; sin limit devuelve todo el catálogo, leído y enviado por páginas
+@app.get("/contenidos", response_model=list[schemas.Contenido], dependencies=[versionado("Contenido", "Valoraciones")])
+@usa_bd
+def obtener_todos_los_contenidos(
+    response: Response,
+    after_id: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_LIMITE_CONTENIDOS),
+    tipoContenido: Optional[str] = None,
+    idGenero: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    cabeceras = {"ETag": response.headers["ETag"]}
+    if limit is None:
+        paginas = paginas_contenidos(after_id, tipoContenido, idGenero)
+    else:
+        pagina = crud.get_contenidos_pagina(db, after_id, limit, tipoContenido, idGenero)
+        if len(pagina) == limit:
+            cabeceras["X-Siguiente-Cursor"] = pagina[-1].id
+        paginas = [pagina]
+    return StreamingResponse(json_contenidos(paginas), media_type="application/json", headers=cabeceras)
+
+@app.get("/todoseries", response_model=list[schemas.Contenido], dependencies=[versionado("Contenido", "Valoraciones")])
+@usa_bd
 def get_todoseries(db: Session = Depends(get_db)):
     series = crud.get_todoseries(db=db)
     return series
 
-@app.get("/todopeliculas", response_model=list[schemas.Contenido])
+@app.get("/todopeliculas", response_model=list[schemas.Contenido], dependencies=[versionado("Contenido", "Valoraciones")])
+@usa_bd
 def get_todopeliculas(db: Session = Depends(get_db)):
     peliculas = crud.get_todopeliculas(db=db)
     return peliculas
 
 @app.get("/contenidos/{idSerie}/temporadas")
+@usa_bd
 def get_temporadas(idSerie: str, db: Session = Depends(get_db)):
     temporadas = crud.get_temporadas_by_serie(db, idSerie)
     return temporadas
 
 
-@app.get("/contenidos/{idContenido}", response_model=schemas.Contenido)
+@app.get("/contenidos/{idContenido}", response_model=schemas.Contenido, dependencies=[versionado("Contenido", "Valoraciones")])
+@usa_bd
 def get_contenido(idContenido: str, db: Session = Depends(get_db)):
     # Llamada al CRUD para obtener el contenido por id
     contenido = crud.get_contenido_by_id(db=db, id_contenido=idContenido)    
@@ -189,16 +294,36 @@ def get_contenido(idContenido: str, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Contenido no encontrado")    
     return contenido
 
-@app.get("/series/{idSerie}", response_model=schemas.SeriesGet)
+@app.post("/contenidos/batch", response_model=dict[str, schemas.Contenido])
+@usa_bd
+def get_contenidos_lote(lote: schemas.ContenidosLote, db: Session = Depends(get_db)):
+    # Devuelve los contenidos encontrados indexados por id (los ids inexistentes se omiten)
+    if len(lote.ids) > MAX_IDS_LOTE:
+        raise HTTPException(status_code=400, detail=f"No se pueden consultar más de {MAX_IDS_LOTE} contenidos por petición")
+    return crud.get_contenidos_by_ids(db=db, ids=lote.ids)
+
+# Endpoint con el detalle completo de un contenido en un solo documento (para la página de detalle)
+@app.get("/contenidos/{idContenido}/detalle", response_model=schemas.ContenidoDetalle,
+         dependencies=[versionado(*crud.TABLAS_DETALLE, "Valoraciones")])
+@usa_bd
+def get_detalle_contenido(idContenido: str, db: Session = Depends(get_db)):
+    detalle = crud.get_detalle_contenido(db=db, idContenido=idContenido)
+    if not detalle:
+        raise HTTPException(status_code=404, detail="Contenido no encontrado")
+    return detalle
+
+@app.get("/series/{idSerie}", response_model=schemas.SeriesGet, dependencies=[versionado("Contenido", "Temporada", "Episodio")])
+@usa_bd
 def get_series(idSerie: str, db: Session = Depends(get_db)):
     serie = crud.get_serie_con_temporadas_episodios(db=db, idSerie=idSerie)
     if not serie:
         raise HTTPException(status_code=404, detail="Serie no encontrada")  
     return serie
 
-@app.get("/series", response_model=list[schemas.SeriesGet])
-def get_all_series(db: Session = Depends(get_db)):
-    series = crud.get_all_series_con_temporadas_episodios(db=db)
+@app.get("/series", response_model=list[schemas.SeriesGet], dependencies=[versionado("Contenido", "Temporada", "Episodio")])
+@usa_bd
+def get_all_series(offset: int = Query(0, ge=0), limit: Optional[int] = Query(None, ge=1), db: Session = Depends(get_db)):
+    series = crud.get_all_series_con_temporadas_episodios(db=db, offset=offset, limit=limit)
 
     if not series:
         raise HTTPException(status_code=404, detail="No existen series")
@@ -206,6 +331,7 @@ def get_all_series(db: Session = Depends(get_db)):
     return series
 
 @app.get("/contenidos/{idContenido}/temporadas/{idTemporada}", response_model=schemas.Temporada)
+@usa_bd
 def get_temporada(idContenido: str, idTemporada: str, db: Session = Depends(get_db)):
     temporada = crud.get_temporada(db=db, idContenido=idContenido, idTemporada=idTemporada)
     if not temporada:
@@ -213,6 +339,7 @@ def get_temporada(idContenido: str, idTemporada: str, db: Session = Depends(get_
     return temporada
 
 @app.put("/contenidos/{idContenido}/temporadas/{idTemporada}")
+@usa_bd
 def update_temporada(idContenido: str, idTemporada: str, temporada_data: schemas.TemporadaUpdate, db: Session = Depends(get_db)):
     temporada = crud.update_temporada(db=db, idContenido=idContenido, idTemporada=idTemporada, temporada=temporada_data)
     if not temporada:
@@ -220,6 +347,7 @@ def update_temporada(idContenido: str, idTemporada: str, temporada_data: schemas
     return {"message": "Temporada actualizada exitosamente"}
 
 @app.get("/contenidos/{idContenido}/temporadas/{idTemporada}/episodios/{idEpisodio}", response_model=schemas.Episodio)
+@usa_bd
 def get_episodio(idContenido: str, idTemporada: str, idEpisodio: str, db: Session = Depends(get_db)):
     episodio = crud.get_episodio(db=db, idContenido=idContenido, idTemporada=idTemporada, idEpisodio=idEpisodio)
     if not episodio:
@@ -227,27 +355,42 @@ def get_episodio(idContenido: str, idTemporada: str, idEpisodio: str, db: Sessio
     return episodio
 
 @app.put("/contenidos/{idContenido}/temporadas/{idTemporada}/episodios/{idEpisodio}")
+@usa_bd
 def update_episodio(idContenido: str, idTemporada: str, idEpisodio: str, episodio_data: schemas.EpisodioUpdate, db: Session = Depends(get_db)):
     episodio_nuevo = crud.update_episodio(db=db, idContenido=idContenido, idTemporada=idTemporada, idEpisodio=idEpisodio, episodio_nuevo=episodio_data)
     if not episodio_nuevo:
         raise HTTPException(status_code=404, detail="Episodio no actualizado")
     return {"message": "Episodio actualizado exitosamente"}
 
-@app.get("/generos/{idGenero}", response_model=schemas.Genero)
+# Endpoint para la pantalla principal: los por_genero primeros contenidos de cada género en una respuesta
+# (los géneros sin contenidos no aparecen)
+@app.get("/generos/estanterias", response_model=list[schemas.EstanteriaGenero],
+         dependencies=[versionado("Contenido", "Genero", "Valoraciones")])
+@usa_bd
+def get_estanterias_generos(por_genero: int = Query(20, ge=1, le=MAX_POR_GENERO),
+                            orden: str = Query("valoracion", pattern="^(valoracion|fecha)$"),
+                            db: Session = Depends(get_db)):
+    return crud.get_estanterias_generos(db=db, por_genero=por_genero, orden=orden)
+
+@app.get("/generos/{idGenero}", response_model=schemas.Genero, dependencies=[versionado("Genero")])
+@usa_bd
 def get_genero(idGenero: str, db: Session = Depends(get_db)):
     genero = crud.get_genero(db=db, genero_id=idGenero)
     return genero
 
-@app.get("/generos", response_model=list[schemas.Genero])
+@app.get("/generos", response_model=list[schemas.Genero], dependencies=[versionado("Genero")])
+@usa_bd
 def get_generos(db: Session = Depends(get_db)):
     generos = crud.get_generos(db=db)
     return generos
 
 @app.post("/generos", response_model=schemas.Genero)
+@usa_bd
 def create_genero(genero: schemas.GeneroCreate, db: Session = Depends(get_db)):
     return crud.create_genero(db=db, genero=genero)
 
 @app.put("/generos/{idGenero}")
+@usa_bd
 def update_genero(idGenero: str, genero_data: schemas.GeneroUpdate, db: Session = Depends(get_db)):
     genero = crud.update_genero(db=db, genero_id=idGenero, genero=genero_data)
     if genero is None:
@@ -255,13 +398,15 @@ def update_genero(idGenero: str, genero_data: schemas.GeneroUpdate, db: Session
     return {"message": "Datos del género actualizados exitosamente"}            
 
 @app.delete("/generos/{idGenero}")
+@usa_bd
 def delete_genero(idGenero: str, db: Session = Depends(get_db)):
     success = crud.delete_genero(db=db, genero_id=idGenero)
     if not success:
         raise HTTPException(status_code=404, detail="Género no encontrado")
     return {"message": "Género eliminado exitosamente"}    
 
-@app.get("/generos/{idGenero}/contenidos", response_model=list[schemas.Contenido])
+@app.get("/generos/{idGenero}/contenidos", response_model=list[schemas.Contenido], dependencies=[versionado("Contenido", "Valoraciones")])
+@usa_bd
 def get_contenidos_genero(idGenero: str, db: Session = Depends(get_db)):
     contenidos = crud.get_contenidos_por_genero(db=db, idGenero=idGenero)
     if not contenidos:
@@ -269,17 +414,32 @@ def get_contenidos_genero(idGenero: str, db: Session = Depends(get_db)):
     return contenidos 
 
 # Endpoint para asignar una nueva valoración a un contenido y recalcular el promedio
+# (valoracionAnterior: valoración del mismo usuario que se sustituye)
 @app.put("/contenidos/{idContenido}/valoracion")
-def actualizar_valoracion_contenido(idContenido: str, valoracion: int, db: Session = Depends(get_db)):
-    valoracion_contenido = crud.valorar_contenido(db=db, idContenido=idContenido, valoracion=valoracion)
+@usa_bd
+def actualizar_valoracion_contenido(idContenido: str, valoracion: float, valoracionAnterior: Optional[float] = None,
+                                    db: Session = Depends(get_db)):
+    valoracion_contenido = crud.valorar_contenido(db=db, idContenido=idContenido, valoracion=valoracion,
+                                                  valoracionAnterior=valoracionAnterior)
     if not valoracion_contenido:
         raise HTTPException(status_code=404, detail="Contenido no encontrado")
-    return {"message": "Valoración del contenido actualizada exitosamente"} 
-
-#Endpoint para buscar contenidos por: titulo, genero 
+    return {"message": "Valoración del contenido actualizada exitosamente", **valoracion_contenido}
+
+# Endpoint para aplicar muchas valoraciones en una sola transacción
+@app.post("/contenidos/valoraciones/batch")
+@usa_bd
+def valorar_contenidos_lote(lote: schemas.ValoracionesLote, db: Session = Depends(get_db)):
+    if len(lote.valoraciones) > MAX_VALORACIONES_LOTE:
+        raise HTTPException(status_code=400,
+                            detail=f"No se pueden enviar más de {MAX_VALORACIONES_LOTE} valoraciones por petición")
+    return crud.valorar_contenidos_lote(db=db, valoraciones=lote.valoraciones)
+
+#Endpoint para buscar contenidos por: titulo, descripcion, genero (ordenados por relevancia)
 @app.get("/contenidos/{busqueda}/buscar")
-def buscar_contenidos(busqueda: str, db: Session = Depends(get_db)):
-    contenidos = crud.obtener_contenidos_busqueda(db=db, busqueda=busqueda)
+@usa_bd
+def buscar_contenidos(busqueda: str, offset: int = Query(0, ge=0), limit: int = Query(50, ge=1, le=200),
+                      db: Session = Depends(get_db)):
+    contenidos = crud.obtener_contenidos_busqueda(db=db, busqueda=busqueda, offset=offset, limit=limit)
     if not contenidos:
         raise HTTPException(status_code=404, detail="No existen resultados para esa búsqueda")
     
@@ -287,15 +447,54 @@ def buscar_contenidos(busqueda: str, db: Session = Depends(get_db)):
 
 #Endpoint para buscar actores por: nombre
 @app.get("/contenidos/{busqueda}/actores")
-def buscar_actores(busqueda: str, db: Session = Depends(get_db)):
-    actores = crud.obtener_actores_busqueda(db=db, busqueda=busqueda)
+@usa_bd
+def buscar_actores(busqueda: str, offset: int = Query(0, ge=0), limit: int = Query(50, ge=1, le=200),
+                   db: Session = Depends(get_db)):
+    actores = crud.obtener_actores_busqueda(db=db, busqueda=busqueda, offset=offset, limit=limit)
     if not actores:
         raise HTTPException(status_code=404, detail="No existen actores para esa búsqueda")
     return {"resultados": actores}
 
-    
+#Endpoint para buscar directores por: nombre
+@app.get("/contenidos/{busqueda}/directores")
+@usa_bd
+def buscar_directores(busqueda: str, offset: int = Query(0, ge=0), limit: int = Query(50, ge=1, le=200),
+                      db: Session = Depends(get_db)):
+    directores = crud.obtener_directores_busqueda(db=db, busqueda=busqueda, offset=offset, limit=limit)
+    if not directores:
+        raise HTTPException(status_code=404, detail="No existen directores para esa búsqueda")
+    return {"resultados": directores}
+
+
+#Endpoint para buscar contenidos, actores o directores admitiendo errores de escritura
+@app.get("/buscar/difusa")
+@usa_bd
+def buscar_difusa(q: str = Query(..., min_length=1),
+                  tipo: str = Query("contenido", pattern="^(contenido|actor|director)$"),
+                  limit: int = Query(20, ge=1, le=100), db: Session = Depends(get_db)):
+    resultados = crud.obtener_busqueda_difusa(db=db, busqueda=q, tipo=tipo, limit=limit)
+    if not resultados:
+        raise HTTPException(status_code=404, detail="No existen resultados para esa búsqueda")
+    return {"resultados": resultados}
+
+#Endpoint para sugerir títulos y nombres a partir de lo que se lleva escrito
+@app.get("/autocompletar")
+@usa_bd
+def autocompletar(q: str = Query(..., min_length=1),
+                  tipo: Optional[str] = Query(None, pattern="^(contenido|actor|director)$"),
+                  limit: int = Query(10, ge=1, le=50), db: Session = Depends(get_db)):
+    busqueda_difusa.comprobar_cambios(db)
+    return {"sugerencias": busqueda_difusa.indice.autocompletar(q, tipo=tipo, limite=limit)}
+
+# Endpoint para consultar el tamaño y el tiempo de construcción del índice de búsqueda difusa
+@app.get("/buscar/difusa/estadisticas")
+def estadisticas_busqueda_difusa():
+    return busqueda_difusa.indice.estadisticas()
+
+
 # Endpoint para obtener el reparto de un contenido
-@app.get("/contenidos/{idContenido}/reparto")
+@app.get("/contenidos/{idContenido}/reparto", dependencies=[versionado("Reparto", "Actor")])
+@usa_bd
 def get_reparto(idContenido: str, db: Session = Depends(get_db)):
     reparto = crud.get_reparto(db=db, idContenido=idContenido)
     if not reparto:
@@ -304,6 +503,7 @@ def get_reparto(idContenido: str, db: Session = Depends(get_db)):
 
 #Asociar actores a una pelicula. Param: NO lista de actores, un solo actor (idActor)
 @app.post("/contenidos/{idContenido}/reparto/{idActor}", response_model=schemas.Reparto)
+@usa_bd
 def update_reparto(idContenido: str, idActor: str, db: Session = Depends(get_db)):
     reparto = crud.update_reparto(db=db, idContenido=idContenido, idActor=idActor)
 
@@ -311,15 +511,29 @@ def update_reparto(idContenido: str, idActor: str, db: Session = Depends(get_db)
         raise HTTPException(status_code=404, detail="No se ha podido asociar actores a pelicula")
     return reparto
 
+# Sustituye el reparto completo de un contenido (añade y elimina solo las diferencias en una transacción)
+@app.put("/contenidos/{idContenido}/reparto")
+@usa_bd
+def reemplazar_reparto(idContenido: str, reparto: schemas.RepartoReemplazo, db: Session = Depends(get_db)):
+    cambios = crud.reemplazar_reparto(db=db, idContenido=idContenido, idsActor=reparto.actores)
+    if cambios is None:
+        raise HTTPException(status_code=404, detail="Contenido no encontrado")
+    if cambios["actoresNoEncontrados"]:
+        raise HTTPException(status_code=404,
+                            detail=f"Actores no encontrados: {', '.join(cambios['actoresNoEncontrados'])}")
+    return {"actoresAnadidos": cambios["actoresAnadidos"], "actoresEliminados": cambios["actoresEliminados"]}
+
 #Funciones para obtener la información de un actor/director por su ID
-@app.get("/actores/{idActor}", response_model=schemas.Actor)
+@app.get("/actores/{idActor}", response_model=schemas.Actor, dependencies=[versionado("Actor")])
+@usa_bd
 def get_actor(idActor: str, db: Session = Depends(get_db)):
     actor = crud.get_actor(db=db, idActor=idActor)
     if actor is None:
         raise HTTPException(status_code=404, detail="Actor no encontrado")
     return actor
 
-@app.get("/directores/{idDirector}", response_model=schemas.Director)
+@app.get("/directores/{idDirector}", response_model=schemas.Director, dependencies=[versionado("Director")])
+@usa_bd
 def get_director(idDirector: str, db: Session = Depends(get_db)):
     director = crud.get_director(db=db, idDirector=idDirector)
     if director is None:
@@ -327,28 +541,33 @@ def get_director(idDirector: str, db: Session = Depends(get_db)):
     return director
 
 #Funciones para obtener los contenidos relacionados con un actor/director por su ID
-@app.get("/actores/{idActor}/contenidos")
+@app.get("/actores/{idActor}/contenidos", dependencies=[versionado("Reparto", "Contenido", "Valoraciones")])
+@usa_bd
 def get_content_by_actor(idActor: str, db: Session = Depends(get_db)):
     content = crud.get_content_by_actor(db=db, idActor=idActor)
     return content
 
-@app.get("/directores/{idDirector}/contenidos")
+@app.get("/directores/{idDirector}/contenidos", dependencies=[versionado("Contenido", "Valoraciones")])
+@usa_bd
 def get_content_by_director(idDirector: str, db: Session = Depends(get_db)):
     content = crud.get_content_by_director(db=db, idDirector=idDirector)
     return content
 
 #Funciones para obtener los actores/director relacionados con un contenido
-@app.get("/contenidos/{idContenido}/reparto")
+@app.get("/contenidos/{idContenido}/reparto", dependencies=[versionado("Reparto", "Actor")])
+@usa_bd
 def get_actors_by_content(idContenido: str, db: Session = Depends(get_db)):
     actors = crud.get_actors_by_content(db=db, idContenido=idContenido)
     return actors
 
-@app.get("/contenidos/{idContenido}/director")
+@app.get("/contenidos/{idContenido}/director", dependencies=[versionado("Contenido", "Director")])
+@usa_bd
 def get_director_by_content(idContenido: str, db: Session = Depends(get_db)):
     director = crud.get_director_by_content(db=db, idContenido=idContenido)
     return director
 
 @app.delete("/contenidos/{idContenido}/reparto")
+@usa_bd
 def delete_reparto_by_content(idContenido: str, db: Session = Depends(get_db)):
     success = crud.delete_reparto(db=db, contenido_id=idContenido)
     if not success:
@@ -357,14 +576,17 @@ def delete_reparto_by_content(idContenido: str, db: Session = Depends(get_db)):
 
 #Funciones específicas de administrador para actores y directores
 @app.post("/actores", response_model=schemas.Actor)
+@usa_bd
 def create_actor(actor: schemas.ActorCreate, db: Session = Depends(get_db)):
     return crud.create_actor(db=db, actor=actor)
 
 @app.post("/directores", response_model=schemas.Director)
+@usa_bd
 def create_director(director: schemas.DirectorCreate, db: Session = Depends(get_db)):
     return crud.create_director(db=db, director=director)
 
 @app.put("/actores/{idActor}")
+@usa_bd
 def update_actor(idActor: str, actor: schemas.ActorUpdate, db: Session = Depends(get_db)):
     actor = crud.update_actor(db=db, idActor=idActor, actor=actor)
     if not actor:
@@ -372,6 +594,7 @@ def update_actor(idActor: str, actor: schemas.ActorUpdate, db: Session = Depends
     return {"message": "Datos del actor actualizados correctamente"}
 
 @app.put("/directores/{idDirector}")
+@usa_bd
 def update_director(idDirector: str, director: schemas.DirectorUpdate, db: Session = Depends(get_db)):
     director = crud.update_director(db=db, idDirector=idDirector, director=director)
     if not director:
@@ -379,6 +602,7 @@ def update_director(idDirector: str, director: schemas.DirectorUpdate, db: Sessi
     return {"message": "Datos del director actualizados correctamente"}
 
 @app.delete("/actores/{idActor}")
+@usa_bd
 def delete_actor(idActor: str, db: Session = Depends(get_db)):
     success = crud.delete_actor(db=db, actor_id=idActor)
     if not success:
@@ -386,6 +610,7 @@ def delete_actor(idActor: str, db: Session = Depends(get_db)):
     return {"message": "Actor eliminado exitosamente"}    
 
 @app.delete("/directores/{idDirector}")
+@usa_bd
 def delete_director(idDirector: str, db: Session = Depends(get_db)):
     success = crud.delete_director(db=db, director_id=idDirector)
     if not success:
@@ -393,16 +618,19 @@ def delete_director(idDirector: str, db: Session = Depends(get_db)):
     return {"message": "Director eliminado exitosamente"}
 
 #Funciones para obtener todos los actores o directores de la base de datos
-@app.get("/actores", response_model=list[schemas.Actor])
+@app.get("/actores", response_model=list[schemas.Actor], dependencies=[versionado("Actor")])
+@usa_bd
 def get_actores(db: Session = Depends(get_db)):
     return crud.get_actores(db=db)
 
-@app.get("/directores", response_model=list[schemas.Director])
+@app.get("/directores", response_model=list[schemas.Director], dependencies=[versionado("Director")])
+@usa_bd
 def get_actores(db: Session = Depends(get_db)):
     return crud.get_directores(db=db)
 
 #Funciones para eliminar un actor o director de la base de datos
 @app.delete("/actores/{idActor}")
+@usa_bd
 def borrar_actor(idActor: str, db: Session = Depends(get_db)):
     """
     Endpoint para borrar un actor por su ID.
@@ -416,6 +644,7 @@ def borrar_actor(idActor: str, db: Session = Depends(get_db)):
     return {"message": "Actor eliminado correctamente"}
 
 @app.delete("/directores/{idDirector}")
+@usa_bd
 def borrar_actor(idDirector: str, db: Session = Depends(get_db)):
     """
     Endpoint para borrar un director por su ID.
@@ -426,4 +655,33 @@ def borrar_actor(idDirector: str, db: Session = Depends(get_db)):
     if not eliminado: 
         return {"message": "El director no existe o no se pudo eliminar"}
 
-    return {"message": "Director eliminado correctamente"}
\ No newline at end of file
+    return {"message": "Director eliminado correctamente"}
+
+# Endpoint de importación masiva: el cuerpo es un fichero CSV (con cabecera) o JSONL de la entidad.
+# El cuerpo se recibe en streaming (a disco si es grande) y se inserta por lotes en un hilo aparte
+@app.post("/importacion/{entidad}")
+async def importar_entidad(entidad: str, request: Request, formato: str = Query("jsonl", pattern="^(csv|jsonl)$"),
+                           lote: int = Query(importacion.TAMANO_LOTE, ge=1, le=100000),
+                           conflictos: str = Query("ignorar", pattern="^(ignorar|actualizar)$")):
+    if entidad not in importacion.ENTIDADES:
+        raise HTTPException(status_code=404,
+                            detail=f"Entidad no importable (disponibles: {', '.join(importacion.ENTIDADES)})")
+    with tempfile.SpooledTemporaryFile(max_size=16 * 2**20) as cuerpo:
+        async for fragmento in request.stream():
+            cuerpo.write(fragmento)
+        cuerpo.seek(0)
+        fichero = io.TextIOWrapper(cuerpo, encoding="utf-8", newline="")
+        try:
+            resultado = await run_in_threadpool(
+                importacion.importar, engine, entidad, importacion.leer_filas(fichero, formato),
+                lote, importacion.FILAS_TRANSACCION, conflictos)
+        except ValueError as error:
+            raise HTTPException(status_code=400, detail=f"Error en la importación: {error}")
+        finally:
+            fichero.detach()
+            # También si falla: los lotes anteriores al error ya están confirmados. La caché no hace
+            # falta invalidarla, las versiones de las tablas ya han cambiado con cada lote confirmado
+            if entidad in importacion.ENTIDADES_DIFUSAS:
+                with SessionLocal() as db_indice:
+                    await run_in_threadpool(busqueda_difusa.reconstruir, db_indice)
+    return resultado
@@ -0,0 +1,174 @@
+import argparse
+import sys
+from datetime import datetime, timezone
+from sqlalchemy import text
+from . import busqueda_fts
+
+"""
+Autor: Grupo GA01 - ASEE
+Versión: 1.0
+Descripción: Migraciones versionadas del esquema de contenidos.db.
+Cada migración tiene un número de versión y una lista de sentencias idempotentes (SQL o funciones
+que reciben la conexión, para los cambios que SQLite no sabe hacer con IF NOT EXISTS). Las versiones
+aplicadas se guardan en la tabla esquema_migraciones, así que al arrancar solo se ejecutan las
+nuevas, tanto en bases de datos recién creadas como en las que ya estaban en uso.
+Los índices que se crean aquí también están declarados en models.py (mismo nombre), de modo
+que una base de datos nueva ya los tiene y la migración no hace nada.
+
+Comando de ejecución (desde Microservicio_Contenidos o /app en el contenedor):
+    python -m API_Contenidos.migraciones              -> aplica las migraciones pendientes
+    python -m API_Contenidos.migraciones --comprobar  -> además revisa el plan de las consultas frecuentes
+
+"""
+
+
+def anadir_columna(tabla: str, columna: str, definicion: str):
+    """
+    Sentencia de migración que añade una columna solo si la tabla aún no la tiene
+    (SQLite no admite ADD COLUMN IF NOT EXISTS y create_all ya la crea en las bases de datos nuevas).
+    """
+    def _sentencia(conexion):
+        columnas = {fila[1] for fila in conexion.execute(text(f'PRAGMA table_info("{tabla}")'))}
+        if columna not in columnas:
+            conexion.execute(text(f'ALTER TABLE "{tabla}" ADD COLUMN "{columna}" {definicion}'))
+    return _sentencia
+
+
+# (versión, descripción, sentencias)
+MIGRACIONES = [
+    (1, "Índices secundarios para los filtros más frecuentes del catálogo", [
+        'CREATE INDEX IF NOT EXISTS "ix_Contenido_tipoContenido_id" ON "Contenido" ("tipoContenido", id)',
+        'CREATE INDEX IF NOT EXISTS "ix_Contenido_idGenero_id" ON "Contenido" ("idGenero", id)',
+        'CREATE INDEX IF NOT EXISTS "ix_Contenido_idDirector" ON "Contenido" ("idDirector")',
+        'CREATE INDEX IF NOT EXISTS "ix_Temporada_idContenido_numeroTemporada" '
+        'ON "Temporada" ("idContenido", "numeroTemporada")',
+        'CREATE INDEX IF NOT EXISTS "ix_Episodio_idTemporada_numeroEpisodio" '
+        'ON "Episodio" ("idTemporada", "numeroEpisodio")',
+        'CREATE INDEX IF NOT EXISTS "ix_Episodio_idDirector" ON "Episodio" ("idDirector")',
+        'CREATE INDEX IF NOT EXISTS "ix_Reparto_idActor" ON "Reparto" ("idActor")',
+        'CREATE INDEX IF NOT EXISTS "ix_Reparto_idContenido" ON "Reparto" ("idContenido")',
+    ]),
+    (2, "Los triggers FTS de actualización solo se disparan al cambiar el texto indexado", [
+        busqueda_fts.recrear_triggers_actualizacion,
+    ]),
+    (3, "Suma y número de valoraciones de cada contenido", [
+        anadir_columna("Contenido", "sumaValoraciones", "FLOAT NOT NULL DEFAULT 0"),
+        anadir_columna("Contenido", "numeroValoraciones", "INTEGER NOT NULL DEFAULT 0"),
+        # La media que ya tenía cada contenido cuenta como una valoración (0 es "sin valorar")
+        'UPDATE "Contenido" SET "sumaValoraciones" = "valoracionPromedio", "numeroValoraciones" = 1 '
+        'WHERE "valoracionPromedio" > 0 AND "numeroValoraciones" = 0',
+    ]),
+]
+
+# Consultas frecuentes que no pueden recorrer una tabla entera: nombre -> (sql, parámetros)
+CONSULTAS_FRECUENTES = {
+    "todopeliculas / todoseries": (
+        'SELECT * FROM "Contenido" WHERE "tipoContenido" = :tipo', {"tipo": "Pelicula"}),
+    "página de contenidos por tipo": (
+        'SELECT * FROM "Contenido" WHERE "tipoContenido" = :tipo AND id > :cursor ORDER BY id LIMIT 500',
+        {"tipo": "Serie", "cursor": ""}),
+    "página de contenidos por género": (
+        'SELECT * FROM "Contenido" WHERE "idGenero" = :genero AND id > :cursor ORDER BY id LIMIT 500',
+        {"genero": "1", "cursor": ""}),
+    "contenidos de un director": (
+        'SELECT * FROM "Contenido" WHERE "idDirector" = :director', {"director": "1"}),
+    "contenido por id": (
+        'SELECT * FROM "Contenido" WHERE id = :id', {"id": "1"}),
+    "temporadas de varias series": (
+        'SELECT * FROM "Temporada" WHERE "idContenido" IN (:a, :b) ORDER BY "numeroTemporada"',
+        {"a": "1", "b": "2"}),
+    "episodios de varias temporadas": (
+        'SELECT * FROM "Episodio" WHERE "idTemporada" IN (:a, :b) ORDER BY "numeroEpisodio"',
+        {"a": "1", "b": "2"}),
+    "contenidos de un actor": (
+        'SELECT "idContenido" FROM "Reparto" WHERE "idActor" = :actor', {"actor": "1"}),
+    "reparto de un contenido": (
+        'SELECT "idActor" FROM "Reparto" WHERE "idContenido" = :contenido', {"contenido": "1"}),
+}
+
+
+def _preparar_tabla(conexion):
+    conexion.execute(text(
+        "CREATE TABLE IF NOT EXISTS esquema_migraciones ("
+        "version INTEGER PRIMARY KEY, descripcion TEXT NOT NULL, aplicada TEXT NOT NULL)"
+    ))
+
+
+def version_actual(engine) -> int:
+    with engine.begin() as conexion:
+        _preparar_tabla(conexion)
+        return conexion.execute(text("SELECT COALESCE(MAX(version), 0) FROM esquema_migraciones")).scalar()
+
+
+def aplicar_migraciones(engine) -> list:
+    """
+    Ejecuta en orden las migraciones que aún no se han aplicado y devuelve sus versiones.
+    """
+    aplicadas = []
+    with engine.begin() as conexion:
+        _preparar_tabla(conexion)
+        hechas = {fila[0] for fila in conexion.execute(text("SELECT version FROM esquema_migraciones"))}
+        for version, descripcion, sentencias in MIGRACIONES:
+            if version in hechas:
+                continue
+            for sentencia in sentencias:
+                if callable(sentencia):
+                    sentencia(conexion)
+                else:
+                    conexion.execute(text(sentencia))
+            conexion.execute(
+                text("INSERT OR IGNORE INTO esquema_migraciones (version, descripcion, aplicada) "
+                     "VALUES (:version, :descripcion, :aplicada)"),
+                {"version": version, "descripcion": descripcion,
+                 "aplicada": datetime.now(timezone.utc).isoformat(timespec="seconds")},
+            )
+            print(f"Migración {version} aplicada: {descripcion}")
+            aplicadas.append(version)
+    return aplicadas
+
+
+def _paso_problematico(detalle: str) -> bool:
+    # "SCAN tabla" sin índice es un recorrido completo; agrupar en un B-tree temporal también
+    # obliga a leer todas las filas antes de devolver la primera
+    if detalle.startswith("SCAN ") and " USING " not in detalle:
+        return True
+    return "TEMP B-TREE FOR GROUP BY" in detalle or "TEMP B-TREE FOR DISTINCT" in detalle
+
+
+def comprobar_planes(engine) -> dict:
+    """
+    Ejecuta EXPLAIN QUERY PLAN sobre cada consulta frecuente.
+    Devuelve {nombre: (pasos del plan, pasos problemáticos)}.
+    """
+    resultado = {}
+    with engine.connect() as conexion:
+        for nombre, (sql, parametros) in CONSULTAS_FRECUENTES.items():
+            pasos = [fila[3] for fila in conexion.execute(text("EXPLAIN QUERY PLAN " + sql), parametros)]
+            resultado[nombre] = (pasos, [paso for paso in pasos if _paso_problematico(paso)])
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migraciones del esquema de la base de datos")
+    parser.add_argument("--comprobar", action="store_true",
+                        help="Comprueba que las consultas frecuentes no recorren tablas completas")
+    args = parser.parse_args()
+
+    from . import models  # noqa: F401 (models se importa antes que database, como en main.py)
+    from .database import engine, initialize_database
+
+    initialize_database()
+    print(f"Versión del esquema: {version_actual(engine)}")
+    if not args.comprobar:
+        return 0
+
+    errores = 0
+    for nombre, (pasos, problemas) in comprobar_planes(engine).items():
+        print(f"{'ERROR' if problemas else 'OK':5} {nombre}: {' | '.join(pasos)}")
+        errores += bool(problemas)
+    print(f"{errores} consultas recorren tablas completas.")
+    return 1 if errores else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
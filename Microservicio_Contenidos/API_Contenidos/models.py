@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import Column, String, ForeignKey, Float, Integer, PrimaryKeyConstraint, ForeignKeyConstraint
+from sqlalchemy import Column, String, ForeignKey, Float, Integer, PrimaryKeyConstraint, ForeignKeyConstraint, Index
 from .database import Base
 
 """
@@ -20,7 +20,9 @@ class Contenido(Base):
     descripcion = Column(String)
     fechaLanzamiento = Column(String)  # Formato: YYYY-MM-DD
     idGenero = Column(String, ForeignKey("Genero.id"))
-    valoracionPromedio = Column(Float)  # Escala de 0 a 10
+    valoracionPromedio = Column(Float)  # Escala de 0 a 10 (sumaValoraciones / numeroValoraciones)
+    sumaValoraciones = Column(Float, nullable=False, default=0, server_default="0")
+    numeroValoraciones = Column(Integer, nullable=False, default=0, server_default="0")
     idSubtitulosContenido = Column(String, default=lambda: str(uuid.uuid4()), index=True)
     idDoblajeContenido = Column(String, default=lambda: str(uuid.uuid4()), index=True)
 
@@ -28,6 +30,13 @@ class Contenido(Base):
     duracion = Column(Integer, nullable=True)  # En minutos
     idDirector = Column(String, ForeignKey("Director.id"), nullable=True) 
 
+    # Índices de los filtros frecuentes (ver migraciones.py)
+    __table_args__ = (
+        Index("ix_Contenido_tipoContenido_id", "tipoContenido", "id"),
+        Index("ix_Contenido_idGenero_id", "idGenero", "id"),
+        Index("ix_Contenido_idDirector", "idDirector"),
+    )
+
 class Temporada(Base):
     __tablename__ = "Temporada"
 
@@ -37,6 +46,7 @@ class Temporada(Base):
 
     __table_args__ = (
         PrimaryKeyConstraint('idContenido', 'idTemporada'),
+        Index("ix_Temporada_idContenido_numeroTemporada", "idContenido", "numeroTemporada"),
     )
 
 class Episodio(Base):
@@ -51,6 +61,8 @@ class Episodio(Base):
 
     __table_args__ = (
         PrimaryKeyConstraint('idContenido', 'idTemporada', 'idEpisodio'),
+        Index("ix_Episodio_idTemporada_numeroEpisodio", "idTemporada", "numeroEpisodio"),
+        Index("ix_Episodio_idDirector", "idDirector"),
     )
 
 class Trailer(Base):
@@ -126,4 +138,11 @@ class Doblaje(Base):
     __tablename__ = "Doblaje"
 
     idDoblaje = Column(String, primary_key=True)
-    idioma = Column(String)
\ No newline at end of file
+    idioma = Column(String)
+
+# Versión de cada tabla del catálogo (la mantienen triggers, ver cache.py)
+class VersionTabla(Base):
+    __tablename__ = "VersionTabla"
+
+    tabla = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
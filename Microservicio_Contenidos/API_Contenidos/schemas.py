@@ -28,8 +28,20 @@ class ContenidoUpdate(BaseModel):
 
 class Contenido(ContenidoBase):
     id: str #Generado Automaticamente
+    numeroValoraciones: Optional[int] = None
     class Config:
         from_attributes = True
+
+class ContenidosLote(BaseModel):
+    ids: list[str]
+
+class ValoracionDelta(BaseModel):
+    idContenido: str
+    valoracion: float
+    valoracionAnterior: Optional[float] = None  # Valoración que sustituye (el usuario ya había valorado)
+
+class ValoracionesLote(BaseModel):
+    valoraciones: list[ValoracionDelta]
     
 class PeliculaUpdate(ContenidoUpdate):
     duracion: Optional[int] = None
@@ -100,6 +112,11 @@ class Genero(GeneroBase):
     class Config:
         from_attributes = True
 
+class EstanteriaGenero(BaseModel):
+    id: str
+    nombre: str
+    contenidos: list[Contenido]
+
 class TemporadasGet(BaseModel):
     idTemporada: str
     numeroTemporada: int
@@ -125,6 +142,9 @@ class Reparto(BaseModel):
 class RepartoUpdate(BaseModel):
     idActor: str
 
+class RepartoReemplazo(BaseModel):
+    actores: list[str]  # Reparto completo: los actores que no estén se eliminan
+
 class Actor(BaseModel):
     id: str
     nombre: str
@@ -153,4 +173,48 @@ class DirectorCreate(BaseModel):
     fechaNacimiento: str
 
 class DirectorUpdate(DirectorCreate):
-    pass    
\ No newline at end of file
+    pass    
+
+
+# Documento de detalle de un contenido con los nombres ya resueltos (GET /contenidos/{id}/detalle)
+class ActorReparto(BaseModel):
+    id: str
+    nombre: Optional[str] = None
+    nacionalidad: Optional[str] = None
+
+class Idioma(BaseModel):
+    id: str
+    idioma: Optional[str] = None
+
+class EpisodioDetalle(BaseModel):
+    idEpisodio: str
+    idTemporada: str
+    numeroEpisodio: Optional[int] = None
+    duracion: Optional[int] = None
+    idDirector: Optional[str] = None
+    director: Optional[str] = None
+
+class TemporadaDetalle(BaseModel):
+    idTemporada: str
+    numeroTemporada: Optional[int] = None
+    Episodios: list[EpisodioDetalle]
+
+class ContenidoDetalle(BaseModel):
+    id: str
+    tipoContenido: str
+    titulo: str
+    descripcion: Optional[str] = None
+    fechaLanzamiento: Optional[str] = None
+    valoracionPromedio: Optional[float] = None
+    numeroValoraciones: Optional[int] = None
+    duracion: Optional[int] = None
+    idGenero: Optional[str] = None
+    genero: Optional[str] = None
+    idDirector: Optional[str] = None
+    director: Optional[str] = None
+    idSubtitulosContenido: Optional[str] = None
+    idDoblajeContenido: Optional[str] = None
+    reparto: list[ActorReparto]
+    subtitulos: list[Idioma]
+    doblajes: list[Idioma]
+    Temporadas: list[TemporadaDetalle]
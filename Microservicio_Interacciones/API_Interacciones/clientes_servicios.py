@@ -0,0 +1,191 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+import httpx
+
+"""
+Autor: Grupo GA01 - ASEE
+Versión: 1.0
+Descripción: Clientes HTTP reutilizables para las llamadas de Interacciones a los
+microservicios de contenidos y usuarios. Cada microservicio destino tiene su propio
+cliente síncrono con un pool de conexiones (keep-alive), timeouts y reintentos con
+espera exponencial. Los clientes se crean al arrancar la aplicación (iniciar_clientes)
+y se cierran al pararla (cerrar_clientes).
+"""
+
+"""
+
+Acceso a los microservicios antes de realizar los cambios de Docker
+
+BASE_URL_CONTENIDOS = "http://127.0.0.1:8000"
+BASE_URL_USUARIOS = "http://127.0.0.1:8001"
+BASE_URL_INTERACCIONES = "http://127.0.0.1:8002"
+
+"""
+
+BASE_URL_CONTENIDOS = os.getenv("BASE_URL_CONTENIDOS", "http://contenidos:8000")  # Nombre del servicio 'contenidos' en docker-compose.yml
+BASE_URL_USUARIOS = os.getenv("BASE_URL_USUARIOS", "http://usuarios:8001")  # Nombre del servicio 'usuarios' en docker-compose.yml
+BASE_URL_INTERACCIONES = os.getenv("BASE_URL_INTERACCIONES", "http://interacciones:8002")  # Nombre del servicio 'interacciones' en docker-compose.yml
+
+# Configuración del pool de conexiones, timeouts (segundos) y reintentos
+HTTP_MAX_CONEXIONES = int(os.getenv("HTTP_MAX_CONEXIONES", "50"))
+HTTP_MAX_CONEXIONES_KEEPALIVE = int(os.getenv("HTTP_MAX_CONEXIONES_KEEPALIVE", "20"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "5"))
+HTTP_TIMEOUT_CONEXION = float(os.getenv("HTTP_TIMEOUT_CONEXION", "2"))
+HTTP_REINTENTOS = int(os.getenv("HTTP_REINTENTOS", "2"))
+HTTP_BACKOFF = float(os.getenv("HTTP_BACKOFF", "0.1"))
+# Respuestas GET con ETag que se guardan para revalidarlas con If-None-Match
+HTTP_CACHE_VALIDADORES = int(os.getenv("HTTP_CACHE_VALIDADORES", "256"))
+
+# Solo se repiten las peticiones que no cambian el resultado si se ejecutan dos veces. PUT no está:
+# PUT /contenidos/{id}/valoracion y PUT /usuarios/{id}/vistas/{idContenido} suman en contadores,
+# así que solo se repiten si la conexión no llegó a abrirse
+METODOS_IDEMPOTENTES = {"GET", "HEAD", "OPTIONS", "DELETE"}
+ESTADOS_REINTENTABLES = {502, 503, 504}
+
+
+def _configuracion_cliente():
+    return {
+        "limits": httpx.Limits(
+            max_connections=HTTP_MAX_CONEXIONES,
+            max_keepalive_connections=HTTP_MAX_CONEXIONES_KEEPALIVE,
+        ),
+        "timeout": httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_TIMEOUT_CONEXION),
+    }
+
+
+def _debe_reintentar(metodo: str, intento: int, response: httpx.Response = None, error: Exception = None) -> bool:
+    if intento >= HTTP_REINTENTOS:
+        return False
+    if error is not None:
+        # Si no se llegó a abrir la conexión la petición no se envió, así que siempre se puede repetir
+        if isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)):
+            return True
+        return metodo in METODOS_IDEMPOTENTES
+    return metodo in METODOS_IDEMPOTENTES and response.status_code in ESTADOS_REINTENTABLES
+
+
+def _espera(intento: int) -> float:
+    # Espera exponencial: 0.1s, 0.2s, 0.4s...
+    return HTTP_BACKOFF * (2 ** intento)
+
+
+class CacheValidadores:
+    """
+    Guarda el ETag y el cuerpo de las últimas respuestas GET. Si el servicio contesta 304
+    (no ha cambiado) se reutiliza el cuerpo guardado en lugar de volver a descargarlo.
+    """
+
+    def __init__(self, tamano: int):
+        self.tamano = tamano
+        self._entradas = OrderedDict()  # url -> (etag, cabeceras, cuerpo)
+        self._lock = threading.Lock()  # El cliente síncrono se usa desde varios hilos
+
+    @staticmethod
+    def clave(url: str, kwargs: dict) -> str:
+        return str(httpx.URL(url, params=kwargs.get("params")))
+
+    def preparar(self, clave: str, kwargs: dict):
+        """
+        Añade If-None-Match si hay una copia de esa URL y devuelve la copia (o None).
+        """
+        if self.tamano <= 0 or "If-None-Match" in (kwargs.get("headers") or {}):
+            return None
+        with self._lock:
+            entrada = self._entradas.get(clave)
+        if entrada is not None:
+            kwargs["headers"] = {**(kwargs.get("headers") or {}), "If-None-Match": entrada[0]}
+        return entrada
+
+    def procesar(self, clave: str, entrada, response: httpx.Response) -> httpx.Response:
+        if self.tamano <= 0:
+            return response
+        if response.status_code == 304 and entrada is not None:
+            with self._lock:
+                if clave in self._entradas:
+                    self._entradas.move_to_end(clave)
+            _, cabeceras, cuerpo = entrada
+            return httpx.Response(200, headers=cabeceras, content=cuerpo, request=response.request)
+        with self._lock:
+            etag = response.headers.get("ETag")
+            if response.status_code == 200 and etag:
+                cabeceras = {nombre: valor for nombre, valor in response.headers.items()
+                             if nombre.lower() not in ("content-encoding", "transfer-encoding", "content-length")}
+                self._entradas[clave] = (etag, cabeceras, response.content)
+                self._entradas.move_to_end(clave)
+                while len(self._entradas) > self.tamano:
+                    self._entradas.popitem(last=False)
+        return response
+
+
+class ClienteServicio:
+    """
+    Cliente síncrono con pool de conexiones para un microservicio.
+    Las rutas son relativas a la URL base del servicio.
+    """
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url
+        self._cliente = httpx.Client(base_url=base_url, **_configuracion_cliente())
+        self.validadores = CacheValidadores(HTTP_CACHE_VALIDADORES)
+
+    def request(self, metodo: str, url: str, **kwargs) -> httpx.Response:
+        metodo = metodo.upper()
+        clave = CacheValidadores.clave(url, kwargs) if metodo == "GET" else None
+        entrada = self.validadores.preparar(clave, kwargs) if clave else None
+        intento = 0
+        while True:
+            try:
+                response = self._cliente.request(metodo, url, **kwargs)
+            except httpx.TransportError as error:
+                if not _debe_reintentar(metodo, intento, error=error):
+                    raise
+            else:
+                if not _debe_reintentar(metodo, intento, response=response):
+                    return self.validadores.procesar(clave, entrada, response) if clave else response
+                response.close()
+            time.sleep(_espera(intento))
+            intento += 1
+
+    def get(self, url: str, **kwargs) -> httpx.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> httpx.Response:
+        return self.request("POST", url, **kwargs)
+
+    def put(self, url: str, **kwargs) -> httpx.Response:
+        return self.request("PUT", url, **kwargs)
+
+    def delete(self, url: str, **kwargs) -> httpx.Response:
+        return self.request("DELETE", url, **kwargs)
+
+    def close(self):
+        self._cliente.close()
+
+
+# Clientes de cada microservicio (se crean en iniciar_clientes)
+contenidos = None
+usuarios = None
+interacciones = None
+
+
+def iniciar_clientes():
+    """
+    Crea un cliente por microservicio. Se llama una sola vez al arrancar la aplicación.
+    """
+    global contenidos, usuarios, interacciones
+    contenidos = ClienteServicio(BASE_URL_CONTENIDOS)
+    usuarios = ClienteServicio(BASE_URL_USUARIOS)
+    interacciones = ClienteServicio(BASE_URL_INTERACCIONES)
+
+
+def cerrar_clientes():
+    """
+    Cierra las conexiones abiertas de todos los clientes al parar la aplicación.
+    """
+    global contenidos, usuarios, interacciones
+    for cliente in (contenidos, usuarios, interacciones):
+        if cliente is not None:
+            cliente.close()
+    contenidos = usuarios = interacciones = None
@@ -0,0 +1,58 @@
+import argparse
+import sys
+import httpx
+from sqlalchemy import func
+from . import models, crud, clientes_servicios
+from .database import SessionLocal, initialize_database
+from .reconstruir_afinidad import obtener_historiales_usuarios
+
+"""
+Autor: Grupo GA01 - ASEE
+Versión: 1.0
+Descripción: Aplica la política de retención del historial a todos los usuarios: conserva las
+HISTORIAL_MAXIMO entradas más recientes de cada historial y borra el resto en una transacción.
+Las entradas nuevas ya recortan su propio historial al registrarse (crud.registrar_vista); este
+comando sirve para la primera vez y para aplicar un máximo más bajo. Los puntos de afinidad por
+género que sumaron las entradas borradas se restan en la misma transacción, para lo que se pide a la
+API de usuarios el usuario de cada historial.
+
+Comando de ejecución (desde Microservicio_Interacciones o /app en el contenedor):
+    python -m API_Interacciones.compactar_historial                 -> recorta con HISTORIAL_MAXIMO
+    python -m API_Interacciones.compactar_historial --maximo 200 --simular
+
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recorta el historial de cada usuario a las entradas más recientes")
+    parser.add_argument("--maximo", type=int, default=crud.HISTORIAL_MAXIMO, help="Entradas que se conservan por usuario")
+    parser.add_argument("--simular", action="store_true", help="No borra nada, solo informa de las entradas sobrantes")
+    args = parser.parse_args()
+
+    initialize_database()
+    clientes_servicios.iniciar_clientes()
+    db = SessionLocal()
+    try:
+        historial_a_usuario = {}
+        if not args.simular:
+            try:
+                historial_a_usuario = obtener_historiales_usuarios()
+            except httpx.HTTPError as e:
+                print(f"Error al obtener los usuarios de cada historial: {e}")
+                return 1
+        total = db.query(func.count()).select_from(models.HistorialUsuario).scalar()
+        borradas = crud.recortar_historial(db, historial_a_usuario, maximo=args.maximo)
+        if args.simular:
+            db.rollback()
+            print(f"Se borrarían {borradas} de {total} entradas del historial (máximo {args.maximo} por usuario).")
+            return 0
+        db.commit()
+        print(f"Historial recortado: {borradas} de {total} entradas borradas (máximo {args.maximo} por usuario).")
+        return 0
+    finally:
+        db.close()
+        clientes_servicios.cerrar_clientes()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,14 @@
 from fastapi import HTTPException
-from sqlalchemy import desc, func
+from sqlalchemy import and_, delete, desc, func, literal, null, or_, select, tuple_, union_all
 from sqlalchemy.orm import Session
-from . import models, schemas
-import requests
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from . import models, schemas, clientes_servicios, recomendador, tendencias
+import base64
+import httpx
+import os
+import time
+from collections import Counter
+from datetime import datetime, timezone
 
 """
 Autor: Grupo GA01 - ASEE
@@ -10,115 +16,229 @@ Versión: 1.0
 Descripción: Funciones CRUD para interactuar con la base de datos
 """
 
-"""
-
-Acceso a bases de datos antes de realizar los cambios de Docker
-
-BASE_URL_CONTENIDOS = "http://127.0.0.1:8000"
-BASE_URL_USUARIOS = "http://127.0.0.1:8001"
-
-"""
-
-BASE_URL_CONTENIDOS = "http://contenidos:8000"  # Nombre del servicio de contenidos
-BASE_URL_USUARIOS = "http://usuarios:8001"    # Nombre del servicio de usuarios
+# Número máximo de ids que se envían en cada petición de contenidos por lotes
+TAMANO_LOTE_CONTENIDOS = 200
+
+# Función para obtener varios contenidos de la API de contenidos con el menor número de peticiones
+def obtener_contenidos_por_ids(ids: list[str]) -> dict:
+    """
+    Recupera los contenidos indicados mediante POST /contenidos/batch, dividiendo la
+    lista en lotes si es necesario. Devuelve un diccionario id -> contenido con los
+    contenidos encontrados. Lanza httpx.HTTPError si falla la API de contenidos.
+    """
+    ids_unicos = list(dict.fromkeys(ids))
+    contenidos = {}
+    for inicio in range(0, len(ids_unicos), TAMANO_LOTE_CONTENIDOS):
+        lote = ids_unicos[inicio:inicio + TAMANO_LOTE_CONTENIDOS]
+        response = clientes_servicios.contenidos.post("/contenidos/batch", json={"ids": lote})
+        response.raise_for_status()
+        contenidos.update(response.json())
+    return contenidos
+
+# Caché local id de contenido -> (id de género, instante de caducidad) usada por las recomendaciones
+CACHE_GENEROS_TTL = float(os.getenv("CACHE_GENEROS_TTL", "300"))
+_cache_generos = {}
+
+# Función para obtener el género de varios contenidos, pidiendo a la API solo los que no están en caché
+def obtener_generos_contenidos(ids: list[str]) -> dict:
+    ahora = time.monotonic()
+    generos = {}
+    pendientes = []
+    for id_contenido in ids:
+        entrada = _cache_generos.get(id_contenido)
+        if entrada and entrada[1] > ahora:
+            generos[id_contenido] = entrada[0]
+        else:
+            pendientes.append(id_contenido)
+
+    if pendientes:
+        caducidad = ahora + CACHE_GENEROS_TTL
+        for id_contenido, contenido in obtener_contenidos_por_ids(pendientes).items():
+            _cache_generos[id_contenido] = (contenido['idGenero'], caducidad)
+            generos[id_contenido] = contenido['idGenero']
+    return generos
+
+# Función para obtener el género de un contenido solo si está en la caché local (sin llamar a la API)
+def genero_en_cache(idContenido: str):
+    entrada = _cache_generos.get(idContenido)
+    if entrada and entrada[1] > time.monotonic():
+        return entrada[0]
+    return None
+
+# Caché local id de usuario -> ((idHistorial, idListaPersonalizada), instante de caducidad).
+# Los ids de las listas de un usuario no cambian, así que no hace falta preguntarlos en cada petición.
+CACHE_USUARIOS_TTL = float(os.getenv("CACHE_USUARIOS_TTL", "300"))
+_cache_listas_usuarios = {}
+
+# Función para obtener los ids del historial y de la lista personalizada de un usuario
+# ((None, None) si no se pueden obtener; en ese caso no se guarda en caché)
+def obtener_listas_usuario(usuario_id: str) -> tuple:
+    ahora = time.monotonic()
+    entrada = _cache_listas_usuarios.get(usuario_id)
+    if entrada and entrada[1] > ahora:
+        return entrada[0]
+    try:
+        response = clientes_servicios.usuarios.get(f"/usuarios/{usuario_id}")
+    except httpx.HTTPError as e:
+        print(f"Error al obtener las listas del usuario con ID {usuario_id}: {e}")
+        return None, None
+    if response.status_code != 200:
+        return None, None
+    usuario = response.json()
+    listas = (usuario.get('idHistorial'), usuario.get('idListaPersonalizada'))
+    _cache_listas_usuarios[usuario_id] = (listas, ahora + CACHE_USUARIOS_TTL)
+    return listas
+
+# Función para obtener el género de un contenido (None si no se puede obtener)
+def obtener_genero_contenido(idContenido: str):
+    try:
+        return obtener_generos_contenidos([idContenido]).get(idContenido)
+    except httpx.HTTPError as e:
+        print(f"Error al obtener el género del contenido con ID {idContenido}: {e}")
+        return None
 
-# Función para obtener los géneros de los contenidos del historial y "me gusta" de un usuario
+# Función para sumar (o restar si es negativo) puntos de afinidad de un usuario a un género.
+# No hace commit: se confirma junto con la interacción que la provoca.
+def sumar_afinidad_genero(db: Session, idUsuario: str, idGenero: str, puntos: int):
+    if not idGenero or not puntos:
+        return
+    if puntos > 0:
+        tabla = models.AfinidadGeneroUsuario.__table__
+        sentencia = sqlite_insert(tabla).values(idUsuario=idUsuario, idGenero=idGenero, puntos=puntos)
+        sentencia = sentencia.on_conflict_do_update(
+            index_elements=["idUsuario", "idGenero"],
+            set_={"puntos": tabla.c.puntos + sentencia.excluded.puntos},
+        )
+        db.execute(sentencia)
+    else:
+        filtro = (models.AfinidadGeneroUsuario.idUsuario == idUsuario,
+                  models.AfinidadGeneroUsuario.idGenero == idGenero)
+        db.query(models.AfinidadGeneroUsuario).filter(*filtro).update(
+            {models.AfinidadGeneroUsuario.puntos: models.AfinidadGeneroUsuario.puntos + puntos},
+            synchronize_session=False,
+        )
+        db.query(models.AfinidadGeneroUsuario).filter(
+            *filtro, models.AfinidadGeneroUsuario.puntos <= 0
+        ).delete(synchronize_session=False)
+
+# Función para calcular desde cero la afinidad de todos los usuarios a partir del historial y los "me gusta":
+# un punto por cada entrada del historial y por cada "me gusta". Las entradas del historial usan el género
+# guardado con ellas (el mismo que se resta al recortar el historial); solo se pide a la API de contenidos
+# el de las que no lo tienen y el de los "me gusta".
+# historial_a_usuario relaciona cada idHistorial con el id de su usuario.
+def calcular_afinidad_generos(db: Session, historial_a_usuario: dict) -> dict:
+    puntos_usuario = []
+    for entrada in db.query(models.HistorialUsuario).all():
+        id_usuario = historial_a_usuario.get(entrada.idHistorial)
+        if id_usuario:
+            puntos_usuario.append((id_usuario, entrada.idContenido, entrada.idGenero))
+    for entrada in db.query(models.ListaMeGusta).all():
+        puntos_usuario.append((entrada.idUsuario, entrada.idContenido, None))
+
+    generos_contenidos = obtener_generos_contenidos(
+        [id_contenido for _, id_contenido, id_genero in puntos_usuario if not id_genero])
+
+    afinidades = {}
+    for id_usuario, id_contenido, id_genero in puntos_usuario:
+        genero_id = id_genero or generos_contenidos.get(id_contenido)
+        if genero_id:
+            clave = (id_usuario, genero_id)
+            afinidades[clave] = afinidades.get(clave, 0) + 1
+    return afinidades
+
+# Función para guardar el género de las entradas del historial que no lo tienen (las anteriores a la
+# columna idGenero o registradas sin conocerlo). No hace commit. Devuelve las entradas completadas.
+def completar_generos_historial(db: Session) -> int:
+    ids = [fila.idContenido for fila in db.query(models.HistorialUsuario.idContenido).filter(
+        models.HistorialUsuario.idGenero.is_(None)).distinct()]
+    if not ids:
+        return 0
+    completadas = 0
+    for id_contenido, id_genero in obtener_generos_contenidos(ids).items():
+        completadas += db.query(models.HistorialUsuario).filter(
+            models.HistorialUsuario.idContenido == id_contenido, models.HistorialUsuario.idGenero.is_(None)
+        ).update({models.HistorialUsuario.idGenero: id_genero}, synchronize_session=False)
+    return completadas
+
+# Función para obtener los dos géneros favoritos de un usuario (tabla de afinidad precalculada)
 def get_generos_usuario(db: Session, usuario_id: str):
-    usuario = None
-    generos_puntos = {}
-    
-    # Obtener el usuario
-    response = requests.get(f"{BASE_URL_USUARIOS}/usuarios").json()
-    for user in response:
-        if user['id'] == usuario_id:
-            usuario = user
-    
-    # Obtener el historial del usuario
-    historial_id = None
-    if usuario:
-        historial_id = usuario['idHistorial']      
-
-    historial = None
-    if historial_id:
-        historial = db.query(models.HistorialUsuario).filter(models.HistorialUsuario.idHistorial == historial_id).all()
-
-    # Obtener los géneros de los contenidos en su historial
-    if historial:
-        for entrada in historial:
-            contenido_response = requests.get(f"{BASE_URL_CONTENIDOS}/contenidos/{entrada.idContenido}")
-            if not contenido_response.ok:
-                return None
-            else:
-                contenido = contenido_response.json()             
-            genero_id = contenido['idGenero']
-
-            if genero_id:
-                if genero_id not in generos_puntos:
-                    generos_puntos[genero_id] = 1
-                else:
-                    generos_puntos[genero_id] += 1   
-    
-    # Obtener los contenidos que al usuario le gustan
-    me_gusta = db.query(models.ListaMeGusta).filter(models.ListaMeGusta.idUsuario == usuario_id).all()
-    if me_gusta:
-        for entrada in me_gusta:
-            contenido_response = requests.get(f"{BASE_URL_CONTENIDOS}/contenidos/{entrada.idContenido}")
-            if not contenido_response.ok:
-                return None
-            else:
-                contenido = contenido_response.json()    
-            genero_id = contenido['idGenero']
-
-            if genero_id:
-                if genero_id not in generos_puntos:
-                    generos_puntos[genero_id] = 1
-                else:
-                    generos_puntos[genero_id] += 1 
-
-    # Ordenar los géneros por el número de repeticiones de mayor a menor
-    generos_ordenados = sorted(generos_puntos.items(), key=lambda x: x[1], reverse=True)
-
-    # Quedarse solo con los dos más repetidos para las recomendaciones
-    top_2_generos = [genero for genero, _ in generos_ordenados[:2]]                          
-
-    # Retornar los géneros
-    return top_2_generos
+    afinidades = (
+        db.query(models.AfinidadGeneroUsuario.idGenero)
+        .filter(models.AfinidadGeneroUsuario.idUsuario == usuario_id)
+        .order_by(desc(models.AfinidadGeneroUsuario.puntos), models.AfinidadGeneroUsuario.idGenero)
+        .limit(2)
+        .all()
+    )
+    return [afinidad.idGenero for afinidad in afinidades]
+
+# Función para obtener los ids de los contenidos del historial de un usuario (vacío si no se puede obtener)
+def get_ids_historial_usuario(db: Session, usuario_id: str) -> set:
+    id_historial, _ = obtener_listas_usuario(usuario_id)
+    if not id_historial:
+        return set()
+    filas = db.query(models.HistorialUsuario.idContenido).filter(
+        models.HistorialUsuario.idHistorial == id_historial
+    ).all()
+    return {fila.idContenido for fila in filas}
+
+# Función para obtener las recomendaciones de un usuario ordenadas de mayor a menor interés.
+# Primero se usa el filtrado colaborativo y, si no hay suficientes, se completa con
+# contenidos de los dos géneros favoritos. Nunca se recomiendan contenidos ya vistos,
+# valorados o marcados con "me gusta".
+def get_recomendaciones_usuario(db: Session, usuario_id: str, limite: int = 20):
+    excluidos = get_ids_historial_usuario(db, usuario_id)
+    excluidos.update(id_contenido for _, id_contenido in recomendador.cargar_interacciones(db, usuario_id))
 
-# Función para obtener contenidos de los dos géneros favoritos de un usuario
-def get_recomendaciones_usuario(db: Session, usuario_id: str):
-    # Obtenemos los dos géneros favoritos del usuario
-    generos = get_generos_usuario(db, usuario_id)
-    
-    # Obtenemos la lista de contenidos en función de esos géneros
     recomendaciones = []
-    if generos:
-        lista1 = requests.get(f"{BASE_URL_CONTENIDOS}/generos/{generos[0]}/contenidos").json()
-        recomendaciones.extend(lista1)
-        if len(generos) == 2:
-            lista2 = requests.get(f"{BASE_URL_CONTENIDOS}/generos/{generos[1]}/contenidos").json()
-            recomendaciones.extend(lista2)
-
-    return recomendaciones    
+    ids_recomendados = recomendador.recomendar(db, usuario_id, excluidos, limite)
+    if ids_recomendados:
+        try:
+            contenidos = obtener_contenidos_por_ids(ids_recomendados)
+        except httpx.HTTPError:
+            contenidos = {}
+        recomendaciones = [contenidos[id_contenido] for id_contenido in ids_recomendados if id_contenido in contenidos]
+
+    # Completar con los contenidos de los dos géneros favoritos del usuario
+    ya_incluidos = excluidos | {contenido['id'] for contenido in recomendaciones}
+    for genero_id in get_generos_usuario(db, usuario_id):
+        if len(recomendaciones) >= limite:
+            break
+        try:
+            response = clientes_servicios.contenidos.get(f"/generos/{genero_id}/contenidos")
+        except httpx.HTTPError:
+            continue
+        if not response.is_success:
+            continue
+        for contenido in response.json():
+            if len(recomendaciones) >= limite:
+                break
+            if contenido['id'] not in ya_incluidos:
+                ya_incluidos.add(contenido['id'])
+                recomendaciones.append(contenido)
+
+    return recomendaciones
 
 # Función para mostrar los "Me Gusta" de un usuario concreto
 def mostrar_me_gusta(db: Session, usuario_id: str):
     query = db.query(models.ListaMeGusta).filter(models.ListaMeGusta.idUsuario == usuario_id).all()
     
-    me_gusta = []
-    for item in query:
-        try:
-            contenido = requests.get(f"{BASE_URL_CONTENIDOS}/contenidos/{item.idContenido}").json()
-            if contenido:
-                me_gusta.append(contenido)
-        except requests.RequestException as e:
-            print(f"Error al obtener el contenido con ID {item.idContenido}: {e}")
-    return me_gusta
+    try:
+        contenidos = obtener_contenidos_por_ids([item.idContenido for item in query])
+    except httpx.HTTPError as e:
+        print(f"Error al obtener los contenidos que le gustan al usuario {usuario_id}: {e}")
+        return []
+
+    # Se mantiene el orden de la lista de "me gusta"
+    return [contenidos[item.idContenido] for item in query if item.idContenido in contenidos]
 
 #Función para dar "Me Gusta" a un contenido por un usuario
 def dar_me_gusta(db: Session, idUsuario: str, idContenido: str):
+    genero_id = obtener_genero_contenido(idContenido)
     tupla_lista = models.ListaMeGusta(idUsuario=idUsuario,
                                       idContenido=idContenido)
     db.add(tupla_lista)
+    sumar_afinidad_genero(db, idUsuario, genero_id, 1)
+    tendencias.registrar_evento(db, idUsuario, idContenido, "meGusta")
     db.commit()
     db.refresh(tupla_lista)
     return tupla_lista
@@ -128,7 +248,10 @@ def quitar_me_gusta(db: Session, idUsuario: str, idContenido: str) -> bool:
     tupla_lista = db.query(models.ListaMeGusta).filter(models.ListaMeGusta.idUsuario == idUsuario, 
                                                        models.ListaMeGusta.idContenido == idContenido).first()
     if tupla_lista:
+        genero_id = obtener_genero_contenido(idContenido)
         db.delete(tupla_lista)
+        sumar_afinidad_genero(db, idUsuario, genero_id, -1)
+        tendencias.registrar_evento(db, idUsuario, idContenido, "meGusta", -1)
         db.commit()
         return True
     
@@ -142,15 +265,17 @@ def valorar_contenido(db: Session, idUsuario: str, idContenido: str, valoracion:
     if not valoracion:
         return None
     #Se hace una llamada a la API de Contenidos 
-    url = f"{BASE_URL_CONTENIDOS}/contenidos/{idContenido}/valoracion"
+    url = f"/contenidos/{idContenido}/valoracion"
 
-    # Parámetros del cuerpo de la solicitud
+    # Parámetros del cuerpo de la solicitud (si el usuario ya había valorado, se sustituye su valoración)
     params = {
         "valoracion": valoracion
     }
+    if tupla_antigua:
+        params["valoracionAnterior"] = tupla_antigua.puntuacion
     try:
         # Hacer la solicitud POST al endpoint
-        response = requests.put(url, params=params)
+        response = clientes_servicios.contenidos.put(url, params=params)
 
         # Validar la respuesta
         if response.status_code == 200:
@@ -158,7 +283,7 @@ def valorar_contenido(db: Session, idUsuario: str, idContenido: str, valoracion:
         else:
             print("Error al añadir la valoración:", response.status_code, response.text)
 
-    except requests.RequestException as e:
+    except httpx.HTTPError as e:
         print("Error al conectar con el servidor:", e)
 
     # Si existe ya una tupla con esa valoración, se edita
@@ -174,128 +299,185 @@ def valorar_contenido(db: Session, idUsuario: str, idContenido: str, valoracion:
     db.refresh(tupla_nueva)
     return tupla_nueva    
 
-# Función para añadir contenido al historial del usuario
-def crear_entrada_historial(db: Session, usuario_id: str, contenido_id: str):
-    # Obtener al usuario desde la API de usuarios
-    try:
-        response = requests.get(f"{BASE_URL_USUARIOS}/usuarios/{usuario_id}")
-        if response.status_code != 200:
-            raise Exception(f"Error al obtener el usuario: {response.status_code} {response.text}")
-        usuario = response.json()
-    except requests.RequestException as e:
-        raise Exception(f"Error al conectarse con la API de usuarios: {e}")
-
-    # Validar si el usuario tiene historial
-    historial_id = usuario['idHistorial']
+# Función para registrar que un usuario ha visto un contenido. Es idempotente: un único
+# INSERT ... ON CONFLICT DO UPDATE crea la entrada del historial o, si ya existe, suma una
+# visualización y actualiza la fecha. La primera visualización suma un punto de afinidad al género
+# del contenido en la misma transacción. El género lo indica quien llama (idGenero) o sale de la caché
+# local; no se pide a la API de contenidos, y si no se conoce la entrada queda sin género y el punto
+# lo añade reconstruir_afinidad. Devuelve la entrada o None si el usuario no tiene historial.
+def registrar_vista(db: Session, usuario_id: str, contenido_id: str, idGenero: str = None):
+    historial_id, _ = obtener_listas_usuario(usuario_id)
     if not historial_id:
-        raise Exception(f"No se encontró un historial para el usuario con ID {usuario_id}")
+        return None
 
-    # Crear una nueva entrada en el historial del usuario
+    tabla = models.HistorialUsuario.__table__
+    sentencia = sqlite_insert(tabla).values(
+        idHistorial=historial_id, idContenido=contenido_id, numeroVistas=1, ultimaVista=datetime.now(timezone.utc),
+        idGenero=idGenero or genero_en_cache(contenido_id),
+    )
+    sentencia = sentencia.on_conflict_do_update(
+        index_elements=["idHistorial", "idContenido"],
+        set_={"numeroVistas": tabla.c.numeroVistas + 1, "ultimaVista": sentencia.excluded.ultimaVista},
+    ).returning(tabla.c.idHistorial, tabla.c.idContenido, tabla.c.numeroVistas, tabla.c.ultimaVista,
+                tabla.c.idGenero)
     try:
-        db_historial = models.HistorialUsuario(
-            idHistorial=historial_id,
-            idContenido=contenido_id
-        )
-        db.add(db_historial)
+        vista = dict(db.execute(sentencia).mappings().one())
+        tendencias.registrar_evento(db, usuario_id, contenido_id, "vista")
+        if vista["numeroVistas"] == 1:
+            sumar_afinidad_genero(db, usuario_id, vista["idGenero"], 1)
+            # Una entrada nueva puede dejar el historial por encima del máximo: se borran las más antiguas
+            recortar_historial(db, {historial_id: usuario_id}, historial_id)
         db.commit()
-        db.refresh(db_historial)
-        return db_historial
-    except Exception as e:
+    except Exception:
         db.rollback()
-        raise Exception(f"Error al añadir contenido al historial en la base de datos: {e}")
+        raise
+    return vista
 
-# Función para obtener el historial del usuario
-def get_historial_usuario(db: Session, usuario_id: str):
-    # Obtener al usuario desde la API de usuarios
+# Función para añadir contenido al historial del usuario (si ya estaba, cuenta una visualización más).
+# A diferencia de PUT /vistas, quien llama no conoce el género: se pide a la API de contenidos antes
+# de registrar la vista para que la primera visualización sume su punto de afinidad
+def crear_entrada_historial(db: Session, usuario_id: str, contenido_id: str):
+    idGenero = obtener_genero_contenido(contenido_id)
     try:
-        response = requests.get(f"{BASE_URL_USUARIOS}/usuarios/{usuario_id}")
-        if response.status_code != 200:
-            return None
-        usuario = response.json()
-    except requests.RequestException as e:
-        return None
+        entrada = registrar_vista(db, usuario_id, contenido_id, idGenero)
+    except Exception as e:
+        raise Exception(f"Error al añadir contenido al historial en la base de datos: {e}")
+    if entrada is None:
+        raise Exception(f"No se encontró un historial para el usuario con ID {usuario_id}")
+    return entrada
+
+# Cursor opaco de una entrada del historial (fecha de la última vista e id del contenido)
+def codificar_cursor_historial(ultimaVista: datetime, idContenido: str) -> str:
+    return base64.urlsafe_b64encode(f"{ultimaVista.isoformat()}|{idContenido}".encode()).decode()
 
-    # Validar si el usuario tiene historial
-    historial_id = usuario.get('idHistorial')
+# Devuelve (ultimaVista, idContenido) o lanza ValueError si el cursor no es válido
+def decodificar_cursor_historial(cursor: str) -> tuple:
+    try:
+        fecha, id_contenido = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        return datetime.fromisoformat(fecha), id_contenido
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Cursor no válido") from None
+
+# Función para obtener una página del historial del usuario, de lo más reciente a lo más antiguo.
+# Recorre el índice (idHistorial, ultimaVista DESC, idContenido) desde el cursor y solo pide a la
+# API de contenidos los contenidos de la página. Devuelve (contenidos, cursor de la página
+# siguiente o None) o None si el usuario no tiene historial.
+def get_historial_usuario(db: Session, usuario_id: str, limite: int = 20, cursor: str = None):
+    historial_id, _ = obtener_listas_usuario(usuario_id)
     if not historial_id:
         return None
 
-    # Obtener todas las entradas del historial del usuario
+    consulta = db.query(models.HistorialUsuario.idContenido, models.HistorialUsuario.ultimaVista).filter(
+        models.HistorialUsuario.idHistorial == historial_id
+    )
+    if cursor:
+        ultima_vista, id_contenido = decodificar_cursor_historial(cursor)
+        consulta = consulta.filter(or_(
+            models.HistorialUsuario.ultimaVista < ultima_vista,
+            and_(models.HistorialUsuario.ultimaVista == ultima_vista,
+                 models.HistorialUsuario.idContenido > id_contenido),
+        ))
+    historial = consulta.order_by(
+        models.HistorialUsuario.ultimaVista.desc(), models.HistorialUsuario.idContenido
+    ).limit(limite).all()
+    siguiente = None
+    if len(historial) == limite:
+        siguiente = codificar_cursor_historial(historial[-1].ultimaVista, historial[-1].idContenido)
+
+    # Obtener los contenidos de la página con una sola petición por lotes
     try:
-        historial = db.query(models.HistorialUsuario).filter(
-            models.HistorialUsuario.idHistorial == historial_id
-        ).all()
-    except Exception as e:
-        return None
+        contenidos = obtener_contenidos_por_ids([entrada.idContenido for entrada in historial])
+    except httpx.HTTPError as e:
+        print(f"Error al conectarse con la API de contenidos: {e}")
+        return [], siguiente
 
-    # Obtener los contenidos relacionados con las entradas del historial
     contenidos_historial = []
     for entrada in historial:
-        try:
-            response = requests.get(f"{BASE_URL_CONTENIDOS}/contenidos/{entrada.idContenido}")
-            if response.status_code == 200:
-                contenidos_historial.append(response.json())
-            else:
-                print(f"Error al obtener el contenido con ID {entrada.idContenido}: {response.status_code}")
-        except requests.RequestException as e:
-            print(f"Error al conectarse con la API de contenidos para ID {entrada.idContenido}: {e}")
-
-    return contenidos_historial    
-
-# Obtener los contenidos con más "Me Gusta"
-def get_mas_me_gusta(db: Session, limite: int = 2):
-    return (
-        db.query(
-            models.ListaMeGusta.idContenido.label("idContenido"),
-            func.count(models.ListaMeGusta.idContenido).label("me_gusta_total")
+        if entrada.idContenido in contenidos:
+            contenidos_historial.append(contenidos[entrada.idContenido])
+        else:
+            print(f"Error al obtener el contenido con ID {entrada.idContenido}: no encontrado")
+
+    return contenidos_historial, siguiente
+
+# Máximo de entradas que se conservan en el historial de cada usuario (se borran las más antiguas)
+HISTORIAL_MAXIMO = int(os.getenv("HISTORIAL_MAXIMO", "500"))
+
+# Función para borrar las entradas más antiguas de un historial (o de todos si historial_id es None)
+# a partir de la posición maximo. Los puntos de afinidad que sumaron las entradas borradas se restan
+# en la misma transacción; historial_a_usuario relaciona cada idHistorial con el id de su usuario.
+# No hace commit. Devuelve las filas borradas.
+def recortar_historial(db: Session, historial_a_usuario: dict, historial_id: str = None,
+                       maximo: int = HISTORIAL_MAXIMO) -> int:
+    tabla = models.HistorialUsuario
+    if historial_id is not None:
+        sobrantes = (
+            select(tabla.idContenido)
+            .where(tabla.idHistorial == historial_id)
+            .order_by(tabla.ultimaVista.desc(), tabla.idContenido)
+            .offset(maximo)
         )
+        sentencia = delete(tabla).where(tabla.idHistorial == historial_id, tabla.idContenido.in_(sobrantes))
+    else:
+        posicion = func.row_number().over(
+            partition_by=tabla.idHistorial, order_by=(tabla.ultimaVista.desc(), tabla.idContenido)
+        ).label("posicion")
+        entradas = select(tabla.idHistorial, tabla.idContenido, posicion).subquery()
+        sobrantes = select(entradas.c.idHistorial, entradas.c.idContenido).where(entradas.c.posicion > maximo)
+        sentencia = delete(tabla).where(tuple_(tabla.idHistorial, tabla.idContenido).in_(sobrantes))
+    borradas = db.execute(sentencia.returning(tabla.idHistorial, tabla.idGenero),
+                          execution_options={"synchronize_session": False}).all()
+
+    puntos = Counter(
+        (historial_a_usuario.get(fila.idHistorial), fila.idGenero) for fila in borradas if fila.idGenero
+    )
+    for (id_usuario, id_genero), numero in puntos.items():
+        if id_usuario:
+            sumar_afinidad_genero(db, id_usuario, id_genero, -numero)
+    return len(borradas)
+
+# Método para obtener las tendencias de una ventana con el título de los contenidos.
+# El ranking sale de la tabla materializada tendencia_contenido y los títulos de una sola
+# petición por lotes a la API de contenidos.
+def get_tendencias_completas(db: Session, ventana: str = "24h", limite: int = 2):
+    populares = tendencias.get_tendencias(db, ventana, limite)
+    ids = [id_contenido for id_contenido, _ in populares]
+    if not ids:
+        return []
+
+    # "Me gusta" totales de cada contenido (índice ix_lista_me_gusta_idContenido)
+    me_gusta_totales = dict(
+        db.query(models.ListaMeGusta.idContenido, func.count())
+        .filter(models.ListaMeGusta.idContenido.in_(ids))
         .group_by(models.ListaMeGusta.idContenido)
-        .order_by(desc("me_gusta_total"))
-        .limit(limite)
         .all()
     )
 
-#Metodo para obtener las tendencias con el titulo de los Contenidos
-def get_tendencias_completas(db: Session, limite: int = 2):
-    # Obtener idContenido y me_gusta_total de la base de datos
-    contenidos_populares = get_mas_me_gusta(db, limite)
-    tendencias = []
-
-    for contenido in contenidos_populares:
-        id_contenido = contenido.idContenido
-        me_gusta_total = contenido.me_gusta_total
-
-        # Solicitar el título del contenido a la API de contenidos
-        try:
-            response = requests.get(f"{BASE_URL_CONTENIDOS}/contenidos/{id_contenido}")
-            if response.ok:
-                contenido_data = response.json()
-                titulo = contenido_data.get("titulo", "Título desconocido")  # Recuperar el título
-            else:
-                titulo = "Título no disponible"  # En caso de error en la solicitud
-        except requests.RequestException:
-            titulo = "Error al obtener título"  # Manejo de excepciones
-
-        # Añadir a la lista de tendencias
-        tendencias.append(
-            schemas.Tendencia(
-                idContenido=id_contenido,
-                titulo=titulo,
-                me_gusta_total=me_gusta_total,
-            )
+    try:
+        contenidos = obtener_contenidos_por_ids(ids)
+    except httpx.HTTPError as e:
+        print(f"Error al obtener los títulos de las tendencias: {e}")
+        contenidos = {}
+
+    return [
+        schemas.Tendencia(
+            idContenido=id_contenido,
+            titulo=contenidos.get(id_contenido, {}).get("titulo", "Título no disponible"),
+            me_gusta_total=me_gusta_totales.get(id_contenido, 0),
+            puntuacion=round(puntuacion, 3),
         )
-
-    return tendencias
+        for id_contenido, puntuacion in populares
+    ]
 
 # Función para insertar un contenido en una lista personalizada.
 def insert_content_into_LP(db: Session, usuario_id: str, contenido_id: str):
     # Obtener al usuario desde la API de usuarios
     try:
-        response = requests.get(f"{BASE_URL_USUARIOS}/usuarios/{usuario_id}")
+        response = clientes_servicios.usuarios.get(f"/usuarios/{usuario_id}")
         if response.status_code != 200:
             raise Exception(f"Error al obtener el usuario: {response.status_code} {response.text}")
         usuario = response.json()
-    except requests.RequestException as e:
+    except httpx.HTTPError as e:
         raise Exception(f"Error al conectarse con la API de usuarios: {e}")
 
     # Validar si el usuario tiene listaPersonalizada
@@ -321,7 +503,7 @@ def insert_content_into_LP(db: Session, usuario_id: str, contenido_id: str):
 def get_LP_user(db: Session, usuario_id: str):
     try:
         # Llamar a la API de usuarios para obtener la información del usuario
-        response = requests.get(f"{BASE_URL_USUARIOS}/usuarios/{usuario_id}")
+        response = clientes_servicios.usuarios.get(f"/usuarios/{usuario_id}")
         if response.status_code != 200:
             raise Exception(f"Error al obtener el usuario: {response.status_code} {response.text}")
         
@@ -341,20 +523,22 @@ def get_LP_user(db: Session, usuario_id: str):
             return []
         
         # Obtener los contenidos relacionados
+        try:
+            # Consultar la API de contenidos con todos los IDs a la vez
+            contenidos = obtener_contenidos_por_ids([row.idContenido for row in lista_personalizada])
+        except httpx.HTTPError as e:
+            print(f"Error al conectarse con la API de contenidos: {e}")
+            return []
+
         contenidos_LP = []
         for row in lista_personalizada:
-            try:
-                # Consultar la API de contenidos para cada ID
-                response = requests.get(f"{BASE_URL_CONTENIDOS}/contenidos/{row.idContenido}")
-                if response.status_code == 200:
-                    contenidos_LP.append(response.json())
-                else:
-                    print(f"Error al obtener el contenido con ID {row.idContenido}: {response.status_code}")
-            except requests.RequestException as e:
-                print(f"Error al conectarse con la API de contenidos para ID {row.idContenido}: {e}")
-        
+            if row.idContenido in contenidos:
+                contenidos_LP.append(contenidos[row.idContenido])
+            else:
+                print(f"Error al obtener el contenido con ID {row.idContenido}: no encontrado")
+
         return contenidos_LP
-    except requests.RequestException as e:
+    except httpx.HTTPError as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error al conectarse con la API de usuarios: {e}"
@@ -369,11 +553,11 @@ def get_LP_user(db: Session, usuario_id: str):
 def delete_conent_from_user_LP(db: Session, idUsuario: str, idContenido: str):
     # Obtener al usuario desde la API de usuarios
     try:
-        response = requests.get(f"{BASE_URL_USUARIOS}/usuarios/{idUsuario}")
+        response = clientes_servicios.usuarios.get(f"/usuarios/{idUsuario}")
         if response.status_code != 200:
             raise Exception(f"Error al obtener el usuario: {response.status_code} {response.text}")
         usuario = response.json()
-    except requests.RequestException as e:
+    except httpx.HTTPError as e:
         raise Exception(f"Error al conectarse con la API de usuarios: {e}")
 
     # Validar si el usuario tiene listaPersonalizada
@@ -388,4 +572,46 @@ def delete_conent_from_user_LP(db: Session, idUsuario: str, idContenido: str):
         db.commit()
         return True
     
-    return False
\ No newline at end of file
+    return False
+
+# Función para obtener, en una sola consulta, el estado de varios contenidos para un usuario:
+# si le gustan, si están en su lista personalizada o en su historial y su valoración.
+# Cada rama de la consulta busca por la clave primaria (usuario o lista, contenido), así que
+# solo lee las filas de los ids pedidos. No llama a la API de contenidos.
+def get_estado_contenidos(db: Session, usuario_id: str, ids: list[str]) -> dict:
+    ids_unicos = list(dict.fromkeys(ids))
+    estados = {id_contenido: schemas.EstadoContenido() for id_contenido in ids_unicos}
+    if not ids_unicos:
+        return estados
+    id_historial, id_lista = obtener_listas_usuario(usuario_id)
+
+    consultas = [
+        select(literal("meGusta").label("estado"), models.ListaMeGusta.idContenido,
+               null().label("puntuacion"))
+        .where(models.ListaMeGusta.idUsuario == usuario_id, models.ListaMeGusta.idContenido.in_(ids_unicos)),
+        select(literal("valoracion").label("estado"), models.ValoracionUsuarioContenido.idContenido,
+               models.ValoracionUsuarioContenido.puntuacion)
+        .where(models.ValoracionUsuarioContenido.idUsuario == usuario_id,
+               models.ValoracionUsuarioContenido.idContenido.in_(ids_unicos)),
+    ]
+    if id_historial:
+        consultas.append(
+            select(literal("enHistorial").label("estado"), models.HistorialUsuario.idContenido,
+                   null().label("puntuacion"))
+            .where(models.HistorialUsuario.idHistorial == id_historial,
+                   models.HistorialUsuario.idContenido.in_(ids_unicos))
+        )
+    if id_lista:
+        consultas.append(
+            select(literal("enLista").label("estado"), models.ListaPersonalizada.idContenido,
+                   null().label("puntuacion"))
+            .where(models.ListaPersonalizada.idLista == id_lista,
+                   models.ListaPersonalizada.idContenido.in_(ids_unicos))
+        )
+
+    for estado, id_contenido, puntuacion in db.execute(union_all(*consultas)):
+        if estado == "valoracion":
+            estados[id_contenido].valoracion = puntuacion
+        else:
+            setattr(estados[id_contenido], estado, True)
+    return estados
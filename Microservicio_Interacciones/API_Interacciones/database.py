@@ -1,7 +1,7 @@
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from . import models, crud 
+from . import models, crud, migraciones, configuracion_sqlite
 import os 
 
 """
@@ -23,6 +23,9 @@ engine = create_engine(
     SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
 )
 
+# PRAGMAs de rendimiento (WAL, mmap, caché...) según SQLITE_PERFIL, aplicados a cada conexión
+configuracion_sqlite.configurar_motor(engine)
+
 # Crear una fábrica de sesiones para hacer queries
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -39,7 +42,12 @@ def get_db():
 
 # Función para inicializar la base de datos
 def initialize_database():
-    if not os.path.exists(DB_PATH):
-        # Crea las tablas si no existen
-        Base.metadata.create_all(bind=engine)
+    nueva = not os.path.exists(DB_PATH)
+    # Crea las tablas que falten (también en bases de datos ya existentes, p. ej. afinidad_genero_usuario)
+    Base.metadata.create_all(bind=engine)
+    if nueva:
         print("Base de datos creada y tablas inicializadas.")
+
+    # Migraciones pendientes del esquema (índices nuevos en bases de datos ya existentes)
+    migraciones.aplicar_migraciones(engine)
+    print(configuracion_sqlite.describir(engine))
@@ -1,7 +1,11 @@
-from fastapi import FastAPI, Depends, HTTPException
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import Optional
+from fastapi import FastAPI, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
-from . import models, schemas, crud
-from .database import engine, get_db, initialize_database
+from . import models, schemas, crud, clientes_servicios, recomendador, tendencias
+from .database import engine, get_db, initialize_database, SessionLocal
 
 """
 Autor: Grupo GA01 - ASEE
@@ -12,8 +16,75 @@ Comando de ejecución:
 
 """
 
+# Segundos entre recálculos de las similitudes del recomendador (0 desactiva el recálculo periódico)
+RECOMENDADOR_INTERVALO = float(os.getenv("RECOMENDADOR_INTERVALO", "3600"))
+
+# Segundos entre recálculos del ranking de tendencias (0 desactiva el recálculo periódico)
+TENDENCIAS_INTERVALO = float(os.getenv("TENDENCIAS_INTERVALO", "300"))
+
+# Número máximo de contenidos de los que se puede pedir el estado en una sola petición
+MAX_IDS_ESTADO = 500
+
+# Máximo de limit en GET /usuarios/{idUsuario}/historial
+MAX_HISTORIAL_PAGINA = 100
+
+
+def recalcular_similitudes():
+    db = SessionLocal()
+    try:
+        resultado = recomendador.recalcular_similitudes(db)
+        print(f"Similitudes recalculadas: {resultado['filas']} filas en {resultado['segundos']} s.")
+    except Exception as e:
+        db.rollback()
+        print(f"Error al recalcular las similitudes: {e}")
+    finally:
+        db.close()
+
+
+async def recalcular_similitudes_periodicamente():
+    while True:
+        await asyncio.to_thread(recalcular_similitudes)
+        await asyncio.sleep(RECOMENDADOR_INTERVALO)
+
+
+def recalcular_tendencias():
+    db = SessionLocal()
+    try:
+        resultado = tendencias.recalcular_tendencias(db)
+        print(f"Tendencias recalculadas: {resultado['filas']} filas en {resultado['segundos']} s.")
+    except Exception as e:
+        db.rollback()
+        print(f"Error al recalcular las tendencias: {e}")
+    finally:
+        db.close()
+
+
+async def recalcular_tendencias_periodicamente():
+    while True:
+        await asyncio.to_thread(recalcular_tendencias)
+        await asyncio.sleep(TENDENCIAS_INTERVALO)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Clientes HTTP con pool de conexiones hacia los microservicios de contenidos y usuarios
+    clientes_servicios.iniciar_clientes()
+    tarea_recomendador = None
+    if RECOMENDADOR_INTERVALO > 0:
+        tarea_recomendador = asyncio.create_task(recalcular_similitudes_periodicamente())
+    tarea_tendencias = None
+    if TENDENCIAS_INTERVALO > 0:
+        tarea_tendencias = asyncio.create_task(recalcular_tendencias_periodicamente())
+    yield
+    if tarea_recomendador:
+        tarea_recomendador.cancel()
+    if tarea_tendencias:
+        tarea_tendencias.cancel()
+    clientes_servicios.cerrar_clientes()
+
 #Crear la aplicacion
 app = FastAPI(
+    lifespan=lifespan,
     title="Microservicio de Interacciones",
     description="API para gestionar las recomendaciones e interacciones de usuarios y contenido multimedia.",
     version="1.0.0",
@@ -29,12 +100,20 @@ def get_database():
 
 # Endpoint para obtener las recomendaciones para los usuarios
 @app.get("/usuarios/{idUsuario}/recomendaciones", response_model=list[schemas.ContenidoGetId])
-def get_recomendaciones(idUsuario: str, db: Session = Depends(get_db)):
-    recomendaciones = crud.get_recomendaciones_usuario(db=db, usuario_id=idUsuario)
+def get_recomendaciones(idUsuario: str, limit: int = Query(20, ge=1, le=100), db: Session = Depends(get_db)):
+    recomendaciones = crud.get_recomendaciones_usuario(db=db, usuario_id=idUsuario, limite=limit)
     if not recomendaciones:
         raise HTTPException(status_code=404, detail="No se pudieron recuperar las recomendaciones")
     return recomendaciones  
 
+# Endpoint para obtener en una sola consulta el estado de varios contenidos para un usuario
+# ("me gusta", lista personalizada, historial y valoración), indexado por id de contenido
+@app.post("/usuarios/{idUsuario}/estado", response_model=dict[str, schemas.EstadoContenido])
+def get_estado_contenidos(idUsuario: str, lote: schemas.ContenidosLote, db: Session = Depends(get_db)):
+    if len(lote.ids) > MAX_IDS_ESTADO:
+        raise HTTPException(status_code=400, detail=f"No se puede consultar el estado de más de {MAX_IDS_ESTADO} contenidos por petición")
+    return crud.get_estado_contenidos(db=db, usuario_id=idUsuario, ids=lote.ids)
+
 # Endpoint para obtener lista de me gusta
 @app.get("/usuarios/{idUsuario}/me-gusta", response_model=list[schemas.ContenidoMeGusta])
 def mostrar_megusta(idUsuario: str, db: Session = Depends(get_db)):
@@ -73,22 +152,42 @@ def actualizar_historial(idUsuario: str, idContenido: str, db: Session = Depends
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-# Endpoint para devolver el historial del usuario
+# Endpoint idempotente para registrar que un usuario ha visto un contenido (crea la entrada del
+# historial o suma una visualización si ya existía). idGenero es el género del contenido, para la afinidad
+@app.put("/usuarios/{idUsuario}/vistas/{idContenido}", response_model=schemas.VistaHistorial)
+def registrar_vista(idUsuario: str, idContenido: str, idGenero: Optional[str] = None, db: Session = Depends(get_db)):
+    vista = crud.registrar_vista(db=db, usuario_id=idUsuario, contenido_id=idContenido, idGenero=idGenero)
+    if vista is None:
+        raise HTTPException(status_code=404, detail="No se encontró un historial para el usuario")
+    return vista
+
+# Endpoint para devolver el historial del usuario, de lo más reciente a lo más antiguo, por páginas.
+# Si puede haber más entradas, la cabecera X-Siguiente-Cursor trae el valor de cursor de la siguiente página
 @app.get("/usuarios/{idUsuario}/historial", response_model=list[schemas.ContenidoGetId])
-def get_historial(idUsuario: str, db: Session = Depends(get_db)):
-    historial = crud.get_historial_usuario(db=db, usuario_id=idUsuario)
-    if not historial:
-         raise HTTPException(status_code=404, detail="No se ha encontrado historial")    
-    return historial     
+def get_historial(idUsuario: str, response: Response, limit: int = Query(20, ge=1, le=MAX_HISTORIAL_PAGINA),
+                  cursor: Optional[str] = None, db: Session = Depends(get_db)):
+    try:
+        pagina = crud.get_historial_usuario(db=db, usuario_id=idUsuario, limite=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if pagina is None:
+         raise HTTPException(status_code=404, detail="No se ha encontrado historial")
+    historial, siguiente = pagina
+    if siguiente:
+        response.headers["X-Siguiente-Cursor"] = siguiente
+    return historial
 
 # Endpoint para obtener los contenidos más populares basados en "me gusta".
 @app.get("/contenido/tendencias", response_model=schemas.TendenciasResponse)
-def obtener_tendencias(limite: int = 2, db: Session = Depends(get_db)):
+def obtener_tendencias(ventana: str = Query("24h", pattern="^(" + "|".join(tendencias.VENTANAS) + ")$"),
+                       limite: int = Query(2, ge=1, le=tendencias.MAXIMO_POR_VENTANA),
+                       db: Session = Depends(get_db)):
     """
-    Devuelve una lista de contenidos populares (tendencias) con su id, título, y número de 'me gusta'.
+    Devuelve los contenidos en tendencia de la ventana indicada (1h, 24h o 7d) con su id, título,
+    número de 'me gusta' y puntuación. El ranking se recalcula cada TENDENCIAS_INTERVALO segundos.
     """
-    tendencias = crud.get_tendencias_completas(db, limite)
-    return schemas.TendenciasResponse(tendencias=tendencias)
+    populares = crud.get_tendencias_completas(db, ventana, limite)
+    return schemas.TendenciasResponse(tendencias=populares)
 
 
 # Endpoint para añadir contenido a la lista personalizada
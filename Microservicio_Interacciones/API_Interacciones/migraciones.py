@@ -0,0 +1,188 @@
+import argparse
+import sys
+from datetime import datetime, timezone
+from sqlalchemy import text
+
+"""
+Autor: Grupo GA01 - ASEE
+Versión: 1.0
+Descripción: Migraciones versionadas del esquema de interacciones.db.
+Cada migración tiene un número de versión y una lista de sentencias idempotentes (SQL o funciones
+que reciben la conexión, para los cambios que SQLite no sabe hacer con IF NOT EXISTS). Las versiones
+aplicadas se guardan en la tabla esquema_migraciones, así que al arrancar solo se ejecutan las
+nuevas, tanto en bases de datos recién creadas como en las que ya estaban en uso.
+Los índices que se crean aquí también están declarados en models.py (mismo nombre), de modo
+que una base de datos nueva ya los tiene y la migración no hace nada.
+
+Comando de ejecución (desde Microservicio_Interacciones o /app en el contenedor):
+    python -m API_Interacciones.migraciones              -> aplica las migraciones pendientes
+    python -m API_Interacciones.migraciones --comprobar  -> además revisa el plan de las consultas frecuentes
+
+"""
+
+def anadir_columna(tabla: str, columna: str, definicion: str):
+    """
+    Sentencia de migración que añade una columna solo si la tabla aún no la tiene
+    (SQLite no admite ADD COLUMN IF NOT EXISTS y create_all ya la crea en las bases de datos nuevas).
+    """
+    def _sentencia(conexion):
+        columnas = {fila[1] for fila in conexion.execute(text(f'PRAGMA table_info("{tabla}")'))}
+        if columna not in columnas:
+            conexion.execute(text(f'ALTER TABLE "{tabla}" ADD COLUMN "{columna}" {definicion}'))
+    return _sentencia
+
+
+# (versión, descripción, sentencias)
+MIGRACIONES = [
+    (1, "Índices secundarios para tendencias, valoraciones y afinidad por género", [
+        'CREATE INDEX IF NOT EXISTS "ix_lista_me_gusta_idContenido" ON lista_me_gusta ("idContenido")',
+        'CREATE INDEX IF NOT EXISTS "ix_valoracion_usuario_contenido_idContenido_puntuacion" '
+        'ON valoracion_usuario_contenido ("idContenido", puntuacion)',
+        'CREATE INDEX IF NOT EXISTS "ix_afinidad_genero_usuario_idUsuario_puntos" '
+        'ON afinidad_genero_usuario ("idUsuario", puntos DESC, "idGenero")',
+    ]),
+    (2, "Número de visualizaciones, última visualización y género de cada entrada del historial", [
+        # Las entradas que ya existían cuentan como una visualización de fecha desconocida
+        anadir_columna("historial_usuario", "numeroVistas", "INTEGER NOT NULL DEFAULT 1"),
+        anadir_columna("historial_usuario", "ultimaVista", "DATETIME"),
+        # Las entradas que ya existían reciben el género al ejecutar reconstruir_afinidad
+        anadir_columna("historial_usuario", "idGenero", "VARCHAR"),
+    ]),
+    (3, "Contadores de tendencias iniciales a partir de los me gusta existentes", [
+        # Los "me gusta" anteriores no tienen fecha: cuentan como dados en la hora de la migración,
+        # así que la estantería de tendencias no queda vacía y pierden peso como cualquier otro
+        'INSERT INTO contador_tendencia_hora (hora, "idContenido", "meGusta", vistas) '
+        'SELECT CAST(strftime(\'%s\', \'now\') AS INTEGER) / 3600, "idContenido", count(*), 0 '
+        'FROM lista_me_gusta WHERE true GROUP BY "idContenido" '
+        'ON CONFLICT (hora, "idContenido") DO UPDATE SET "meGusta" = "meGusta" + excluded."meGusta"',
+    ]),
+    (4, "Historial ordenado por fecha de la última visualización", [
+        # Las entradas sin fecha quedan como las más antiguas para que el cursor no tenga que tratar nulos
+        'UPDATE historial_usuario SET "ultimaVista" = \'1970-01-01 00:00:00.000000\' WHERE "ultimaVista" IS NULL',
+        'CREATE INDEX IF NOT EXISTS "ix_historial_usuario_idHistorial_ultimaVista" '
+        'ON historial_usuario ("idHistorial", "ultimaVista" DESC, "idContenido")',
+    ]),
+]
+
+# Consultas frecuentes que no pueden recorrer una tabla entera: nombre -> (sql, parámetros)
+CONSULTAS_FRECUENTES = {
+    "tendencias de una ventana": (
+        'SELECT "idContenido", puntuacion FROM tendencia_contenido WHERE ventana = :ventana '
+        'ORDER BY puntuacion DESC, "idContenido" LIMIT 10', {"ventana": "24h"}),
+    "me gusta totales de las tendencias": (
+        'SELECT "idContenido", count(*) FROM lista_me_gusta WHERE "idContenido" IN (:a, :b) '
+        'GROUP BY "idContenido"', {"a": "1", "b": "2"}),
+    "contadores de tendencias de las últimas horas": (
+        'SELECT * FROM contador_tendencia_hora WHERE hora >= :hora', {"hora": 0}),
+    "me gusta de un usuario": (
+        'SELECT "idContenido" FROM lista_me_gusta WHERE "idUsuario" = :usuario', {"usuario": "1"}),
+    "usuarios a los que les gusta un contenido": (
+        'SELECT "idUsuario" FROM lista_me_gusta WHERE "idContenido" = :contenido', {"contenido": "1"}),
+    "valoraciones de un contenido": (
+        'SELECT puntuacion FROM valoracion_usuario_contenido WHERE "idContenido" = :contenido',
+        {"contenido": "1"}),
+    "valoración de un usuario": (
+        'SELECT puntuacion FROM valoracion_usuario_contenido WHERE "idUsuario" = :usuario AND "idContenido" = :contenido',
+        {"usuario": "1", "contenido": "1"}),
+    "historial de un usuario": (
+        'SELECT "idContenido" FROM historial_usuario WHERE "idHistorial" = :historial', {"historial": "1"}),
+    "página del historial de un usuario": (
+        'SELECT "idContenido", "ultimaVista" FROM historial_usuario WHERE "idHistorial" = :historial '
+        'AND ("ultimaVista" < :fecha OR ("ultimaVista" = :fecha AND "idContenido" > :contenido)) '
+        'ORDER BY "ultimaVista" DESC, "idContenido" LIMIT 20',
+        {"historial": "1", "fecha": "2024-01-01 00:00:00.000000", "contenido": "1"}),
+    "lista personalizada": (
+        'SELECT "idContenido" FROM lista_personalizada WHERE "idLista" = :lista', {"lista": "1"}),
+    "géneros favoritos de un usuario": (
+        'SELECT "idGenero" FROM afinidad_genero_usuario WHERE "idUsuario" = :usuario '
+        'ORDER BY puntos DESC, "idGenero" LIMIT 2', {"usuario": "1"}),
+    "vecinos de varios contenidos": (
+        'SELECT * FROM similitud_contenido WHERE "idContenido" IN (:a, :b)', {"a": "1", "b": "2"}),
+}
+
+
+def _preparar_tabla(conexion):
+    conexion.execute(text(
+        "CREATE TABLE IF NOT EXISTS esquema_migraciones ("
+        "version INTEGER PRIMARY KEY, descripcion TEXT NOT NULL, aplicada TEXT NOT NULL)"
+    ))
+
+
+def version_actual(engine) -> int:
+    with engine.begin() as conexion:
+        _preparar_tabla(conexion)
+        return conexion.execute(text("SELECT COALESCE(MAX(version), 0) FROM esquema_migraciones")).scalar()
+
+
+def aplicar_migraciones(engine) -> list:
+    """
+    Ejecuta en orden las migraciones que aún no se han aplicado y devuelve sus versiones.
+    """
+    aplicadas = []
+    with engine.begin() as conexion:
+        _preparar_tabla(conexion)
+        hechas = {fila[0] for fila in conexion.execute(text("SELECT version FROM esquema_migraciones"))}
+        for version, descripcion, sentencias in MIGRACIONES:
+            if version in hechas:
+                continue
+            for sentencia in sentencias:
+                if callable(sentencia):
+                    sentencia(conexion)
+                else:
+                    conexion.execute(text(sentencia))
+            conexion.execute(
+                text("INSERT OR IGNORE INTO esquema_migraciones (version, descripcion, aplicada) "
+                     "VALUES (:version, :descripcion, :aplicada)"),
+                {"version": version, "descripcion": descripcion,
+                 "aplicada": datetime.now(timezone.utc).isoformat(timespec="seconds")},
+            )
+            print(f"Migración {version} aplicada: {descripcion}")
+            aplicadas.append(version)
+    return aplicadas
+
+
+def _paso_problematico(detalle: str) -> bool:
+    # "SCAN tabla" sin índice es un recorrido completo; agrupar en un B-tree temporal también
+    # obliga a leer todas las filas antes de devolver la primera
+    if detalle.startswith("SCAN ") and " USING " not in detalle:
+        return True
+    return "TEMP B-TREE FOR GROUP BY" in detalle or "TEMP B-TREE FOR DISTINCT" in detalle
+
+
+def comprobar_planes(engine) -> dict:
+    """
+    Ejecuta EXPLAIN QUERY PLAN sobre cada consulta frecuente.
+    Devuelve {nombre: (pasos del plan, pasos problemáticos)}.
+    """
+    resultado = {}
+    with engine.connect() as conexion:
+        for nombre, (sql, parametros) in CONSULTAS_FRECUENTES.items():
+            pasos = [fila[3] for fila in conexion.execute(text("EXPLAIN QUERY PLAN " + sql), parametros)]
+            resultado[nombre] = (pasos, [paso for paso in pasos if _paso_problematico(paso)])
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migraciones del esquema de la base de datos")
+    parser.add_argument("--comprobar", action="store_true",
+                        help="Comprueba que las consultas frecuentes no recorren tablas completas")
+    args = parser.parse_args()
+
+    from . import models  # noqa: F401 (models se importa antes que database, como en main.py)
+    from .database import engine, initialize_database
+
+    initialize_database()
+    print(f"Versión del esquema: {version_actual(engine)}")
+    if not args.comprobar:
+        return 0
+
+    errores = 0
+    for nombre, (pasos, problemas) in comprobar_planes(engine).items():
+        print(f"{'ERROR' if problemas else 'OK':5} {nombre}: {' | '.join(pasos)}")
+        errores += bool(problemas)
+    print(f"{errores} consultas recorren tablas completas.")
+    return 1 if errores else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
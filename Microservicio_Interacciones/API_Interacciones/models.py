@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import Column, String, ForeignKey, Float, Integer, PrimaryKeyConstraint
+from sqlalchemy import Column, String, ForeignKey, Float, Integer, DateTime, PrimaryKeyConstraint, Index
 from .database import Base
 
 """
@@ -16,6 +16,7 @@ class ValoracionUsuarioContenido(Base):
 
     __table_args__ = (
         PrimaryKeyConstraint('idUsuario', 'idContenido'),
+        Index("ix_valoracion_usuario_contenido_idContenido_puntuacion", "idContenido", "puntuacion"),
     )    
 
 class ListaMeGusta(Base):
@@ -25,6 +26,7 @@ class ListaMeGusta(Base):
         
     __table_args__ = (
         PrimaryKeyConstraint('idUsuario', 'idContenido'),
+        Index("ix_lista_me_gusta_idContenido", "idContenido"),
     )
 
 class ListaPersonalizada(Base):
@@ -40,7 +42,67 @@ class HistorialUsuario(Base):
     __tablename__ = "historial_usuario"
     idHistorial = Column(String, nullable=False)
     idContenido = Column(String, nullable=False)
+    numeroVistas = Column(Integer, nullable=False, default=1, server_default="1")  # Veces que el usuario lo ha visto
+    ultimaVista = Column(DateTime, nullable=True)  # Instante (UTC) de la última visualización
+    idGenero = Column(String, nullable=True)  # Género del contenido con el que sumó afinidad (None si no se conocía)
 
     __table_args__ = (
         PrimaryKeyConstraint('idHistorial', 'idContenido'),
+        Index("ix_historial_usuario_idHistorial_ultimaVista", idHistorial, ultimaVista.desc(), idContenido),
     )       
+
+class AfinidadGeneroUsuario(Base):
+    __tablename__ = "afinidad_genero_usuario"
+    idUsuario = Column(String, nullable=False)  # Referencia lógica a Usuarios
+    idGenero = Column(String, nullable=False)  # Referencia lógica a Genero
+    puntos = Column(Integer, nullable=False, default=0)  # Entradas de historial + "me gusta" del género
+
+    __table_args__ = (
+        PrimaryKeyConstraint('idUsuario', 'idGenero'),
+        Index("ix_afinidad_genero_usuario_idUsuario_puntos", idUsuario, puntos.desc(), idGenero),
+    )
+
+class SimilitudContenido(Base):
+    __tablename__ = "similitud_contenido"
+    idContenido = Column(String, nullable=False)  # Referencia lógica a Contenido
+    idVecino = Column(String, nullable=False)  # Contenido similar (referencia lógica a Contenido)
+    similitud = Column(Float, nullable=False)  # Similitud coseno entre 0 y 1
+
+    __table_args__ = (
+        PrimaryKeyConstraint('idContenido', 'idVecino'),
+    )
+
+class EventoInteraccion(Base):
+    __tablename__ = "evento_interaccion"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    instante = Column(DateTime, nullable=False)  # Instante (UTC) de la interacción
+    idUsuario = Column(String, nullable=False)  # Referencia lógica a Usuarios
+    idContenido = Column(String, nullable=False)  # Referencia lógica a Contenido
+    tipo = Column(String, nullable=False)  # "meGusta" o "vista"
+    delta = Column(Integer, nullable=False, default=1)  # +1 al añadir, -1 al quitar un "me gusta"
+
+    __table_args__ = (
+        Index("ix_evento_interaccion_instante", "instante"),
+    )
+
+class ContadorTendenciaHora(Base):
+    __tablename__ = "contador_tendencia_hora"
+    hora = Column(Integer, nullable=False)  # Horas desde 1970-01-01 UTC
+    idContenido = Column(String, nullable=False)  # Referencia lógica a Contenido
+    meGusta = Column(Integer, nullable=False, default=0)  # "Me gusta" netos de esa hora
+    vistas = Column(Integer, nullable=False, default=0)  # Visualizaciones de esa hora
+
+    __table_args__ = (
+        PrimaryKeyConstraint('hora', 'idContenido'),
+    )
+
+class TendenciaContenido(Base):
+    __tablename__ = "tendencia_contenido"
+    ventana = Column(String, nullable=False)  # "1h", "24h" o "7d"
+    idContenido = Column(String, nullable=False)  # Referencia lógica a Contenido
+    puntuacion = Column(Float, nullable=False)  # Interacciones de la ventana con decaimiento exponencial
+
+    __table_args__ = (
+        PrimaryKeyConstraint('ventana', 'idContenido'),
+        Index("ix_tendencia_contenido_ventana_puntuacion", ventana, puntuacion.desc(), idContenido),
+    )
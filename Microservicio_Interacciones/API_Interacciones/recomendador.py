@@ -0,0 +1,151 @@
+import os
+import sys
+import time
+import numpy as np
+from scipy import sparse
+from sqlalchemy.orm import Session
+from . import models
+
+"""
+Autor: Grupo GA01 - ASEE
+Versión: 1.0
+Descripción: Recomendador de filtrado colaborativo contenido-contenido.
+Parte offline: a partir de las valoraciones y los "me gusta" se construye una matriz dispersa
+usuarios x contenidos, se calcula la similitud coseno entre contenidos y se guardan los K
+vecinos más parecidos de cada contenido en la tabla similitud_contenido.
+Parte online: las recomendaciones de un usuario se puntúan sumando la similitud de los vecinos
+de los contenidos con los que ha interactuado, ponderada por el peso de esa interacción.
+
+Comando de ejecución del recálculo (desde Microservicio_Interacciones o /app en el contenedor):
+    python -m API_Interacciones.recomendador
+
+"""
+
+# Número de vecinos que se guardan por contenido
+VECINOS_POR_CONTENIDO = int(os.getenv("RECOMENDADOR_VECINOS", "50"))
+
+# Peso de cada interacción: un "me gusta" vale 1 y una valoración su puntuación sobre 10
+PESO_ME_GUSTA = 1.0
+PUNTUACION_MAXIMA = 10.0
+
+# Filas que se insertan en cada sentencia al guardar las similitudes
+TAMANO_LOTE_INSERCION = 5000
+
+
+# Devuelve el peso de cada par (usuario, contenido). Si hay valoración y "me gusta" se queda el mayor
+def cargar_interacciones(db: Session, idUsuario: str = None) -> dict:
+    valoraciones = db.query(models.ValoracionUsuarioContenido.idUsuario,
+                            models.ValoracionUsuarioContenido.idContenido,
+                            models.ValoracionUsuarioContenido.puntuacion)
+    me_gusta = db.query(models.ListaMeGusta.idUsuario, models.ListaMeGusta.idContenido)
+    if idUsuario is not None:
+        valoraciones = valoraciones.filter(models.ValoracionUsuarioContenido.idUsuario == idUsuario)
+        me_gusta = me_gusta.filter(models.ListaMeGusta.idUsuario == idUsuario)
+
+    pesos = {}
+    for id_usuario, id_contenido, puntuacion in valoraciones:
+        pesos[(id_usuario, id_contenido)] = max(puntuacion, 0) / PUNTUACION_MAXIMA
+    for id_usuario, id_contenido in me_gusta:
+        clave = (id_usuario, id_contenido)
+        pesos[clave] = max(pesos.get(clave, 0.0), PESO_ME_GUSTA)
+    return pesos
+
+
+# Calcula los K vecinos más similares (coseno) de cada contenido. Devuelve tuplas (idContenido, idVecino, similitud)
+def calcular_vecinos(pesos: dict, k: int = VECINOS_POR_CONTENIDO) -> list:
+    pesos = {clave: peso for clave, peso in pesos.items() if peso > 0}
+    if not pesos:
+        return []
+
+    usuarios = {}
+    contenidos = {}
+    filas, columnas, valores = [], [], []
+    for (id_usuario, id_contenido), peso in pesos.items():
+        filas.append(usuarios.setdefault(id_usuario, len(usuarios)))
+        columnas.append(contenidos.setdefault(id_contenido, len(contenidos)))
+        valores.append(peso)
+    ids_contenidos = list(contenidos)
+
+    matriz = sparse.csr_matrix(
+        (np.asarray(valores, dtype=np.float64), (filas, columnas)),
+        shape=(len(usuarios), len(contenidos)),
+    )
+
+    # Se normaliza cada columna (contenido) para que el producto sea directamente el coseno
+    normas = np.sqrt(np.asarray(matriz.multiply(matriz).sum(axis=0)).ravel())
+    normas[normas == 0] = 1.0
+    matriz = matriz @ sparse.diags(1.0 / normas)
+    similitudes = (matriz.T @ matriz).tocsr()
+    similitudes = (similitudes - sparse.diags(similitudes.diagonal())).tocsr()
+    similitudes.eliminate_zeros()
+
+    vecinos = []
+    for fila in range(similitudes.shape[0]):
+        inicio, fin = similitudes.indptr[fila], similitudes.indptr[fila + 1]
+        if inicio == fin:
+            continue
+        valores_fila = similitudes.data[inicio:fin]
+        columnas_fila = similitudes.indices[inicio:fin]
+        if len(valores_fila) > k:
+            seleccion = np.argpartition(-valores_fila, k - 1)[:k]
+            valores_fila = valores_fila[seleccion]
+            columnas_fila = columnas_fila[seleccion]
+        for columna, similitud in zip(columnas_fila, valores_fila):
+            vecinos.append((ids_contenidos[fila], ids_contenidos[columna], float(similitud)))
+    return vecinos
+
+
+# Recalcula y sustituye la tabla similitud_contenido en una única transacción
+def recalcular_similitudes(db: Session, k: int = VECINOS_POR_CONTENIDO) -> dict:
+    inicio = time.perf_counter()
+    vecinos = calcular_vecinos(cargar_interacciones(db), k)
+
+    tabla = models.SimilitudContenido.__table__
+    db.execute(tabla.delete())
+    for posicion in range(0, len(vecinos), TAMANO_LOTE_INSERCION):
+        db.execute(tabla.insert(), [
+            {"idContenido": id_contenido, "idVecino": id_vecino, "similitud": similitud}
+            for id_contenido, id_vecino, similitud in vecinos[posicion:posicion + TAMANO_LOTE_INSERCION]
+        ])
+    db.commit()
+    return {"filas": len(vecinos), "segundos": round(time.perf_counter() - inicio, 3)}
+
+
+# Devuelve los ids de los contenidos recomendados para un usuario, de mayor a menor puntuación.
+# Nunca incluye contenidos con los que el usuario ya ha interactuado ni los de "excluidos".
+def recomendar(db: Session, idUsuario: str, excluidos: set = frozenset(), limite: int = 20) -> list:
+    perfil = {id_contenido: peso for (_, id_contenido), peso in cargar_interacciones(db, idUsuario).items()}
+    if not perfil or limite <= 0:
+        return []
+
+    vecinos = db.query(models.SimilitudContenido).filter(
+        models.SimilitudContenido.idContenido.in_(list(perfil))
+    ).all()
+
+    puntuaciones = {}
+    for vecino in vecinos:
+        if vecino.idVecino in perfil or vecino.idVecino in excluidos:
+            continue
+        puntuaciones[vecino.idVecino] = (
+            puntuaciones.get(vecino.idVecino, 0.0) + vecino.similitud * perfil[vecino.idContenido]
+        )
+
+    ordenados = sorted(puntuaciones.items(), key=lambda par: (-par[1], par[0]))
+    return [id_contenido for id_contenido, _ in ordenados[:limite]]
+
+
+def main():
+    from .database import SessionLocal, initialize_database
+
+    initialize_database()
+    db = SessionLocal()
+    try:
+        resultado = recalcular_similitudes(db)
+    finally:
+        db.close()
+    print(f"Similitudes recalculadas: {resultado['filas']} filas en {resultado['segundos']} s.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+import argparse
+import sys
+from . import models, crud, clientes_servicios
+from .database import SessionLocal, initialize_database
+
+"""
+Autor: Grupo GA01 - ASEE
+Versión: 1.0
+Descripción: Recalcula la tabla afinidad_genero_usuario a partir del historial y los "me gusta".
+Sirve para rellenarla la primera vez y para comprobar que no se ha desviado de los datos reales.
+Al reconstruir también guarda el género de las entradas del historial que no lo tenían.
+
+Comando de ejecución (desde Microservicio_Interacciones o /app en el contenedor):
+    python -m API_Interacciones.reconstruir_afinidad              -> reconstruye la tabla
+    python -m API_Interacciones.reconstruir_afinidad --comprobar  -> solo informa de las diferencias
+
+"""
+
+# Usuarios que se piden en cada página a la API de usuarios
+USUARIOS_POR_PAGINA = 100
+
+
+# Relaciona cada idHistorial con su usuario recorriendo todas las páginas de GET /usuarios
+def obtener_historiales_usuarios() -> dict:
+    historial_a_usuario = {}
+    skip = 0
+    while True:
+        response = clientes_servicios.usuarios.get("/usuarios", params={"skip": skip, "limit": USUARIOS_POR_PAGINA})
+        response.raise_for_status()
+        usuarios = response.json()
+        for usuario in usuarios:
+            if usuario.get("idHistorial"):
+                historial_a_usuario[usuario["idHistorial"]] = usuario["id"]
+        if len(usuarios) < USUARIOS_POR_PAGINA:
+            return historial_a_usuario
+        skip += USUARIOS_POR_PAGINA
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconstrucción de la tabla de afinidad usuario-género")
+    parser.add_argument("--comprobar", action="store_true",
+                        help="No modifica la tabla, solo muestra las diferencias con los datos reales")
+    args = parser.parse_args()
+
+    initialize_database()
+    clientes_servicios.iniciar_clientes()
+    db = SessionLocal()
+    try:
+        completadas = 0
+        if not args.comprobar:
+            # Las entradas del historial sin género lo reciben ahora, así se restará al recortar el historial
+            completadas = crud.completar_generos_historial(db)
+        esperadas = crud.calcular_afinidad_generos(db, obtener_historiales_usuarios())
+        actuales = {
+            (fila.idUsuario, fila.idGenero): fila.puntos
+            for fila in db.query(models.AfinidadGeneroUsuario).all()
+        }
+
+        if args.comprobar:
+            diferencias = sorted(
+                (clave, actuales.get(clave, 0), esperadas.get(clave, 0))
+                for clave in set(actuales) | set(esperadas)
+                if actuales.get(clave, 0) != esperadas.get(clave, 0)
+            )
+            for (id_usuario, id_genero), actual, esperada in diferencias:
+                print(f"Usuario {id_usuario}, género {id_genero}: {actual} puntos guardados, {esperada} calculados")
+            print(f"{len(diferencias)} diferencias encontradas en {len(esperadas)} afinidades.")
+            return 1 if diferencias else 0
+
+        # Se sustituye la tabla completa en una única transacción
+        db.query(models.AfinidadGeneroUsuario).delete()
+        db.add_all(
+            models.AfinidadGeneroUsuario(idUsuario=id_usuario, idGenero=id_genero, puntos=puntos)
+            for (id_usuario, id_genero), puntos in esperadas.items()
+        )
+        db.commit()
+        print(f"Tabla de afinidad reconstruida: {len(esperadas)} filas "
+              f"({completadas} entradas del historial con el género completado).")
+        return 0
+    finally:
+        db.close()
+        clientes_servicios.cerrar_clientes()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,6 @@
 from pydantic import BaseModel, EmailStr
 from typing import Optional
+from datetime import datetime
 from enum import Enum
 
 """
@@ -32,10 +33,18 @@ class ValoracionUsuarioContenido(BaseModel):
     idContenido: str
     puntuacion: int
 
+# Entrada del historial tras registrar una visualización
+class VistaHistorial(BaseModel):
+    idHistorial: str
+    idContenido: str
+    numeroVistas: int
+    ultimaVista: Optional[datetime] = None
+
 class Tendencia(BaseModel):
     idContenido: str
     titulo: str
     me_gusta_total: int
+    puntuacion: float = 0.0  # Interacciones de la ventana con decaimiento exponencial
 
 class TendenciasResponse(BaseModel):
     tendencias: list[Tendencia]
@@ -48,4 +57,15 @@ class ContenidoMeGusta(BaseModel):
     idGenero: str
     valoracionPromedio: Optional[float] = None
     idSubtitulosContenido: Optional[str] = None
-    idDoblajeContenido: Optional[str] = None
\ No newline at end of file
+    idDoblajeContenido: Optional[str] = None
+
+# Ids de contenidos de los que se pide el estado para un usuario
+class ContenidosLote(BaseModel):
+    ids: list[str]
+
+# Estado de un contenido para un usuario (lo que necesita la interfaz para pintar su tarjeta)
+class EstadoContenido(BaseModel):
+    meGusta: bool = False
+    enLista: bool = False
+    enHistorial: bool = False
+    valoracion: Optional[float] = None  # Puntuación del usuario o None si no lo ha valorado
@@ -0,0 +1,149 @@
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from . import models
+
+"""
+Autor: Grupo GA01 - ASEE
+Versión: 1.0
+Descripción: Tendencias por ventana de tiempo.
+Cada "me gusta" (y cada "me gusta" retirado) y cada visualización se guardan como un evento con
+fecha en evento_interaccion y suman, en la misma transacción, en el contador de su hora en
+contador_tendencia_hora. Periódicamente se recorren los contadores de las últimas horas, se
+puntúa cada contenido con decaimiento exponencial (una interacción pierde la mitad de su peso
+cada VIDA_MEDIA horas) y se guardan los mejores de cada ventana en tendencia_contenido, de modo
+que GET /contenido/tendencias solo lee las primeras filas de un índice.
+
+Comando de ejecución del recálculo (desde Microservicio_Interacciones o /app en el contenedor):
+    python -m API_Interacciones.tendencias
+
+"""
+
+# Ventanas disponibles: nombre -> (horas que abarca, vida media en horas). Cada ventana cubre las
+# últimas horas completas: además de los contadores de las horas más recientes entra la parte que aún
+# no ha salido de la ventana del contador más antiguo (ver calcular_tendencias)
+VENTANAS = {
+    "1h": (1, 0.5),
+    "24h": (24, 6),
+    "7d": (168, 48),
+}
+
+# Peso de cada tipo de interacción en la puntuación
+PESO_ME_GUSTA = 3.0
+PESO_VISTA = 1.0
+
+# Contenidos que se guardan por ventana (máximo de limite en GET /contenido/tendencias)
+MAXIMO_POR_VENTANA = 100
+
+# Días que se conservan los eventos de interacción
+RETENCION_EVENTOS_DIAS = int(os.getenv("TENDENCIAS_RETENCION_DIAS", "30"))
+
+
+def hora_actual() -> float:
+    # Horas desde 1970-01-01 UTC con decimales: la parte entera es la hora del contador actual
+    return time.time() / 3600
+
+
+# Guarda el evento y lo suma al contador de su hora. No hace commit: se confirma junto con la interacción
+def registrar_evento(db: Session, idUsuario: str, idContenido: str, tipo: str, delta: int = 1):
+    ahora = datetime.now(timezone.utc)
+    db.add(models.EventoInteraccion(instante=ahora, idUsuario=idUsuario, idContenido=idContenido,
+                                    tipo=tipo, delta=delta))
+    incrementos = {"meGusta": delta if tipo == "meGusta" else 0, "vistas": delta if tipo == "vista" else 0}
+    tabla = models.ContadorTendenciaHora.__table__
+    sentencia = sqlite_insert(tabla).values(hora=int(ahora.timestamp() // 3600), idContenido=idContenido,
+                                            **incrementos)
+    sentencia = sentencia.on_conflict_do_update(
+        index_elements=["hora", "idContenido"],
+        set_={columna: tabla.c[columna] + sentencia.excluded[columna] for columna in incrementos},
+    )
+    db.execute(sentencia)
+
+
+# Puntúa los contenidos de cada ventana a partir de los contadores por hora. "ahora" es hora_actual():
+# una ventana de N horas suma enteros los contadores de las N horas más recientes (la actual incluida)
+# y, del contador de hace N horas, la fracción de hora que todavía no ha salido de la ventana. Así la
+# ventana de 1h abarca siempre los últimos 60 minutos y no se vacía al empezar cada hora.
+# Devuelve {ventana: [(idContenido, puntuacion), ...]} ordenado de mayor a menor puntuación.
+def calcular_tendencias(contadores, ahora: float, maximo: int = MAXIMO_POR_VENTANA) -> dict:
+    hora = int(ahora)
+    restante = 1.0 - (ahora - hora)  # Fracción de la hora más antigua que sigue dentro de la ventana
+    puntuaciones = {ventana: {} for ventana in VENTANAS}
+    for hora_contador, id_contenido, me_gusta, vistas in contadores:
+        edad = hora - hora_contador
+        puntos = PESO_ME_GUSTA * me_gusta + PESO_VISTA * vistas
+        for ventana, (horas, vida_media) in VENTANAS.items():
+            if edad > horas:
+                continue
+            peso = restante if edad == horas else 1.0
+            acumulado = puntuaciones[ventana]
+            acumulado[id_contenido] = acumulado.get(id_contenido, 0.0) + peso * puntos * 0.5 ** (edad / vida_media)
+
+    return {
+        ventana: sorted(((id_contenido, puntuacion) for id_contenido, puntuacion in acumulado.items() if puntuacion > 0),
+                        key=lambda par: (-par[1], par[0]))[:maximo]
+        for ventana, acumulado in puntuaciones.items()
+    }
+
+
+# Recalcula y sustituye la tabla tendencia_contenido en una única transacción y borra los
+# contadores que ya no entran en ninguna ventana y los eventos más antiguos que la retención
+def recalcular_tendencias(db: Session) -> dict:
+    inicio = time.perf_counter()
+    ahora = hora_actual()
+    primera_hora = int(ahora) - max(horas for horas, _ in VENTANAS.values())
+
+    contadores = db.query(models.ContadorTendenciaHora.hora, models.ContadorTendenciaHora.idContenido,
+                          models.ContadorTendenciaHora.meGusta, models.ContadorTendenciaHora.vistas).filter(
+        models.ContadorTendenciaHora.hora >= primera_hora
+    )
+    tendencias = calcular_tendencias(contadores, ahora)
+
+    tabla = models.TendenciaContenido.__table__
+    db.execute(tabla.delete())
+    filas = [
+        {"ventana": ventana, "idContenido": id_contenido, "puntuacion": puntuacion}
+        for ventana, puntuaciones in tendencias.items()
+        for id_contenido, puntuacion in puntuaciones
+    ]
+    if filas:
+        db.execute(tabla.insert(), filas)
+    db.query(models.ContadorTendenciaHora).filter(
+        models.ContadorTendenciaHora.hora < primera_hora
+    ).delete(synchronize_session=False)
+    db.query(models.EventoInteraccion).filter(
+        models.EventoInteraccion.instante < datetime.now(timezone.utc) - timedelta(days=RETENCION_EVENTOS_DIAS)
+    ).delete(synchronize_session=False)
+    db.commit()
+    return {"filas": len(filas), "segundos": round(time.perf_counter() - inicio, 3)}
+
+
+# Devuelve los contenidos en tendencia de una ventana como tuplas (idContenido, puntuacion)
+def get_tendencias(db: Session, ventana: str, limite: int) -> list:
+    return (
+        db.query(models.TendenciaContenido.idContenido, models.TendenciaContenido.puntuacion)
+        .filter(models.TendenciaContenido.ventana == ventana)
+        .order_by(models.TendenciaContenido.puntuacion.desc(), models.TendenciaContenido.idContenido)
+        .limit(limite)
+        .all()
+    )
+
+
+def main():
+    from .database import SessionLocal, initialize_database
+
+    initialize_database()
+    db = SessionLocal()
+    try:
+        resultado = recalcular_tendencias(db)
+    finally:
+        db.close()
+    print(f"Tendencias recalculadas: {resultado['filas']} filas en {resultado['segundos']} s.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
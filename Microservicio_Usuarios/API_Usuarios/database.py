@@ -1,7 +1,8 @@
+import functools
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from . import models, crud 
+from . import models, crud, migraciones, configuracion_sqlite
 import os 
 
 """
@@ -23,19 +24,53 @@ engine = create_engine(
     SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
 )
 
+# PRAGMAs de rendimiento (WAL, mmap, caché...) según SQLITE_PERFIL, aplicados a cada conexión
+configuracion_sqlite.configurar_motor(engine)
+
 # Crear una fábrica de sesiones para hacer queries
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 # Base para los modelos de SQLAlchemy
 Base = declarative_base()
 
-# Dependencia para obtener una sesión de base de datos
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Motor asíncrono opcional (DB_ASYNC=1): los endpoints se ejecutan en el bucle de eventos sobre
+# aiosqlite en lugar de ocupar un hilo del pool de FastAPI. El motor síncrono se sigue usando para
+# la inicialización y los procesos en segundo plano
+DB_ASYNC = os.getenv("DB_ASYNC", "0") == "1"
+
+if DB_ASYNC:
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+    engine_async = create_async_engine(f"sqlite+aiosqlite:///{DB_PATH}")
+    configuracion_sqlite.configurar_motor(engine_async.sync_engine)
+    # Sin expire_on_commit: los objetos se serializan fuera de la sesión y no pueden recargarse de forma síncrona
+    SessionLocalAsync = async_sessionmaker(engine_async, autoflush=False, expire_on_commit=False)
+
+    # Dependencia para obtener una sesión asíncrona de base de datos
+    async def get_db():
+        async with SessionLocalAsync() as db:
+            yield db
+else:
+    # Dependencia para obtener una sesión de base de datos
+    def get_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+# Decorador para los endpoints que reciben la sesión en el parámetro db. Con DB_ASYNC el endpoint pasa
+# a ser asíncrono y su cuerpo, incluidas las llamadas a crud.py, se ejecuta con AsyncSession.run_sync:
+# cada consulta espera a aiosqlite sin bloquear el bucle de eventos. Sin DB_ASYNC no cambia nada
+def usa_bd(funcion):
+    if not DB_ASYNC:
+        return funcion
+
+    @functools.wraps(funcion)
+    async def envoltura(*args, db, **kwargs):
+        return await db.run_sync(lambda sesion: funcion(*args, db=sesion, **kwargs))
+
+    return envoltura
 
 # Función para inicializar la base de datos
 def initialize_database():
@@ -60,3 +95,7 @@ def initialize_database():
             print("Valores iniciales insertados (Planes de suscripción).")
         finally:
             db.close()
+
+    # Migraciones pendientes del esquema (índices nuevos en bases de datos ya existentes)
+    migraciones.aplicar_migraciones(engine)
+    print(configuracion_sqlite.describir(engine))
@@ -1,7 +1,7 @@
 from fastapi import FastAPI, Depends, HTTPException
 from sqlalchemy.orm import Session
 from . import models, schemas, crud
-from .database import engine, get_db, initialize_database
+from .database import engine, get_db, initialize_database, usa_bd
 
 """
 Autor: Grupo GA01 - ASEE
@@ -22,45 +22,46 @@ app = FastAPI(
 # Crear la base de datos
 initialize_database()
 
-# Dependency para obtener la sesión de base de datos
-def get_database():
-    db = next(get_db())
-    return db
-
 @app.get("/usuarios", response_model=list[schemas.User])
-def get_usuarios(skip: int = 0, limit: int = 10, db: Session = Depends(get_database)):
+@usa_bd
+def get_usuarios(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
     return crud.get_users(db, skip=skip, limit=limit)
 
 @app.get("/usuarios/{idUsuario}", response_model=schemas.User)
-def get_usuarios(idUsuario: str, db: Session = Depends(get_database)):
+@usa_bd
+def get_usuarios(idUsuario: str, db: Session = Depends(get_db)):
     usuario = crud.get_user(db, user_id=idUsuario)
     if not usuario:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
     return usuario
 
 @app.post("/usuarios/registro", response_model=schemas.User)
-def register_user(user: schemas.UserCreate, db: Session = Depends(get_database)):
+@usa_bd
+def register_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
     db_user = crud.get_user_by_email(db, email=user.email)
     if db_user:
         raise HTTPException(status_code=400, detail="Email ya registrado")
     return crud.create_user(db, user)
 
 @app.post("/usuarios/login", response_model=schemas.User)
-def login_user(credentials: schemas.UserLogin, db: Session = Depends(get_database)):
+@usa_bd
+def login_user(credentials: schemas.UserLogin, db: Session = Depends(get_db)):
     db_user = crud.get_user_by_email(db, email=credentials.email)
     if not db_user or db_user.password != credentials.password:
         raise HTTPException(status_code=401, detail="Credenciales incorrectas")
     return db_user    
 
 @app.put("/usuarios/{idUsuario}/perfil")
-def update_user_profile(idUsuario: str, user_data: schemas.UserUpdate, db: Session = Depends(get_database)):
+@usa_bd
+def update_user_profile(idUsuario: str, user_data: schemas.UserUpdate, db: Session = Depends(get_db)):
     user = crud.update_user(db, user_id=idUsuario, user_data=user_data)
     if user is None:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
     return {"message": "Perfil actualizado exitosamente"}
 
 @app.put("/usuarios/{idUsuario}/idioma")
-def update_user_language(idUsuario: str, idioma: schemas.UserLanguage, db: Session = Depends(get_database)):
+@usa_bd
+def update_user_language(idUsuario: str, idioma: schemas.UserLanguage, db: Session = Depends(get_db)):
     # Aquí puedes implementar la lógica para actualizar el idioma del usuario
     user = crud.get_user(db, user_id=idUsuario)
     if user is None:
@@ -71,7 +72,8 @@ def update_user_language(idUsuario: str, idioma: schemas.UserLanguage, db: Sessi
     return {"message": "Idioma actualizado exitosamente"}
 
 @app.put("/usuarios/{idUsuario}/suscripcion")
-def update_subscription(idUsuario: str, subscription: schemas.SubscriptionUpdate, db: Session = Depends(get_database)):
+@usa_bd
+def update_subscription(idUsuario: str, subscription: schemas.SubscriptionUpdate, db: Session = Depends(get_db)):
     user = crud.get_user(db, user_id=idUsuario)
     if user is None:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
@@ -94,11 +96,13 @@ def update_subscription(idUsuario: str, subscription: schemas.SubscriptionUpdate
     raise HTTPException(status_code=400, detail="Acción no válida")
 
 @app.get("/metodos-pago", response_model=list[schemas.MetodoPago])
-def get_payment_methods(db: Session = Depends(get_database)):
+@usa_bd
+def get_payment_methods(db: Session = Depends(get_db)):
     return crud.get_metodos_pago(db)
 
 @app.get("/usuarios/{idUsuario}/metodos-pago", response_model=list[schemas.MetodoPago])
-def get_user_payment_methods(idUsuario: str, db: Session = Depends(get_database)):
+@usa_bd
+def get_user_payment_methods(idUsuario: str, db: Session = Depends(get_db)):
     user = crud.get_user(db, user_id=idUsuario)
     if user is None:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
@@ -107,7 +111,8 @@ def get_user_payment_methods(idUsuario: str, db: Session = Depends(get_database)
     return metodosPagoUsuario
 
 @app.post("/usuarios/{idUsuario}/metodos-pago", response_model=schemas.MetodoPagoUsuarioCreate)
-def add_payment_method(idUsuario: str, metodo_pago: schemas.MetodoPagoCreate, db: Session = Depends(get_database)):
+@usa_bd
+def add_payment_method(idUsuario: str, metodo_pago: schemas.MetodoPagoCreate, db: Session = Depends(get_db)):
     user = crud.get_user(db, user_id=idUsuario)
     if user is None:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
@@ -117,7 +122,8 @@ def add_payment_method(idUsuario: str, metodo_pago: schemas.MetodoPagoCreate, db
 
 # Endpoint para obtener un listado con todos los planes de suscripcición existentes en la BD
 @app.get("/planes-suscripcion", response_model=list[schemas.PlanSuscripcion])
-def get_planes_suscripcion(db: Session = Depends(get_database)):
+@usa_bd
+def get_planes_suscripcion(db: Session = Depends(get_db)):
     planes = crud.get_planes_suscripcion(db=db)
     if not planes:
         raise HTTPException(status_code=404, detail="No se han encontrado Planes de Suscripcion")
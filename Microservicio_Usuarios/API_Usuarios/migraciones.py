@@ -0,0 +1,129 @@
+import argparse
+import sys
+from datetime import datetime, timezone
+from sqlalchemy import text
+
+"""
+Autor: Grupo GA01 - ASEE
+Versión: 1.0
+Descripción: Migraciones versionadas del esquema de usuarios.db.
+Cada migración tiene un número de versión y una lista de sentencias idempotentes. Las versiones
+aplicadas se guardan en la tabla esquema_migraciones, así que al arrancar solo se ejecutan las
+nuevas, tanto en bases de datos recién creadas como en las que ya estaban en uso.
+Los índices que se crean aquí también están declarados en models.py (mismo nombre), de modo
+que una base de datos nueva ya los tiene y la migración no hace nada.
+
+Comando de ejecución (desde Microservicio_Usuarios o /app en el contenedor):
+    python -m API_Usuarios.migraciones              -> aplica las migraciones pendientes
+    python -m API_Usuarios.migraciones --comprobar  -> además revisa el plan de las consultas frecuentes
+
+"""
+
+# (versión, descripción, sentencias)
+MIGRACIONES = [
+    # Los índices de las consultas frecuentes de usuarios ya están declarados en models.py desde el
+    # principio; esta versión solo marca el punto de partida de las siguientes migraciones
+    (1, "Esquema inicial", []),
+]
+
+# Consultas frecuentes que no pueden recorrer una tabla entera: nombre -> (sql, parámetros)
+CONSULTAS_FRECUENTES = {
+    "usuario por id": (
+        'SELECT * FROM "Usuario" WHERE id = :id', {"id": "1"}),
+    "inicio de sesión (usuario por email)": (
+        'SELECT * FROM "Usuario" WHERE email = :email', {"email": "a@b.c"}),
+    "usuario por historial": (
+        'SELECT * FROM "Usuario" WHERE "idHistorial" = :historial', {"historial": "1"}),
+    "usuario por lista personalizada": (
+        'SELECT * FROM "Usuario" WHERE "idListaPersonalizada" = :lista', {"lista": "1"}),
+    "métodos de pago de un usuario": (
+        'SELECT "idMetodoPago" FROM "MetodoPagoUsuario" WHERE "idUsuario" = :usuario', {"usuario": "1"}),
+    "métodos de pago por id": (
+        'SELECT * FROM "MetodoPago" WHERE id IN (:a, :b)', {"a": "1", "b": "2"}),
+    "plan de suscripción": (
+        'SELECT * FROM "PlanSuscripcion" WHERE id = :id', {"id": "P1"}),
+}
+
+
+def _preparar_tabla(conexion):
+    conexion.execute(text(
+        "CREATE TABLE IF NOT EXISTS esquema_migraciones ("
+        "version INTEGER PRIMARY KEY, descripcion TEXT NOT NULL, aplicada TEXT NOT NULL)"
+    ))
+
+
+def version_actual(engine) -> int:
+    with engine.begin() as conexion:
+        _preparar_tabla(conexion)
+        return conexion.execute(text("SELECT COALESCE(MAX(version), 0) FROM esquema_migraciones")).scalar()
+
+
+def aplicar_migraciones(engine) -> list:
+    """
+    Ejecuta en orden las migraciones que aún no se han aplicado y devuelve sus versiones.
+    """
+    aplicadas = []
+    with engine.begin() as conexion:
+        _preparar_tabla(conexion)
+        hechas = {fila[0] for fila in conexion.execute(text("SELECT version FROM esquema_migraciones"))}
+        for version, descripcion, sentencias in MIGRACIONES:
+            if version in hechas:
+                continue
+            for sentencia in sentencias:
+                conexion.execute(text(sentencia))
+            conexion.execute(
+                text("INSERT OR IGNORE INTO esquema_migraciones (version, descripcion, aplicada) "
+                     "VALUES (:version, :descripcion, :aplicada)"),
+                {"version": version, "descripcion": descripcion,
+                 "aplicada": datetime.now(timezone.utc).isoformat(timespec="seconds")},
+            )
+            print(f"Migración {version} aplicada: {descripcion}")
+            aplicadas.append(version)
+    return aplicadas
+
+
+def _paso_problematico(detalle: str) -> bool:
+    # "SCAN tabla" sin índice es un recorrido completo; agrupar en un B-tree temporal también
+    # obliga a leer todas las filas antes de devolver la primera
+    if detalle.startswith("SCAN ") and " USING " not in detalle:
+        return True
+    return "TEMP B-TREE FOR GROUP BY" in detalle or "TEMP B-TREE FOR DISTINCT" in detalle
+
+
+def comprobar_planes(engine) -> dict:
+    """
+    Ejecuta EXPLAIN QUERY PLAN sobre cada consulta frecuente.
+    Devuelve {nombre: (pasos del plan, pasos problemáticos)}.
+    """
+    resultado = {}
+    with engine.connect() as conexion:
+        for nombre, (sql, parametros) in CONSULTAS_FRECUENTES.items():
+            pasos = [fila[3] for fila in conexion.execute(text("EXPLAIN QUERY PLAN " + sql), parametros)]
+            resultado[nombre] = (pasos, [paso for paso in pasos if _paso_problematico(paso)])
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migraciones del esquema de la base de datos")
+    parser.add_argument("--comprobar", action="store_true",
+                        help="Comprueba que las consultas frecuentes no recorren tablas completas")
+    args = parser.parse_args()
+
+    from . import models  # noqa: F401 (models se importa antes que database, como en main.py)
+    from .database import engine, initialize_database
+
+    initialize_database()
+    print(f"Versión del esquema: {version_actual(engine)}")
+    if not args.comprobar:
+        return 0
+
+    errores = 0
+    for nombre, (pasos, problemas) in comprobar_planes(engine).items():
+        print(f"{'ERROR' if problemas else 'OK':5} {nombre}: {' | '.join(pasos)}")
+        errores += bool(problemas)
+    print(f"{errores} consultas recorren tablas completas.")
+    return 1 if errores else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())